@@ -0,0 +1,84 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+def branch_prefix(simulation):
+    """
+    :param simulation: simulation being analyzed
+    :return: (prefix folder, prefix id, branch day) for a continuation of simulation_tools/branching.py, None for
+    a simulation run from start to end
+    """
+
+    tags = simulation.tags
+    if 'Prefix_Dir' not in tags:
+        return None
+
+    return tags['Prefix_Dir'], tags['Prefix'], int(tags['Branch_Day'])
+
+
+def read_prefix_file(prefix_dir, filename):
+    """
+    :param prefix_dir: simulation folder of the prefix
+    :param filename: output file as listed in the analyzer's filenames, e.g. output/InsetChart.json
+    :return: parsed json for .json files, raw bytes otherwise
+    """
+
+    path = os.path.join(prefix_dir, filename)
+    if filename.endswith('.json'):
+        with open(path) as f:
+            return json.load(f)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def stitch_channels(prefix, branch, branch_day):
+    """
+    :param prefix: InsetChart (or other channel report) json of the prefix
+    :param branch: the same report of the continuation
+    :param branch_day: day the continuation starts
+    :return: report of the continuation with the prefix days of every channel in front
+    """
+
+    stitched = dict(branch, Channels={})
+    for channel, values in branch['Channels'].items():
+        data = list(prefix['Channels'][channel]['Data'][:branch_day]) + list(values['Data'])
+        stitched['Channels'][channel] = dict(values, Data=data)
+    if 'Header' in branch:
+        stitched['Header'] = dict(branch['Header'], Timesteps=branch['Header'].get('Timesteps', 0) + branch_day)
+
+    return stitched
+
+
+def stitch_frame(prefix, branch, branch_day, start_time, time_column='Time'):
+    """
+    :param prefix: csv report of the prefix, e.g. ReportVectorGenetics
+    :param branch: the same report of the continuation
+    :param branch_day: day the continuation starts
+    :param start_time: Start_Time of the continuation, the first time on its report's clock; continue_from_prefix
+    sets it to the branch day and tags the continuation with it
+    :param time_column: time column of the report
+    :return: rows of the prefix before the branch day followed by the rows of the continuation
+    """
+
+    # a continuation started from another Start_Time is moved onto the clock of the full simulation
+    if start_time != branch_day:
+        branch = branch.assign(**{time_column: branch[time_column] + (branch_day - start_time)})
+
+    return pd.concat([prefix[prefix[time_column] < branch_day], branch], ignore_index=True)
+
+
+def stitch_spatial_report(prefix, branch, branch_day):
+    """
+    :param prefix: decoded SpatialReport of the prefix, see decode_spatial_report
+    :param branch: the same report of the continuation
+    :param branch_day: day the continuation starts
+    :return: decoded report with the prefix time steps before the branch day in front
+    """
+
+    times = prefix['start'] + prefix['interval'] * np.arange(prefix['n_tstep'])
+    data = np.concatenate([prefix['data'][times < branch_day], branch['data']])
+
+    return dict(branch, start=prefix['start'], n_tstep=len(data), data=data)
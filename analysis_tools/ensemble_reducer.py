@@ -0,0 +1,140 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+
+class EnsembleReducer(object):
+    """
+    Running per-group mean and standard deviation over an ensemble of simulations.
+
+    Each simulation's dataframe is folded into count, mean and M2 (sum of squared deviations) accumulators
+    per group as soon as it arrives (Welford's update, merged batch-wise with Chan's formula), so memory does
+    not grow with the number of seeds and the ensemble is grouped in a single pass. Standard deviations
+    use ddof=0 to match np.std. Missing values are skipped per channel.
+    """
+
+    def __init__(self, group_columns, channels):
+        self.group_columns = list(group_columns)
+        self.channels = list(channels)
+        self.cells = None
+        self.count = np.zeros((0, len(self.channels)))
+        self.mean = np.zeros((0, len(self.channels)))
+        self.m2 = np.zeros((0, len(self.channels)))
+
+    def _batch_statistics(self, df):
+        index = pd.MultiIndex.from_frame(df[self.group_columns])
+        values = df[self.channels].to_numpy(dtype=float)
+        if not index.has_duplicates:
+            present = ~np.isnan(values)
+            return index, present.astype(float), np.where(present, values, 0.0), np.zeros(values.shape)
+
+        # several rows of one simulation fall in the same group (e.g. nodes averaged together)
+        grouped = df.groupby(self.group_columns, sort=False)[self.channels]
+        count = grouped.count()
+        mean = grouped.mean().reindex(count.index)
+        m2 = (grouped.var(ddof=0).reindex(count.index) * count).fillna(0.0)
+        return pd.MultiIndex.from_frame(count.index.to_frame(index=False)), count.to_numpy(dtype=float), \
+            mean.fillna(0.0).to_numpy(dtype=float), m2.to_numpy(dtype=float)
+
+    def _positions(self, index):
+        if self.cells is None:
+            self.cells = index[:0]
+        positions = self.cells.get_indexer(index)
+        new = positions < 0
+        if new.any():
+            new_cells = index[new].unique()
+            self.cells = self.cells.append(new_cells)
+            padding = np.zeros((len(new_cells), len(self.channels)))
+            self.count = np.vstack([self.count, padding])
+            self.mean = np.vstack([self.mean, padding])
+            self.m2 = np.vstack([self.m2, padding])
+            positions = self.cells.get_indexer(index)
+
+        return positions
+
+    def merge_statistics(self, index, count, mean, m2):
+        """
+        Merge precomputed group statistics into the accumulators
+        :param index: MultiIndex of group values, one entry per row of the statistics
+        :param count: (groups, channels) number of observations
+        :param mean: (groups, channels) mean of the observations
+        :param m2: (groups, channels) sum of squared deviations from the mean
+        """
+
+        positions = self._positions(index)
+        n_a = self.count[positions]
+        n = n_a + count
+        delta = mean - self.mean[positions]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight = np.where(n > 0, count / n, 0.0)
+        self.mean[positions] += delta * weight
+        self.m2[positions] += m2 + delta ** 2 * n_a * weight
+        self.count[positions] = n
+
+    def add(self, df):
+        """
+        Fold one simulation into the running statistics
+        :param df: dataframe holding the group columns and the channels
+        """
+
+        self.merge_statistics(*self._batch_statistics(df))
+
+    def save(self, path, processed=()):
+        """
+        Persist the running statistics, e.g. next to the analyzer outputs, so later simulations can be merged in
+        without re-reading earlier ones
+        :param path: .npz file to write
+        :param processed: ids of the simulations folded into the statistics
+        """
+
+        arrays = {'group_columns': np.array(self.group_columns, dtype=str),
+                  'channels': np.array(self.channels, dtype=str),
+                  'processed': np.array(sorted(str(x) for x in processed), dtype=str),
+                  'count': self.count, 'mean': self.mean, 'm2': self.m2}
+        if self.cells is not None:
+            cells = self.cells.to_frame(index=False)
+            for i in range(len(self.group_columns)):
+                values = cells.iloc[:, i].to_numpy()
+                arrays['cells_%d' % i] = values.astype(str) if values.dtype == object else values
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        :param path: .npz file written by save
+        :return: reducer and the set of processed simulation ids
+        """
+
+        with np.load(path, allow_pickle=False) as f:
+            reducer = cls(list(f['group_columns']), list(f['channels']))
+            reducer.count, reducer.mean, reducer.m2 = f['count'], f['mean'], f['m2']
+            if 'cells_0' in f.files:
+                levels = [f['cells_%d' % i] for i in range(len(reducer.group_columns))]
+                reducer.cells = pd.MultiIndex.from_arrays(levels, names=reducer.group_columns)
+            processed = set(f['processed'].tolist())
+
+        return reducer, processed
+
+    def to_dataframe(self, std_suffix='_std'):
+        """
+        :param std_suffix: suffix of the standard deviation columns
+        :return: dataframe with the group columns, the mean of each channel and its standard deviation
+        """
+
+        if self.cells is None:
+            return pd.DataFrame(columns=self.group_columns + self.channels +
+                                [ch + std_suffix for ch in self.channels])
+        df = self.cells.to_frame(index=False)
+        df.columns = self.group_columns
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(self.count > 0, self.mean, np.nan)
+            std = np.sqrt(np.where(self.count > 0, self.m2 / self.count, np.nan))
+        for i, ch in enumerate(self.channels):
+            df[ch] = mean[:, i]
+        for i, ch in enumerate(self.channels):
+            df[ch + std_suffix] = std[:, i]
+
+        return df.sort_values(self.group_columns).reset_index(drop=True)
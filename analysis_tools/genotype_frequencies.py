@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+
+def genotype_fractions(df, index_columns=('Time', 'NodeID'), genome_column='Genome', value_column='VectorPopulation',
+                       genomes=None):
+    """
+    Fraction of the vector population in each genome, per row of the index columns
+    :param df: long format ReportVectorGenetics dataframe
+    :param index_columns: columns identifying one population, e.g. Time and NodeID
+    :param genome_column: column holding the genome label
+    :param value_column: column holding the population counts
+    :param genomes: genome columns to return, in order; all genomes found in the report if None
+    :return: dataframe with the index columns and one fraction column per genome; populations of zero
+    give fractions of zero rather than NaN
+    """
+
+    index_columns = list(index_columns)
+    rows, row_labels = pd.MultiIndex.from_frame(df[index_columns]).factorize(sort=True)
+    cols, genome_labels = pd.factorize(df[genome_column], sort=True)
+    n_rows, n_genomes = len(row_labels), len(genome_labels)
+
+    # dense (population, genome) matrix in one scatter-add, then every row normalised at once
+    counts = np.bincount(rows * n_genomes + cols, weights=df[value_column].to_numpy(dtype=float),
+                         minlength=n_rows * n_genomes).reshape(n_rows, n_genomes)
+    total = counts.sum(axis=1, keepdims=True)
+    fractions = np.divide(counts, total, out=np.zeros_like(counts), where=total > 0)
+
+    genome_labels = list(genome_labels)
+    if genomes is not None:
+        position = {genome: i for i, genome in enumerate(genome_labels)}
+        selected = np.zeros((n_rows, len(genomes)))
+        for j, genome in enumerate(genomes):
+            if genome in position:
+                selected[:, j] = fractions[:, position[genome]]
+        fractions, genome_labels = selected, list(genomes)
+
+    result = row_labels.to_frame(index=False)
+    result.columns = index_columns
+    return pd.concat([result, pd.DataFrame(fractions, columns=genome_labels)], axis=1)
+
+
+def genome_alleles(genome):
+    """
+    Alleles of the non-sex locus in a genome label, e.g. 'X-a0:X-a1' -> ['a0', 'a1']
+    """
+
+    return [chromosome.split('-')[-1] for chromosome in genome.split(':')]
+
+
+def allele_frequencies(fractions, genomes, alleles=None):
+    """
+    Allele frequencies from genotype fractions
+    :param fractions: dataframe with one fraction column per genome, as returned by genotype_fractions
+    :param genomes: genome columns to use
+    :param alleles: alleles to report, e.g. ['a0', 'a1', 'a2']; all alleles named in the genomes if None.
+    Wildcard alleles ('*') are not counted
+    :return: dataframe with one frequency column per allele, aligned with fractions
+    """
+
+    genome_allele_lists = [genome_alleles(genome) for genome in genomes]
+    if alleles is None:
+        alleles = sorted({a for pair in genome_allele_lists for a in pair if a != '*'})
+    dosage = np.array([[pair.count(allele) / float(len(pair)) for allele in alleles]
+                       for pair in genome_allele_lists])
+
+    return pd.DataFrame(fractions[list(genomes)].to_numpy(dtype=float) @ dosage, columns=alleles,
+                        index=fractions.index)
@@ -0,0 +1,57 @@
+import os
+
+from analysis_tools.ensemble_reducer import EnsembleReducer
+
+
+class IncrementalAnalysis(object):
+    """
+    Mixin for analyzers that keep the seed statistics of the simulations they analyzed next to their outputs.
+
+    With incremental=True the EnsembleReducer statistics and the ids of the simulations folded into them are saved
+    to a stats file; a later run loads them, filters out the simulations already analyzed and merges only the new
+    ones. Listed before BaseAnalyzer so its filter is used.
+    """
+
+    def init_incremental(self, incremental, stats_fname):
+        """
+        :param incremental: merge new simulations into the saved statistics instead of starting over
+        :param stats_fname: .npz file of the saved statistics, e.g. <working_dir>/<exp_name>_inset_data_stats.npz
+        """
+
+        self.incremental = incremental
+        self.stats_fname = stats_fname
+        self.processed = set()
+        if self.resuming():
+            self.processed = EnsembleReducer.load(self.stats_fname)[1]
+
+    def resuming(self):
+        return self.incremental and os.path.exists(self.stats_fname)
+
+    def filter(self, simulation):
+        return not self.incremental or str(simulation.id) not in self.processed
+
+    def load_statistics(self):
+        """
+        Reset the processed simulations to those of the saved statistics
+        :return: saved reducer, None when not resuming
+        """
+
+        reducer, self.processed = EnsembleReducer.load(self.stats_fname) if self.resuming() else (None, set())
+
+        return reducer
+
+    def new_simulations(self, all_data):
+        """
+        :param all_data: dictionary of simulation to its selected data, as passed to finalize
+        :return: simulations not folded into the statistics yet, in the order of all_data
+        """
+
+        return [simulation for simulation in all_data if str(simulation.id) not in self.processed]
+
+    def save_statistics(self, reducer):
+        """
+        :param reducer: reducer holding every processed simulation; nothing is saved if not incremental
+        """
+
+        if self.incremental and reducer is not None:
+            reducer.save(self.stats_fname, self.processed)
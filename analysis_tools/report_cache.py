@@ -0,0 +1,85 @@
+import glob
+import hashlib
+import io
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+
+def file_digest(raw):
+    return hashlib.sha1(raw).hexdigest()
+
+
+def cache_path(cache_dir, sim_id, digest):
+    return os.path.join(cache_dir, '%s_%s.npz' % (sim_id, digest[:16]))
+
+
+def save_frame(df, path):
+    """
+    Write a dataframe as uncompressed columnar .npz, one array per column
+    :param df: dataframe to write
+    :param path: .npz file to write
+    """
+
+    arrays = {'__columns__': np.array(df.columns, dtype=str)}
+    for i, column in enumerate(df.columns):
+        values = df[column].to_numpy()
+        if values.dtype == object:
+            values = values.astype(str)
+        arrays['c%d' % i] = values
+    # a temporary file of its own, so workers parsing the same report at once never write to or replace each other's
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def load_frame(path):
+    with np.load(path, allow_pickle=False) as f:
+        columns = list(f['__columns__'])
+        return pd.DataFrame({column: f['c%d' % i] for i, column in enumerate(columns)}, columns=columns)
+
+
+def _store(df, cache_dir, sim_id, digest):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = cache_path(cache_dir, sim_id, digest)
+    save_frame(df, path)
+    # an older parse of the same simulation is stale once the report changes
+    for old in glob.glob(os.path.join(cache_dir, '%s_*.npz' % sim_id)):
+        if old != path:
+            try:
+                os.remove(old)
+            except FileNotFoundError:
+                # removed by another worker
+                pass
+
+
+def load_report(raw, sim_id, cache_dir):
+    """
+    Parse a csv report, reusing the cached columnar copy when the same simulation produced the same file before
+    :param raw: bytes of the csv report
+    :param sim_id: simulation id
+    :param cache_dir: directory of the parsed report cache
+    :return: report dataframe
+    """
+
+    digest = file_digest(raw)
+    path = cache_path(cache_dir, sim_id, digest)
+    if os.path.exists(path):
+        try:
+            return load_frame(path)
+        except FileNotFoundError:
+            # replaced by a newer report of the same simulation in another worker
+            pass
+
+    df = pd.read_csv(io.BytesIO(raw))
+    _store(df, cache_dir, sim_id, digest)
+
+    return df
+
@@ -0,0 +1,140 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+try:
+    # optional, only needed for the parquet output format
+    import pyarrow
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pyarrow = None
+
+output_formats = {'csv': '.csv', 'parquet': '.parquet'}
+
+
+def results_path(working_dir, stem, output_format='csv'):
+    """
+    :param working_dir: directory of the analyzer outputs
+    :param stem: file name without extension, e.g. GM_release_establishment_rates
+    :param output_format: 'csv' for a single csv file, 'parquet' for a compressed dataset partitioned by sweep variable
+    :return: path of the result table
+    """
+
+    if output_format not in output_formats:
+        raise ValueError('Unknown output format %s, expected one of %s' % (output_format, list(output_formats)))
+    if output_format == 'parquet' and pyarrow is None:
+        raise ImportError('The parquet output format needs the pyarrow package')
+
+    return os.path.join(working_dir, stem + output_formats[output_format])
+
+
+def remove_results(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def write_results(df, path, partition_cols=None, append=False, basename='part'):
+    """
+    Write a result table as csv or, for a .parquet path, as a zstd compressed dataset with one directory level per
+    partition column (e.g. Transmission_To_Human=0.5/ITN_Coverage=0.0/part-0.parquet)
+    :param df: dataframe to write
+    :param path: .csv file or .parquet dataset directory
+    :param partition_cols: sweep variables to partition the parquet dataset by, ignored for csv
+    :param append: add the rows to an existing table instead of replacing it
+    :param basename: parquet file name prefix; appended rows need a prefix unique within the table, e.g. a
+    simulation id
+    """
+
+    if not path.endswith('.parquet'):
+        df.to_csv(path, mode='a' if append else 'w', index=False, header=not (append and os.path.exists(path)))
+        return
+
+    if not append:
+        remove_results(path)
+    partition_cols = [x for x in partition_cols or [] if x in df.columns]
+    table = pyarrow.Table.from_pandas(df, preserve_index=False)
+    pq.write_to_dataset(table, path, partition_cols=partition_cols, compression='zstd',
+                        basename_template='%s-{i}.parquet' % basename, existing_data_behavior='overwrite_or_ignore')
+    # directory names alone do not keep the type of the sweep values (e.g. 0.0 is read back as a string)
+    schema = table.schema.with_metadata({b'partition_cols': json.dumps(partition_cols).encode()})
+    pq.write_metadata(schema, os.path.join(path, '_common_metadata'))
+
+
+def filter_results(df, filters):
+    """
+    Apply reader filters to a dataframe in memory
+    :param df: dataframe to filter
+    :param filters: list of (column, op, value) tuples that must all hold, op one of ==, !=, <, <=, >, >=, in, not in
+    :return: rows of df matching every filter
+    """
+
+    ops = {'==': np.equal, '=': np.equal, '!=': np.not_equal, '<': np.less, '<=': np.less_equal,
+           '>': np.greater, '>=': np.greater_equal}
+    mask = np.ones(len(df), dtype=bool)
+    for column, op, value in filters or []:
+        if op in ('in', 'not in'):
+            match = df[column].isin(list(value)).to_numpy()
+            mask &= match if op == 'in' else ~match
+        else:
+            mask &= ops[op](df[column].to_numpy(), value)
+
+    return df[mask]
+
+
+def read_results(path, columns=None, filters=None):
+    """
+    Read an analyzer result table, preferring a parquet dataset written next to the csv path, e.g.
+    read_results('GM_release_establishment_rates.csv') reads GM_release_establishment_rates.parquet if it exists.
+    Parquet filters are pushed down to the reader so only the matching partitions and row groups are loaded.
+    :param path: .csv or .parquet path of the table
+    :param columns: columns to read, all columns if None
+    :param filters: list of (column, op, value) tuples that must all hold, see filter_results
+    :return: dataframe
+    """
+
+    columns = list(dict.fromkeys(columns)) if columns is not None else None
+    parquet_path = os.path.splitext(path)[0] + '.parquet'
+    if os.path.exists(parquet_path):
+        if pyarrow is None:
+            raise ImportError('Reading %s needs the pyarrow package' % parquet_path)
+        schema = pq.read_schema(os.path.join(parquet_path, '_common_metadata'))
+        partitioning = ds.partitioning(pyarrow.schema([schema.field(x) for x in
+                                                       json.loads(schema.metadata[b'partition_cols'])]), flavor='hive')
+        dataset = ds.dataset(parquet_path, schema=schema.remove_metadata(), format='parquet', partitioning=partitioning)
+        expression = pq.filters_to_expression(list(filters)) if filters else None
+        return dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+    needed = None if columns is None else set(columns) | {f[0] for f in filters or []}
+    df = pd.read_csv(os.path.splitext(path)[0] + '.csv',
+                     usecols=lambda x: not x.startswith('Unnamed:') and (needed is None or x in needed))
+    df = filter_results(df, filters).reset_index(drop=True)
+
+    return df[columns] if columns is not None else df
+
+
+def read_result_groups(path, by, columns=None, filters=None):
+    """
+    Iterate over a result table one value of a column at a time, e.g. one figure per Mutation_Rate2. A parquet dataset
+    is read group by group with the group value pushed down to the reader; a csv file is parsed once and split in
+    memory, since every read of it parses the whole file.
+    :param path: .csv or .parquet path of the table
+    :param by: column to group by
+    :param columns: columns to read besides by, all columns if None
+    :param filters: list of (column, op, value) tuples that must all hold, see filter_results
+    :return: generator of (value, dataframe) in sorted order of the values
+    """
+
+    columns = [by] + list(columns) if columns is not None else None
+    if os.path.exists(os.path.splitext(path)[0] + '.parquet'):
+        for value in sorted(read_results(path, columns=[by], filters=filters)[by].unique()):
+            yield value, read_results(path, columns=columns, filters=list(filters or []) + [(by, '==', value)])
+        return
+
+    for value, df in read_results(path, columns=columns, filters=filters).groupby(by, sort=True):
+        yield value, df.reset_index(drop=True)
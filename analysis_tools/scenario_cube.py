@@ -0,0 +1,171 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from analysis_tools.results_io import read_results
+
+
+def _source_stamp(path):
+    # read_results prefers the parquet dataset, whose _common_metadata is rewritten on every write
+    parquet_path = os.path.splitext(path)[0] + '.parquet'
+    if os.path.exists(parquet_path):
+        source = os.path.join(parquet_path, '_common_metadata')
+    else:
+        source = os.path.splitext(path)[0] + '.csv'
+    stat = os.stat(source)
+
+    return '%s|%i|%i' % (os.path.abspath(source), stat.st_size, stat.st_mtime_ns)
+
+
+class ScenarioCube(object):
+    """
+    Analyzer results as one dense array with an axis per dimension (e.g. Experiment, Transmission_To_Human,
+    ITN_Coverage, Time, NodeID) and a last axis of channels, NaN where a combination was not simulated.
+
+    Labels are looked up through one dictionary per dimension, so selecting a scenario is an index operation instead
+    of a boolean mask over every row of the table.
+    """
+
+    def __init__(self, dims, coords, channels, data):
+        """
+        :param dims: dimension names, in the order of the axes
+        :param coords: dictionary of dimension to its labels, in the order of the axis
+        :param channels: channel names of the last axis
+        :param data: array of shape (len(coords[dim]) for dim in dims) + (len(channels),)
+        """
+
+        self.dims = list(dims)
+        self.coords = {dim: np.asarray(coords[dim]) for dim in self.dims}
+        self.channels = list(channels)
+        self.data = data
+        self._index = {dim: {label: i for i, label in enumerate(self.coords[dim].tolist())} for dim in self.dims}
+        self._index['channel'] = {channel: i for i, channel in enumerate(self.channels)}
+
+    @classmethod
+    def from_frame(cls, df, dims, channels):
+        """
+        :param df: long format analyzer output
+        :param dims: columns to use as dimensions
+        :param channels: value columns
+        :return: ScenarioCube
+        """
+
+        # averaging repeated rows would collapse other sweep variables and average the _std channels
+        duplicated = df.duplicated(dims)
+        if duplicated.any():
+            raise ValueError('%i rows repeat a combination of %s; add the other sweep variables to dims or select '
+                             'them with filters' % (duplicated.sum(), list(dims)))
+        coords = {dim: np.asarray(sorted(df[dim].unique().tolist())) for dim in dims}
+        codes = tuple(np.searchsorted(coords[dim], df[dim].to_numpy()) for dim in dims)
+        data = np.full([len(coords[dim]) for dim in dims] + [len(channels)], np.nan)
+        data[codes] = df[channels].to_numpy(dtype=float)
+
+        return cls(dims, coords, channels, data)
+
+    @classmethod
+    def from_results(cls, path, dims, channels, filters=None, cache=True):
+        """
+        Build the cube of an analyzer output, or load it from the cube file saved next to the output by an earlier
+        call with the same arguments on the same output
+        :param path: .csv or .parquet path of the analyzer output, see analysis_tools/results_io.read_results
+        :param dims: columns to use as dimensions
+        :param channels: value columns
+        :param filters: read_results filters, e.g. [('Time', 'in', times)]
+        :param cache: save the cube as <output>_cube.npz and reuse it
+        :return: ScenarioCube
+        """
+
+        key = json.dumps([_source_stamp(path), list(dims), list(channels), filters], default=str)
+        cube_path = os.path.splitext(path)[0] + '_cube.npz'
+        if cache and os.path.exists(cube_path):
+            cube, cube_key = cls.load(cube_path)
+            if cube_key == key:
+                return cube
+
+        cube = cls.from_frame(read_results(path, columns=list(dims) + list(channels), filters=filters), dims, channels)
+        if cache:
+            cube.save(cube_path, key)
+
+        return cube
+
+    def save(self, path, key=''):
+        coords = {'coord_%i' % i: self.coords[dim] for i, dim in enumerate(self.dims)}
+        meta = json.dumps({'dims': self.dims, 'channels': self.channels, 'key': key})
+        np.savez(path + '.tmp.npz', data=self.data, meta=np.asarray(meta), **coords)
+        os.replace(path + '.tmp.npz', path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        :param path: cube file written by save
+        :return: (cube, key it was saved with)
+        """
+
+        with np.load(path) as f:
+            meta = json.loads(str(f['meta']))
+            coords = {dim: f['coord_%i' % i] for i, dim in enumerate(meta['dims'])}
+            cube = cls(meta['dims'], coords, meta['channels'], f['data'])
+
+        return cube, meta['key']
+
+    def labels(self, dim):
+        return self.coords[dim] if dim != 'channel' else np.asarray(self.channels)
+
+    def index(self, dim, label):
+        try:
+            return self._index[dim][label]
+        except KeyError:
+            raise KeyError('%r is not a label of %s' % (label, dim))
+
+    def sel(self, channel=None, **labels):
+        """
+        Select by label; a single label drops its axis, a list of labels keeps it
+        :param channel: channel or list of channels, all channels if None
+        :param labels: dimension name to label(s), e.g. Experiment='VC_only', Time=[180, 2189]
+        :return: array over the remaining dimensions in cube order, then channels unless a single channel was given
+        """
+
+        data = self.data
+        axis = 0
+        for dim in self.dims + ['channel']:
+            value = channel if dim == 'channel' else labels.get(dim)
+            if value is None:
+                axis += 1
+            elif isinstance(value, (list, tuple, np.ndarray)):
+                data = np.take(data, [self.index(dim, x) for x in value], axis=axis)
+                axis += 1
+            else:
+                # a single label is basic indexing, a view of the cube
+                data = data[(slice(None),) * axis + (self.index(dim, value),)]
+
+        return data
+
+    def has_data(self, channel=None, **labels):
+        """
+        :param channel: channel or list of channels, all channels if None
+        :param labels: dimension name to label(s) as in sel
+        :return: True if any value was simulated for the selection, False also for labels not in the cube
+        """
+
+        try:
+            return bool(np.isfinite(self.sel(channel=channel, **labels)).any())
+        except KeyError:
+            return False
+
+    def to_frame(self, **labels):
+        """
+        :param labels: dimension name to label(s) as in sel
+        :return: long format dataframe of the selection, without combinations that were not simulated
+        """
+
+        data = self.sel(**labels)
+        dims = [dim for dim in self.dims if dim not in labels or isinstance(labels[dim], (list, tuple, np.ndarray))]
+        coords = [np.asarray(labels[dim]) if dim in labels else self.coords[dim] for dim in dims]
+        data = data.reshape(-1, len(self.channels))
+        df = pd.DataFrame(data, columns=self.channels)
+        if dims:
+            df = pd.concat([pd.MultiIndex.from_product(coords, names=dims).to_frame(index=False), df], axis=1)
+
+        return df[~np.isnan(data).all(axis=1)].reset_index(drop=True)
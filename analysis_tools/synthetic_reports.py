@@ -0,0 +1,228 @@
+import argparse
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+default_genomes = ['X-a0:X-a0', 'X-a0:X-a1', 'X-a1:X-a1']
+default_spatial_channels = ['Population', 'Prevalence', 'New_Clinical_Cases', 'Daily_EIR', 'Adult_Vectors']
+inset_channels = ['Blood Smear Parasite Prevalence', 'Daily EIR', 'New Clinical Cases', 'True Prevalence',
+                  'Adult Vectors', 'Statistical Population']
+
+
+def seasonality(n_days, peak_day=240, amplitude=0.8):
+    """
+    Yearly cycle between 1 - amplitude and 1 + amplitude, peaking in the rainy season
+    """
+
+    return 1 + amplitude * np.cos(2 * np.pi * (np.arange(n_days) - peak_day) / 365.0)
+
+
+def drive_frequency(n_days, release_day, spread_rate, n_nodes=1, rng=None):
+    """
+    Logistic rise of the drive allele frequency after a release, reaching later nodes with a random delay
+    :return: (day, node) allele frequencies
+    """
+
+    rng = rng if rng is not None else np.random.default_rng()
+    delay = release_day + rng.exponential(60, n_nodes) * (np.arange(n_nodes) > 0)
+    t = np.arange(n_days)[:, None] - delay[None, :]
+    frequency = 1 / (1 + np.exp(-spread_rate * (t - 90)))
+
+    return np.where(t >= 0, frequency, 0.0)
+
+
+def vector_genetics_report(n_days, nodeids=(1,), genomes=None, release_day=180, spread_rate=0.05,
+                           mean_population=5000, rng=None):
+    """
+    ReportVectorGenetics SPECIFIC_GENOME output with seasonal populations and a spreading drive allele
+    :param n_days: number of days reported
+    :param nodeids: node ids reported
+    :param genomes: genome labels, homozygous wild type first and homozygous drive last
+    :param release_day: day the drive is released in the first node
+    :param spread_rate: daily logistic growth rate of the drive allele
+    :param mean_population: mean female vector population per node
+    :param rng: numpy Generator
+    :return: dataframe with Time, NodeID, Genome and VectorPopulation
+    """
+
+    rng = rng if rng is not None else np.random.default_rng()
+    genomes = genomes or default_genomes
+    n_nodes = len(nodeids)
+    # Hardy-Weinberg proportions of the wild type (first), heterozygote (middle) and drive homozygote (last)
+    p = drive_frequency(n_days, release_day, spread_rate, n_nodes, rng)
+    proportions = np.zeros((n_days, n_nodes, len(genomes)))
+    proportions[..., 0] = (1 - p) ** 2
+    proportions[..., -1] += p ** 2
+    if len(genomes) > 2:
+        proportions[..., 1:-1] = (2 * p * (1 - p))[..., None] / (len(genomes) - 2)
+    total = mean_population * seasonality(n_days)[:, None] * rng.lognormal(0, 0.3, n_nodes)[None, :]
+    counts = rng.poisson(total[..., None] * proportions)
+
+    return pd.DataFrame({'Time': np.repeat(np.arange(n_days), n_nodes * len(genomes)),
+                         'NodeID': np.tile(np.repeat(np.asarray(nodeids), len(genomes)), n_days),
+                         'Genome': np.tile(genomes, n_days * n_nodes),
+                         'VectorPopulation': counts.ravel()})
+
+
+def inset_chart(n_days, rng=None):
+    """
+    InsetChart.json contents with seasonal malaria and vector channels
+    """
+
+    rng = rng if rng is not None else np.random.default_rng()
+    season = seasonality(n_days)
+    prevalence = np.clip(0.4 * season + rng.normal(0, 0.02, n_days), 0, 1)
+    values = {'Blood Smear Parasite Prevalence': prevalence,
+              'Daily EIR': rng.gamma(2.0, 0.25 * season),
+              'New Clinical Cases': rng.poisson(20 * season),
+              'True Prevalence': np.clip(1.3 * prevalence, 0, 1),
+              'Adult Vectors': rng.poisson(5000 * season),
+              'Statistical Population': np.full(n_days, 1000.0)}
+    channels = {name: {'Units': '', 'Data': np.asarray(values[name], dtype=float).tolist()}
+                for name in inset_channels}
+
+    return {'Header': {'Channels': len(channels), 'Timesteps': n_days, 'Simulation_Timestep': 1},
+            'Channels': channels}
+
+
+def spatial_channel(channel, n_days, n_nodes, rng=None):
+    """
+    (day, node) values of a SpatialReportMalariaFiltered channel with realistic scale and seasonality
+    """
+
+    rng = rng if rng is not None else np.random.default_rng()
+    season = seasonality(n_days)[:, None]
+    node_scale = rng.lognormal(0, 0.5, n_nodes)[None, :]
+    if channel == 'Population':
+        values = np.broadcast_to(np.round(1000 * node_scale), (n_days, n_nodes))
+    elif channel in ['Prevalence', 'PfHRP2_Prevalence', 'True_Prevalence']:
+        values = np.clip(0.4 * season * np.sqrt(node_scale) + rng.normal(0, 0.02, (n_days, n_nodes)), 0, 1)
+    elif channel == 'New_Clinical_Cases':
+        values = rng.poisson(2 * season * node_scale)
+    elif channel == 'Adult_Vectors':
+        values = rng.poisson(5000 * season * node_scale)
+    else:
+        values = rng.gamma(2.0, 0.25 * season * node_scale)
+
+    return np.asarray(values, dtype=np.float32)
+
+
+def spatial_report_bytes(data, nodeids, start=0.0, interval=1.0):
+    """
+    Contents of a SpatialReportMalariaFiltered .bin file
+    :param data: (time, node) values
+    :param nodeids: node ids of the columns
+    :param start: first report time
+    :param interval: days between reports
+    """
+
+    n_tstep, n_nodes = np.shape(data)
+    return np.array([n_nodes, n_tstep], dtype=np.int32).tobytes() + \
+        np.array([start, interval], dtype=np.float32).tobytes() + \
+        np.asarray(nodeids, dtype=np.uint32).tobytes() + \
+        np.ascontiguousarray(data, dtype=np.float32).tobytes()
+
+
+def sweep_tags(sweep, num_seeds):
+    """
+    Tags of every simulation of a sweep, Run_Number varying fastest
+    :param sweep: dictionary of tag name to list of values
+    :param num_seeds: number of Run_Numbers per sweep point
+    """
+
+    names = list(sweep)
+    return [dict(zip(names, values), Run_Number=seed)
+            for values in itertools.product(*[sweep[name] for name in names])
+            for seed in range(num_seeds)]
+
+
+def write_simulation(sim_dir, tags, n_days, nodeids, reports, seed, species='gambiae', genomes=None,
+                     spatial_channels=None):
+    """
+    Write tags.json and the synthetic output files of one simulation
+    :param sim_dir: simulation folder; reports go to its output folder
+    :param tags: simulation tags
+    :param n_days: number of days reported
+    :param nodeids: node ids
+    :param reports: any of 'vector_genetics', 'inset' and 'spatial'
+    :param seed: random seed of the simulation
+    :param species: species in the ReportVectorGenetics file name
+    :param genomes: genome labels of ReportVectorGenetics
+    :param spatial_channels: channels of SpatialReportMalariaFiltered files
+    """
+
+    rng = np.random.default_rng(seed)
+    output_dir = os.path.join(sim_dir, 'output')
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(sim_dir, 'tags.json'), 'w') as f:
+        json.dump(tags, f, indent=2)
+
+    if 'vector_genetics' in reports:
+        df = vector_genetics_report(n_days, nodeids, genomes, release_day=int(tags.get('Start_Day', 180)), rng=rng)
+        df.to_csv(os.path.join(output_dir, 'ReportVectorGenetics_%s_Female_SPECIFIC_GENOME.csv' % species),
+                  index=False)
+    if 'inset' in reports:
+        with open(os.path.join(output_dir, 'InsetChart.json'), 'w') as f:
+            json.dump(inset_chart(n_days, rng), f)
+    if 'spatial' in reports:
+        for channel in spatial_channels or default_spatial_channels:
+            with open(os.path.join(output_dir, 'SpatialReportMalariaFiltered_%s.bin' % channel), 'wb') as f:
+                f.write(spatial_report_bytes(spatial_channel(channel, n_days, len(nodeids), rng), nodeids))
+
+
+def _write_simulation(args):
+    sim_dir, tags, kwargs = args
+    write_simulation(sim_dir, tags, **kwargs)
+    return sim_dir
+
+
+def write_synthetic_experiment(exp_dir, sweep, num_seeds=10, n_nodes=1, n_days=365 * 6,
+                               reports=('vector_genetics', 'inset', 'spatial'), seed=0, processes=None, **kwargs):
+    """
+    Write synthetic outputs for every simulation of a sweep in the layout of simulation_tools/local_runner.py, so
+    analyze_local can run the analyzers over them
+    :param exp_dir: experiment folder; simulations go to sim_00000, sim_00001, ...
+    :param sweep: dictionary of tag name to list of values, e.g. {'Transmission_To_Human': [0.3, 0.6, 1.0]}
+    :param num_seeds: number of Run_Numbers per sweep point
+    :param n_nodes: number of nodes, with node ids 1..n_nodes
+    :param n_days: number of days reported
+    :param reports: any of 'vector_genetics', 'inset' and 'spatial'
+    :param seed: base random seed
+    :param processes: number of worker processes
+    :param kwargs: other arguments of write_simulation
+    :return: list of simulation folders
+    """
+
+    nodeids = list(range(1, n_nodes + 1))
+    jobs = [(os.path.join(exp_dir, 'sim_%05d' % i), tags,
+             dict(kwargs, n_days=n_days, nodeids=nodeids, reports=reports, seed=[seed, i]))
+            for i, tags in enumerate(sweep_tags(sweep, num_seeds))]
+    # about four chunks per worker; the pool has as many workers as cores by default
+    chunksize = max(1, len(jobs) // (4 * (processes or os.cpu_count() or 1)))
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(_write_simulation, jobs, chunksize=chunksize))
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Write synthetic EMOD outputs for load testing the analyzers')
+    parser.add_argument('exp_dir')
+    parser.add_argument('--seeds', type=int, default=50, help='Run_Numbers per sweep point')
+    parser.add_argument('--transmission', type=float, nargs='+', default=[0.3, 0.6, 0.9, 1.0],
+                        help='Transmission_To_Human values')
+    parser.add_argument('--coverages', type=float, nargs='+', default=[0.0, 0.8], help='ITN_Coverage values')
+    parser.add_argument('--nodes', type=int, default=1)
+    parser.add_argument('--days', type=int, default=365 * 6)
+    parser.add_argument('--reports', nargs='+', default=['vector_genetics', 'inset', 'spatial'])
+    parser.add_argument('--processes', type=int, default=None)
+    args = parser.parse_args()
+
+    sim_dirs = write_synthetic_experiment(args.exp_dir,
+                                          {'Transmission_To_Human': args.transmission, 'ITN_Coverage': args.coverages},
+                                          num_seeds=args.seeds, n_nodes=args.nodes, n_days=args.days,
+                                          reports=args.reports, processes=args.processes)
+    print('wrote %i simulations to %s' % (len(sim_dirs), args.exp_dir))
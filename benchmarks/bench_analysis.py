@@ -0,0 +1,40 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from analysis_tools.ensemble_reducer import EnsembleReducer
+from analysis_tools.genotype_frequencies import genotype_fractions
+
+from benchmarks.fixtures import vector_genetics_csv
+
+
+class GenotypeFractions(object):
+
+    def setup(self):
+        self.report = pd.read_csv(io.BytesIO(vector_genetics_csv()))
+
+    def time_genotype_fractions(self):
+        genotype_fractions(self.report)
+
+
+class EnsembleReduction(object):
+    """
+    Seed statistics of 200 simulations x 6 years of daily values in 20 sweep groups
+    """
+
+    def setup(self):
+        rng = np.random.default_rng(0)
+        n_days = 365 * 6
+        self.frames = []
+        for i in range(200):
+            df = pd.DataFrame(rng.random((n_days, 3)), columns=['a', 'b', 'c'])
+            df['Time'] = np.arange(n_days)
+            df['Group'] = i // 10
+            self.frames.append(df)
+
+    def time_add_and_reduce(self):
+        reducer = EnsembleReducer(['Group', 'Time'], ['a', 'b', 'c'])
+        for df in self.frames:
+            reducer.add(df)
+        reducer.to_dataframe()
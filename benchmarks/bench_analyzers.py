@@ -0,0 +1,90 @@
+import shutil
+import tempfile
+
+import numpy as np
+
+from single_node_simulations.analyzers.genetic_data_analyzer import GMEstablishmentAnalyzer
+from single_node_simulations.analyzers.inset_data_analyzer import InsetAnalyzer
+from spatial_gene_drive.analyzers.spatial_data_analyzer import SpatialAnalyzer
+
+from analysis_tools.synthetic_reports import inset_chart
+from benchmarks.fixtures import spatial_report, sweep_simulations, vector_genetics_csv
+
+sweep_variables = ['Run_Number', 'Transmission_To_Human']
+
+
+class _AnalyzerBenchmark(object):
+    """
+    select_simulation_data over a sweep of synthetic outputs, then finalize, in a temporary working_dir
+    """
+
+    n_sims = 200
+
+    def make_analyzer(self, working_dir):
+        raise NotImplementedError
+
+    def make_data(self, simulation):
+        raise NotImplementedError
+
+    def setup(self):
+        self.working_dir = tempfile.mkdtemp()
+        self.analyzer = self.make_analyzer(self.working_dir)
+        self.simulations = sweep_simulations(self.n_sims)
+        self.data = {simulation: self.make_data(simulation) for simulation in self.simulations}
+        self.selected = {simulation: self.analyzer.select_simulation_data(self.data[simulation], simulation)
+                         for simulation in self.simulations}
+
+    def teardown(self):
+        shutil.rmtree(self.working_dir)
+
+    def time_select_simulation_data(self):
+        for simulation in self.simulations:
+            self.analyzer.select_simulation_data(self.data[simulation], simulation)
+
+    def time_finalize(self):
+        self.analyzer.finalize(self.selected)
+
+    def peakmem_select_simulation_data(self):
+        for simulation in self.simulations:
+            self.analyzer.select_simulation_data(self.data[simulation], simulation)
+
+    def peakmem_finalize(self):
+        self.analyzer.finalize(self.selected)
+
+
+class GMEstablishmentAnalyzerBenchmark(_AnalyzerBenchmark):
+
+    def make_analyzer(self, working_dir):
+        return GMEstablishmentAnalyzer('benchmark', sweep_variables, working_dir=working_dir)
+
+    def make_data(self, simulation):
+        return {'output/ReportVectorGenetics_gambiae_Female_SPECIFIC_GENOME.csv':
+                vector_genetics_csv(seed=int(simulation.id[4:]))}
+
+    def time_select_simulation_data_uncached(self):
+        for simulation in self.simulations:
+            shutil.rmtree(self.analyzer.cache_dir, ignore_errors=True)
+            self.analyzer.select_simulation_data(self.data[simulation], simulation)
+
+
+class InsetAnalyzerBenchmark(_AnalyzerBenchmark):
+
+    def make_analyzer(self, working_dir):
+        return InsetAnalyzer('benchmark', sweep_variables=sweep_variables, working_dir=working_dir)
+
+    def make_data(self, simulation):
+        return {'output/InsetChart.json': inset_chart(365 * 6, np.random.default_rng(int(simulation.id[4:])))}
+
+
+class SpatialAnalyzerBenchmark(_AnalyzerBenchmark):
+
+    channels = ['Adult_Vectors', 'Daily_EIR']
+    # 150 nodes x 6 years per simulation
+    n_sims = 40
+
+    def make_analyzer(self, working_dir):
+        return SpatialAnalyzer('benchmark', self.channels, sweep_variables, working_dir=working_dir)
+
+    def make_data(self, simulation):
+        return {'output/SpatialReportMalariaFiltered_%s.bin' % channel: spatial_report(channel=channel, seed=i)
+                for i, channel in enumerate(self.channels)}
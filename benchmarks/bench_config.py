@@ -0,0 +1,76 @@
+import copy
+import shutil
+import tempfile
+
+import numpy as np
+from dtk.utils.core.DTKConfigBuilder import DTKConfigBuilder
+from simtools.ModBuilder import ModBuilder, ModFn
+
+from spatial_gene_drive.configure_interventions import configure_VC_GM_intervention_system
+from spatial_gene_drive.helper_functions import add_drivers, add_nets, add_release, add_trait_modifiers
+
+
+def build_config():
+    return configure_VC_GM_intervention_system('vector_genetics', 'Burkina Faso', num_cores=5, num_years=6,
+                                               migration_mul=100)
+
+
+def spatial_sweep(num_seeds=50):
+    """
+    The VC_and_GM sweep of main_run_file.py with four copy likelihoods, 200 simulations
+    """
+
+    return [[ModFn(DTKConfigBuilder.set_param, 'Run_Number', seed),
+             ModFn(DTKConfigBuilder.set_param, 'Serialized_Population_Path', ''),
+             ModFn(add_nets, coverage=0.8, number=1000, num_nodes=6, start_day=180),
+             ModFn(add_release, number=1000, num_nodes=6, start_day=180),
+             ModFn(add_drivers, copy_to_likelihood=likelihood),
+             ModFn(add_trait_modifiers, transmission_to_human=0.3)
+             ]
+            for seed in range(num_seeds)
+            for likelihood in np.arange(0.7, 1.01, 0.1).tolist()]
+
+
+class ConfigBuilding(object):
+
+    def time_configure_VC_GM_intervention_system(self):
+        build_config()
+
+
+class ModFnApplication(object):
+    """
+    Per simulation builder copies with the sweep ModFns applied, as the experiment manager does
+    """
+
+    def setup(self):
+        self.cb = build_config()
+        self.builder = ModBuilder.from_list(spatial_sweep())
+
+    def time_apply_modfns(self):
+        for mod_fn_list in self.builder.mod_generator:
+            ModBuilder.metadata = {}
+            cb = copy.deepcopy(self.cb)
+            for fn in mod_fn_list:
+                fn(cb)
+
+    def time_deepcopy_builder(self):
+        for _ in range(200):
+            copy.deepcopy(self.cb)
+
+
+class CampaignSerialization(object):
+    """
+    config.json and campaign.json of one simulation with nets and a release
+    """
+
+    def setup(self):
+        self.cb = build_config()
+        for fn in spatial_sweep(num_seeds=1)[0]:
+            fn(self.cb)
+        self.working_dir = tempfile.mkdtemp()
+
+    def teardown(self):
+        shutil.rmtree(self.working_dir)
+
+    def time_dump_files(self):
+        self.cb.dump_files(self.working_dir)
@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from analysis_tools.ensemble_reducer import EnsembleReducer
+from spatial_gene_drive.analyzers.spatial_output_dataframe import construct_spatial_output_df, \
+    construct_spatial_output_multichannel_df, decode_spatial_report
+from spatial_gene_drive.analyzers.spatial_report_store import SpatialReportStore
+
+from benchmarks.fixtures import spatial_report, sweep_simulations
+
+
+class SpatialReportDecoding(object):
+    """
+    One 150 node x 6 year SpatialReportMalariaFiltered channel
+    """
+
+    def setup(self):
+        self.raw = spatial_report()
+        self.channels = {'Adult_Vectors': self.raw, 'Daily_EIR': spatial_report(channel='Daily_EIR', seed=1)}
+
+    def time_decode_spatial_report(self):
+        decode_spatial_report(self.raw)
+
+    def time_construct_spatial_output_df(self):
+        construct_spatial_output_df(self.raw, 'Adult_Vectors')
+
+    def time_construct_spatial_output_df_snapshots(self):
+        construct_spatial_output_df(self.raw, 'Adult_Vectors', timesteps=[365, 730, 1095, 1460, 1825, 2189])
+
+    def time_construct_spatial_output_multichannel_df(self):
+        construct_spatial_output_multichannel_df(self.channels, list(self.channels))
+
+    def peakmem_construct_spatial_output_df(self):
+        construct_spatial_output_df(self.raw, 'Adult_Vectors')
+
+
+class SpatialEnsembleLoad(object):
+    """
+    The steps of SpatialAnalyzer.select_simulation_data and finalize, without dtk-tools, at 10 times the sweep of
+    bench_analyzers.SpatialAnalyzerBenchmark: 400 simulations of 150 nodes x 1 year and two channels
+    """
+
+    channels = ['Adult_Vectors', 'Daily_EIR']
+    n_sims = 400
+
+    def setup(self):
+        self.working_dir = tempfile.mkdtemp()
+        self.simulations = sweep_simulations(self.n_sims)
+        self.raw = [{ch: spatial_report(n_tstep=365, channel=ch, seed=i * len(self.channels) + j)
+                     for j, ch in enumerate(self.channels)} for i in range(self.n_sims)]
+        self.arrays = [{ch: decode_spatial_report(raw)['data'] for ch, raw in reports.items()} for reports in self.raw]
+        first = decode_spatial_report(self.raw[0][self.channels[0]])
+        self.times = first['start'] + first['interval'] * np.arange(first['n_tstep'])
+        self.nodeids = first['nodeids']
+
+    def teardown(self):
+        shutil.rmtree(self.working_dir)
+
+    def time_decode_spatial_reports(self):
+        for reports in self.raw:
+            for raw in reports.values():
+                decode_spatial_report(raw)
+
+    def time_write_store(self):
+        store = SpatialReportStore.create(os.path.join(self.working_dir, 'store'), self.channels, self.n_sims,
+                                          self.times, self.nodeids)
+        for index, (simulation, arrays) in enumerate(zip(self.simulations, self.arrays)):
+            store.write_simulation(index, simulation.id, arrays, simulation.tags)
+        store.flush()
+
+    def reduce_seeds(self):
+        reducer = EnsembleReducer(['Transmission_To_Human', 'time', 'node'], self.channels)
+        for simulation, arrays in zip(self.simulations, self.arrays):
+            simdata = pd.DataFrame({ch: arrays[ch].ravel() for ch in self.channels})
+            simdata['time'] = np.repeat(self.times, len(self.nodeids))
+            simdata['node'] = np.tile(self.nodeids, len(self.times))
+            simdata['Transmission_To_Human'] = simulation.tags['Transmission_To_Human']
+            reducer.add(simdata)
+
+        return reducer.to_dataframe()
+
+    def time_reduce_seeds(self):
+        self.reduce_seeds()
+
+    def peakmem_reduce_seeds(self):
+        self.reduce_seeds()
@@ -0,0 +1,48 @@
+import numpy as np
+
+from analysis_tools.synthetic_reports import spatial_channel, spatial_report_bytes, sweep_tags, \
+    vector_genetics_report
+
+
+class FakeExperiment(object):
+
+    def __init__(self, exp_name):
+        self.exp_name = exp_name
+
+
+class FakeSimulation(object):
+    """
+    The id, tags and experiment of a simulation, as used by the analyzers
+    """
+
+    def __init__(self, sim_id, tags, exp_name='benchmark'):
+        self.id = sim_id
+        self.tags = tags
+        self.experiment = FakeExperiment(exp_name)
+
+
+def sweep_simulations(n_sims, num_seeds=10):
+    """
+    Simulations of a Run_Number x Transmission_To_Human sweep
+    """
+
+    tags = sweep_tags({'Transmission_To_Human': list(range(-(-n_sims // num_seeds))), 'ITN_Coverage': [0.0]},
+                      num_seeds)[:n_sims]
+    return [FakeSimulation('sim_%05d' % i, sim_tags) for i, sim_tags in enumerate(tags)]
+
+
+def spatial_report(n_nodes=150, n_tstep=365 * 6, channel='Adult_Vectors', seed=0):
+    """
+    Contents of a SpatialReportMalariaFiltered .bin file
+    """
+
+    data = spatial_channel(channel, n_tstep, n_nodes, np.random.default_rng(seed))
+    return spatial_report_bytes(data, np.arange(1, n_nodes + 1))
+
+
+def vector_genetics_csv(n_days=365 * 6, seed=0):
+    """
+    Contents of a single node ReportVectorGenetics SPECIFIC_GENOME csv
+    """
+
+    return vector_genetics_report(n_days, rng=np.random.default_rng(seed)).to_csv(index=False).encode()
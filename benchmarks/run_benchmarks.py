@@ -0,0 +1,158 @@
+import argparse
+import cProfile
+import datetime
+import glob
+import importlib
+import inspect
+import json
+import os
+import platform
+import pstats
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+benchmark_dir = os.path.dirname(os.path.abspath(__file__))
+repo_dir = os.path.dirname(benchmark_dir)
+results_dir = os.path.join(benchmark_dir, 'results')
+history_file = os.path.join(results_dir, 'history.jsonl')
+
+
+def discover(pattern=''):
+    """
+    Benchmark classes of the bench_*.py modules, asv style: setup/teardown, time_* methods for run time and
+    peakmem_* methods for peak memory
+    :param pattern: only keep benchmarks whose module.Class.method name contains this
+    :return: list of (name, class, method name) and dictionary of modules that could not be imported
+    """
+
+    benchmarks, skipped = [], {}
+    for path in sorted(glob.glob(os.path.join(benchmark_dir, 'bench_*.py'))):
+        module_name = os.path.splitext(os.path.basename(path))[0]
+        try:
+            module = importlib.import_module('benchmarks.%s' % module_name)
+        except ImportError as e:
+            skipped[module_name] = str(e)
+            continue
+        for class_name, cls in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ != module.__name__ or class_name.startswith('_'):
+                continue
+            for method in sorted(m for m in dir(cls) if m.startswith(('time_', 'peakmem_'))):
+                name = '%s.%s.%s' % (module_name, class_name, method)
+                if pattern in name:
+                    benchmarks.append((name, cls, method))
+
+    return benchmarks, skipped
+
+
+def run_benchmark(cls, method, repeat=5, profile_path=None):
+    """
+    Time one benchmark method after a warm-up call, or measure the peak memory it allocates for peakmem_ methods
+    :return: dictionary of min, median and repeat in seconds, or of peak_bytes, or None if setup raised
+    NotImplementedError, the asv way of skipping a benchmark that cannot run here
+    """
+
+    instance = cls()
+    try:
+        if hasattr(instance, 'setup'):
+            instance.setup()
+    except NotImplementedError:
+        return None
+
+    try:
+        fn = getattr(instance, method)
+        if method.startswith('peakmem_'):
+            tracemalloc.start()
+            try:
+                fn()
+                return {'peak_bytes': tracemalloc.get_traced_memory()[1]}
+            finally:
+                tracemalloc.stop()
+
+        fn()
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+        if profile_path:
+            cProfile.runctx('fn()', globals(), {'fn': fn}, profile_path)
+    finally:
+        if hasattr(instance, 'teardown'):
+            instance.teardown()
+
+    return {'min': min(timings), 'median': float(np.median(timings)), 'repeat': repeat}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=repo_dir,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def previous_results(machine):
+    if not os.path.exists(history_file):
+        return {}
+    previous = {}
+    with open(history_file) as f:
+        for line in f:
+            entry = json.loads(line)
+            if entry['machine'] == machine:
+                previous.update(entry['results'])
+
+    return previous
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the benchmarks in ./benchmarks and record the timings')
+    parser.add_argument('-k', '--filter', default='', help='only run benchmarks whose name contains this')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='timed calls per benchmark')
+    parser.add_argument('--profile', action='store_true',
+                        help='also write a cProfile of each benchmark to results/profiles and print the top calls')
+    parser.add_argument('--no-save', action='store_true', help='do not append the timings to results/history.jsonl')
+    args = parser.parse_args(argv)
+
+    benchmarks, skipped = discover(args.filter)
+    for module_name, reason in skipped.items():
+        print('skipped %s: %s' % (module_name, reason))
+
+    machine = platform.node()
+    previous = previous_results(machine)
+    results = {}
+    for name, cls, method in benchmarks:
+        profile_path = None
+        if args.profile:
+            os.makedirs(os.path.join(results_dir, 'profiles'), exist_ok=True)
+            profile_path = os.path.join(results_dir, 'profiles', '%s.prof' % name)
+        result = run_benchmark(cls, method, args.repeat, profile_path)
+        if result is None:
+            print('%-80s skipped' % name)
+            continue
+        results[name] = result
+        measure, value = ('peak_bytes', '%9.1fMB' % (result['peak_bytes'] / 1e6)) if 'peak_bytes' in result \
+            else ('median', '%10.4fs' % result['median'])
+        change = ''
+        if measure in previous.get(name, {}):
+            change = '%+.0f%%' % (100 * (result[measure] / previous[name][measure] - 1))
+        print('%-80s %s %8s' % (name, value, change))
+        if profile_path:
+            pstats.Stats(profile_path).sort_stats('cumulative').print_stats(15)
+
+    if results and not args.no_save:
+        os.makedirs(results_dir, exist_ok=True)
+        entry = {'date': datetime.datetime.now().isoformat(timespec='seconds'), 'commit': git_commit(),
+                 'machine': machine, 'python': platform.python_version(), 'numpy': np.__version__,
+                 'results': results}
+        with open(history_file, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+
+
+if __name__ == "__main__":
+
+    sys.path.insert(0, repo_dir)
+    main()
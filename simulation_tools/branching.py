@@ -0,0 +1,132 @@
+import os
+
+from dtk.generic.serialization import add_SerializationTimesteps
+from simtools.ModBuilder import ModBuilder, ModFn
+
+# node level listeners are not part of a serialized population, so like the health seeking re-added after a burn-in
+# they are restarted at the branch day; other events before the branch day are already in the serialized state
+restarted_interventions = ('NodeLevelHealthTriggeredIV',)
+
+
+def _get(obj, key, default=None):
+    # campaign events are dtk-tools objects or plain dictionaries
+    if isinstance(obj, dict):
+        return obj.get(key, default)
+
+    return getattr(obj, key, default)
+
+
+def _set(obj, key, value):
+    if isinstance(obj, dict):
+        obj[key] = value
+    else:
+        setattr(obj, key, value)
+
+
+def _intervention_class(event):
+    intervention = _get(_get(event, 'Event_Coordinator_Config', {}), 'Intervention_Config', {})
+
+    return _get(intervention, 'class', type(intervention).__name__)
+
+
+def _last_day(event):
+    coordinator = _get(event, 'Event_Coordinator_Config', {})
+    repetitions = _get(coordinator, 'Number_Repetitions', 1) or 1
+    if repetitions < 0:
+        return float('inf')
+
+    return _get(event, 'Start_Day', 0) + (repetitions - 1) * _get(coordinator, 'Timesteps_Between_Repetitions', 0)
+
+
+def truncate_to_prefix(cb, branch_day, prefix_seed=0):
+    """
+    Turn a simulation into its shared prefix: the same configuration with a fixed seed, the events before the branch
+    day and a serialized population at the branch day. Applied after the simulation's own ModFns.
+    :param cb: config builder
+    :param branch_day: day the ensemble branches, e.g. the release day
+    :param prefix_seed: Run_Number of the prefix
+    :return: tags of the prefix
+    """
+
+    cb.set_param('Run_Number', prefix_seed)
+    cb.campaign.Events = [event for event in cb.campaign.Events if _get(event, 'Start_Day', 0) < branch_day]
+    add_SerializationTimesteps(cb, [branch_day], end_at_final=True)
+
+    return {'Branch_Day': branch_day}
+
+
+def continue_from_prefix(cb, prefix, branch_day):
+    """
+    Start a simulation from the serialized state of its prefix at the branch day. Start_Time is set to the branch day,
+    so campaign days, report times and the end of the simulation stay those of the full simulation; the simulation
+    keeps its own Run_Number, so each continuation has its own random number stream.
+    :param cb: config builder
+    :param prefix: prefix description from BurnInStage.run
+    :param branch_day: day the ensemble branches
+    :return: tags locating the prefix and the Start_Time of the continuation, read by analysis_tools/branch_stitching.py
+    """
+
+    for event in cb.campaign.Events:
+        # events on the branch day itself run in the continuation, see truncate_to_prefix
+        if _get(event, 'Start_Day', 0) < branch_day <= _last_day(event):
+            raise ValueError('Campaign event starting on day %s repeats past the branch day %i'
+                             % (_get(event, 'Start_Day'), branch_day))
+    cb.campaign.Events = [event for event in cb.campaign.Events if _get(event, 'Start_Day', 0) >= branch_day or
+                          _intervention_class(event) in restarted_interventions]
+    for event in cb.campaign.Events:
+        _set(event, 'Start_Day', max(_get(event, 'Start_Day', 0), branch_day))
+
+    cb.update_params({'Serialized_Population_Path': prefix['path'],
+                      'Serialized_Population_Filenames': prefix['filenames'],
+                      'Start_Time': branch_day,
+                      'Simulation_Duration': cb.get_param('Simulation_Duration') - branch_day})
+
+    return {'Branch_Day': branch_day, 'Start_Time': branch_day, 'Prefix': prefix['digest'][:12],
+            'Prefix_Dir': os.path.dirname(prefix['path'])}
+
+
+class BranchingEnsemble(object):
+    """
+    Runs the period before the branch day once per arm family and continues every seed from its serialized state.
+
+    Each simulation of a sweep is reduced to its prefix with truncate_to_prefix. Simulations whose prefixes have
+    identical files, e.g. every seed of an arm, or arms differing only in interventions from the branch day on, share
+    one prefix run, cached by BurnInStage like a burn-in. The simulations are then rebuilt as continuations from their
+    prefix's serialized population, and the analyzers stitch the prefix outputs back onto each continuation.
+
+    The sweep's ModFn lists are read once and held in memory until the prefixes have run, since the continuations need
+    the prefixes' serialized files; with the ModSpecs of sweep.py that is about 2 kB per simulation. Very large sweeps
+    can be branched a few arms at a time, e.g. with sweep.builder(arms=[...]).
+    """
+
+    def __init__(self, branch_day, stage, prefix_seed=0):
+        """
+        :param branch_day: day the ensemble branches; the first day any arm differs from the others in its family
+        :param stage: BurnInStage holding the prefix runs, e.g. BurnInStage(os.path.join('_local', 'prefixes'))
+        :param prefix_seed: Run_Number of the prefixes
+        """
+
+        self.branch_day = branch_day
+        self.stage = stage
+        self.prefix_seed = prefix_seed
+
+    def builder(self, config_builder, exp_builder, verbose=False):
+        """
+        Run the prefixes that are not cached yet
+        :param config_builder: config builder of the experiment, with its campaign and reports complete
+        :param exp_builder: builder of the full simulations, e.g. sweep.builder()
+        :param verbose: print progress of the prefixes being run
+        :return: ModBuilder of the continuations, one per simulation of exp_builder
+        """
+
+        # held until the prefixes have run, see the class docstring
+        mod_fn_lists = list(exp_builder.mod_generator)
+        prefixes = self.stage.run(config_builder, ModBuilder.from_list(
+            mod_fn_list + [ModFn(truncate_to_prefix, self.branch_day, self.prefix_seed)]
+            for mod_fn_list in mod_fn_lists), verbose=verbose)
+        if verbose:
+            print('%i simulations branch from %i prefixes at day %i' % (
+                len(mod_fn_lists), len(set(prefix['digest'] for prefix in prefixes)), self.branch_day))
+
+        return ModBuilder.from_list(mod_fn_list + [ModFn(continue_from_prefix, prefix, self.branch_day)]
+                                    for mod_fn_list, prefix in zip(mod_fn_lists, prefixes))
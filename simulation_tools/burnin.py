@@ -0,0 +1,173 @@
+import copy
+import glob
+import json
+import os
+import re
+
+from simtools.ModBuilder import ModBuilder
+
+from simulation_tools.config_cache import document_digest
+from simulation_tools.equilibrium import inset_equilibrium_day, serialization_day
+from simulation_tools.local_runner import LocalExperimentRunner
+
+
+def serialized_population(path, filenames, digest='', tags=None):
+    """
+    :param path: folder holding the serialized files
+    :param filenames: serialized file of each core
+    :param digest: hash of the burn-in files
+    :param tags: tags of the burn-in simulation
+    :return: burn-in description taken by set_serialized_population
+    """
+
+    return {'path': path, 'filenames': list(filenames), 'digest': digest, 'tags': dict(tags or {})}
+
+
+def set_serialized_population(cb, burnin):
+    """
+    Start a simulation from a burn-in, e.g. ModSpec(set_serialized_population, SweepVar('burnin'))
+    :param cb: config builder
+    :param burnin: burn-in description from BurnInStage.run or serialized_population
+    :return: tag identifying the burn-in, none for a serialized population filled in by hand
+    """
+
+    cb.update_params({'Serialized_Population_Path': burnin['path'],
+                      'Serialized_Population_Filenames': burnin['filenames']})
+
+    return {'Burnin': burnin['digest'][:12]} if burnin['digest'] else {}
+
+
+def serialized_states(output_dir):
+    """
+    :param output_dir: output folder of a burn-in simulation
+    :return: dictionary of serialized time step to its files, ordered by core
+    """
+
+    # state-00365.dtk for single core runs, state-00365-000.dtk, state-00365-001.dtk, ... for MPI runs
+    pattern = re.compile(r'state-(\d+)(?:-(\d+))?\.dtk$')
+    files = {}
+    for path in glob.glob(os.path.join(output_dir, 'state-*.dtk')):
+        match = pattern.search(os.path.basename(path))
+        if match:
+            files.setdefault(int(match.group(1)), []).append((int(match.group(2) or 0), os.path.basename(path)))
+
+    return {day: [name for rank, name in sorted(names)] for day, names in files.items()}
+
+
+def find_serialized_files(output_dir, day=None):
+    """
+    :param output_dir: output folder of a burn-in simulation
+    :param day: serialized time step, the last one if None
+    :return: serialized files of the time step, ordered by core; none if nothing was serialized and no day was asked
+    """
+
+    states = serialized_states(output_dir)
+    if day is not None and day not in states:
+        raise FileNotFoundError('No serialized files of time step %i in %s, found time steps %s'
+                                % (day, output_dir, sorted(states)))
+    if not states:
+        return []
+
+    return states[max(states) if day is None else day]
+
+
+class BurnInStage(object):
+    """
+    Runs each distinct burn-in once and keeps its serialized population in a cache keyed by the hash of the burn-in's
+    json files, so a burn-in is only recomputed when its own config or campaign changes.
+
+    The burn-ins run on local cores through LocalExperimentRunner and land in <cache_dir>/<digest>/sim_00000. Their
+    descriptions are passed to downstream sweeps as the values of a sweep variable applied with
+    set_serialized_population, fanning every burn-in out to every intervention scenario.
+    """
+
+    def __init__(self, cache_dir, **runner_kwargs):
+        """
+        :param cache_dir: folder of the burn-in cache
+        :param runner_kwargs: LocalExperimentRunner arguments, e.g. input_dir, exe_path or max_cores
+        """
+
+        self.cache_dir = cache_dir
+        self.runner_kwargs = runner_kwargs
+
+    def sim_dir(self, digest):
+        return os.path.join(self.cache_dir, digest, 'sim_00000')
+
+    def serialized_files(self, digest):
+        """
+        :param digest: hash of the burn-in files
+        :return: serialized files of the burn-in, None if it has not finished successfully
+        """
+
+        sim_dir = self.sim_dir(digest)
+        try:
+            with open(os.path.join(sim_dir, 'status.txt')) as f:
+                succeeded = f.read().split()[0] == 'Succeeded'
+        except (OSError, IndexError):
+            return None
+        filenames = find_serialized_files(os.path.join(sim_dir, 'output'))
+
+        return filenames if succeeded and filenames else None
+
+    @staticmethod
+    def burnin_digest(config_builder, mod_fn_list):
+        ModBuilder.metadata = {}
+        cb = copy.deepcopy(config_builder)
+        for fn in mod_fn_list:
+            fn(cb)
+        files = {}
+        cb.file_writer(lambda name, content: files.update({name: json.loads(content)}))
+
+        return document_digest(files), dict(ModBuilder.metadata)
+
+    def run(self, config_builder, exp_builder, verbose=False, equilibrium_channels=None, **equilibrium_kwargs):
+        """
+        Run the burn-ins that are not cached yet
+        :param config_builder: config builder of the burn-in
+        :param exp_builder: ModBuilder with one ModFn list per burn-in, e.g. one per serialization seed
+        :param verbose: print progress of the burn-ins being run
+        :param equilibrium_channels: InsetChart channels checked for equilibrium; with several serialization time
+        steps (see equilibrium.candidate_serialization_days) the earliest one in equilibrium is used instead of the last
+        :param equilibrium_kwargs: equilibrium.equilibrium_day arguments, e.g. rtol
+        :return: burn-in descriptions in the order of the builder
+        """
+
+        burnins = []
+        missing = {}
+        for mod_fn_list in exp_builder.mod_generator:
+            digest, tags = self.burnin_digest(config_builder, mod_fn_list)
+            burnins.append((digest, tags))
+            if not self.serialized_files(digest):
+                missing[digest] = mod_fn_list
+
+        if missing:
+            runner = LocalExperimentRunner(experiment_dir=self.cache_dir, **self.runner_kwargs)
+            for digest, mod_fn_list in missing.items():
+                runner.simulations += runner.create_simulations(config_builder, digest,
+                                                                ModBuilder.from_list([mod_fn_list]))
+            if verbose:
+                distinct = len(set(digest for digest, tags in burnins))
+                print('Running %i of %i distinct burn-ins, %i cached' % (len(missing), distinct,
+                                                                          distinct - len(missing)))
+            if not runner.wait_for_finished(verbose=verbose):
+                failed = [sim.sim_dir for sim in runner.simulations if sim.status != 'Succeeded']
+                raise RuntimeError('Burn-ins failed: %s' % failed)
+
+        results = []
+        for digest, tags in burnins:
+            filenames = self.serialized_files(digest)
+            if not filenames:
+                raise FileNotFoundError('Burn-in %s did not write serialized files, check its serialization time steps'
+                                        % self.sim_dir(digest))
+            output_dir = os.path.abspath(os.path.join(self.sim_dir(digest), 'output'))
+            if equilibrium_channels:
+                equilibrium = inset_equilibrium_day(output_dir, equilibrium_channels, **equilibrium_kwargs)
+                day = serialization_day(equilibrium, serialized_states(output_dir))
+                filenames = find_serialized_files(output_dir, day)
+                if verbose:
+                    print('Burn-in %s: %s, serialized population of day %i' % (
+                        digest[:12], 'equilibrium from day %i' % equilibrium if equilibrium is not None
+                        else 'no equilibrium', day))
+            results.append(serialized_population(output_dir, filenames, digest, tags))
+
+        return results
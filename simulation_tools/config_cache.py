@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+
+def canonical_json(document):
+    return json.dumps(document, sort_keys=True, separators=(',', ':'))
+
+
+def document_digest(document):
+    return hashlib.sha1(canonical_json(document).encode()).hexdigest()
+
+
+def _parameters(config):
+    # config.json keeps its parameters under "parameters"
+    return config['parameters'] if 'parameters' in config else config
+
+
+def config_overlay(base, config):
+    """
+    Parameters of a config that differ from a base config
+    :param base: base config document
+    :param config: config document
+    :return: dictionary of changed or added parameters, with removed parameters listed under __removed__
+    """
+
+    base_params, params = _parameters(base), _parameters(config)
+    overlay = {k: v for k, v in params.items() if k not in base_params or base_params[k] != v}
+    removed = sorted(k for k in base_params if k not in params)
+    if removed:
+        overlay['__removed__'] = removed
+
+    return overlay
+
+
+def apply_overlay(base, overlay):
+    config = json.loads(json.dumps(base))
+    params = _parameters(config)
+    for k in overlay.get('__removed__', []):
+        params.pop(k, None)
+    params.update({k: v for k, v in overlay.items() if k != '__removed__'})
+
+    return config
+
+
+class ConfigCache(object):
+    """
+    Content-addressed store of the json files of a sweep's simulations.
+
+    Every file produced by DTKConfigBuilder.file_writer (campaign, custom reports, demographics overlays...) is hashed
+    and stored once as a blob; simulations reference blobs by digest. Configs are stored as one base config plus a
+    per-simulation overlay of the parameters that differ (usually just Run_Number and the swept parameters). The base
+    is the experiment's config before any ModFn, see set_base; a simulation's digest only depends on its own files.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.blob_dir = os.path.join(cache_dir, 'blobs')
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self.base_config = None
+        self.base_digest = None
+        self.stats = {'files': 0, 'bytes': 0, 'stored_files': 0, 'stored_bytes': 0}
+
+    def blob_path(self, digest):
+        return os.path.join(self.blob_dir, '%s.json' % digest)
+
+    def put(self, content):
+        """
+        :param content: json text
+        :return: digest of the stored blob
+        """
+
+        data = content.encode() if isinstance(content, str) else content
+        digest = hashlib.sha1(data).hexdigest()
+        path = self.blob_path(digest)
+        if not os.path.exists(path):
+            # a temporary file of its own, so runners storing the same blob at once never replace each other's
+            fd, tmp_path = tempfile.mkstemp(dir=self.blob_dir, prefix='.', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+            self.stats['stored_files'] += 1
+            self.stats['stored_bytes'] += len(data)
+
+        return digest
+
+    def load(self, digest):
+        with open(self.blob_path(digest)) as f:
+            return json.load(f)
+
+    def set_base(self, config):
+        """
+        :param config: config document the overlays are taken against, e.g. that of the experiment's config builder
+        before the simulations' ModFns; the first simulation's config if never set
+        """
+
+        self.base_config = config
+        self.base_digest = self.put(canonical_json(config))
+
+    def add_simulation(self, files):
+        """
+        Store the files of one simulation
+        :param files: dictionary of file name (config, campaign, ...) to json text
+        :return: manifest referencing the blobs, with the digest of the whole simulation under 'digest'
+        """
+
+        manifest = {}
+        contents = {}
+        for name, content in files.items():
+            self.stats['files'] += 1
+            self.stats['bytes'] += len(content)
+            if name != 'config':
+                manifest[name] = contents[name] = self.put(content)
+                continue
+
+            config = json.loads(content)
+            if self.base_config is None:
+                self.set_base(config)
+            manifest[name] = {'base': self.base_digest, 'overlay': config_overlay(self.base_config, config)}
+            contents[name] = document_digest(config)
+        # digest of the files themselves, so it does not change with the base the config is stored against
+        manifest['digest'] = document_digest(contents)
+
+        return manifest
+
+    def materialize(self, manifest, sim_dir):
+        """
+        Write the files of a simulation; shared files are hard links to the blobs where the file system allows it
+        :param manifest: manifest returned by add_simulation
+        :param sim_dir: simulation folder
+        """
+
+        for name, entry in manifest.items():
+            if name == 'digest':
+                continue
+            path = os.path.join(sim_dir, '%s.json' % name)
+            if os.path.exists(path):
+                os.remove(path)
+            if name == 'config':
+                with open(path, 'w') as f:
+                    json.dump(apply_overlay(self.load(entry['base']), entry['overlay']), f, indent=3, sort_keys=True)
+                continue
+            try:
+                os.link(self.blob_path(entry), path)
+            except OSError:
+                shutil.copyfile(self.blob_path(entry), path)
+        with open(os.path.join(sim_dir, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+    def summary(self):
+        return '%i files (%.1f MB) stored as %i new blobs (%.1f MB)' % (self.stats['files'], self.stats['bytes'] / 1e6,
+                                                                       self.stats['stored_files'],
+                                                                       self.stats['stored_bytes'] / 1e6)
@@ -0,0 +1,133 @@
+import json
+import os
+
+import numpy as np
+
+inset_channels = ('Adult Vectors', 'Blood Smear Parasite Prevalence')
+
+
+def candidate_serialization_days(num_years, every_years=5, first_year=None):
+    """
+    Serialization days to pass to add_SerializationTimesteps, so one burn-in leaves a population at several candidate
+    equilibrium times
+    :param num_years: burn-in duration
+    :param every_years: years between candidates
+    :param first_year: first candidate year, every_years if None
+    :return: list of days, always including the end of the burn-in
+    """
+
+    years = list(range(first_year or every_years, num_years, every_years)) + [num_years]
+
+    return [365 * year for year in years]
+
+
+def annual_means(series, days_per_year=365):
+    """
+    :param series: daily values
+    :param days_per_year: days averaged together, one seasonal cycle
+    :return: mean of each complete year
+    """
+
+    series = np.asarray(series, dtype=float)
+    n_years = len(series) // days_per_year
+
+    return series[:n_years * days_per_year].reshape(n_years, days_per_year).mean(axis=1)
+
+
+def change_point_statistic(values):
+    """
+    CUSUM statistic of a series: the largest cumulative deviation from its mean relative to its standard deviation
+    and length; above about 1.36 the series has a change in mean at the 5% level
+    :param values: e.g. annual means
+    :return: statistic, 0 for a constant series
+    """
+
+    values = np.asarray(values, dtype=float)
+    sd = values.std(ddof=1) if len(values) > 1 else 0.0
+    if sd == 0:
+        return 0.0
+
+    return np.abs(np.cumsum(values - values.mean())).max() / (sd * np.sqrt(len(values)))
+
+
+def trend_statistic(values):
+    """
+    :param values: e.g. annual means
+    :return: t statistic of the slope of a linear fit, inf for an exact trend and 0 for a constant series
+    """
+
+    values = np.asarray(values, dtype=float)
+    x = np.arange(len(values)) - (len(values) - 1) / 2.0
+    slope = (x * values).sum() / (x ** 2).sum()
+    residuals = values - values.mean() - slope * x
+    if len(values) < 3 or slope == 0:
+        return 0.0
+    se = np.sqrt((residuals ** 2).sum() / (len(values) - 2) / (x ** 2).sum())
+
+    return abs(slope) / se if se > 0 else np.inf
+
+
+def equilibrium_year(values, rtol=0.02, min_years=3, critical=1.36, max_trend=2.0):
+    """
+    Earliest year from which a series of annual means is in equilibrium until the end: the years from there on either
+    deviate from their mean by at most rtol, or show neither a change point nor a trend
+    :param values: annual means
+    :param rtol: relative deviation accepted as equilibrium
+    :param min_years: shortest tail of years that can be tested
+    :param critical: CUSUM critical value
+    :param max_trend: largest accepted t statistic of the slope
+    :return: index of the first year in equilibrium, None if no tail of at least min_years is
+    """
+
+    values = np.asarray(values, dtype=float)
+    for start in range(len(values) - min_years + 1):
+        tail = values[start:]
+        mean = tail.mean()
+        small = np.abs(tail - mean).max() <= rtol * abs(mean) if mean != 0 else np.all(tail == 0)
+        if small or (change_point_statistic(tail) <= critical and trend_statistic(tail) <= max_trend):
+            return start
+
+    return None
+
+
+def equilibrium_day(channels, days_per_year=365, **kwargs):
+    """
+    :param channels: dictionary of channel name to daily values, e.g. adult vectors and prevalence
+    :param days_per_year: days in one seasonal cycle
+    :param kwargs: equilibrium_year arguments
+    :return: earliest day from which every channel is in equilibrium, None if one of them never is
+    """
+
+    years = [equilibrium_year(annual_means(series, days_per_year), **kwargs) for series in channels.values()]
+    if any(year is None for year in years):
+        return None
+
+    return max(years) * days_per_year
+
+
+def inset_equilibrium_day(output_dir, channels=inset_channels, **kwargs):
+    """
+    :param output_dir: output folder of a burn-in holding InsetChart.json
+    :param channels: InsetChart channels that have to be in equilibrium
+    :param kwargs: equilibrium_day arguments
+    :return: earliest equilibrium day, None if not reached
+    """
+
+    with open(os.path.join(output_dir, 'InsetChart.json')) as f:
+        inset = json.load(f)
+
+    return equilibrium_day({ch: inset['Channels'][ch]['Data'] for ch in channels}, **kwargs)
+
+
+def serialization_day(equilibrium, days):
+    """
+    :param equilibrium: earliest equilibrium day, None if not reached
+    :param days: days with a serialized population
+    :return: earliest serialized day at or after equilibrium, the last day if equilibrium was not reached
+    """
+
+    days = sorted(days)
+    if equilibrium is None:
+        return days[-1]
+
+    return next((day for day in days if day >= equilibrium), days[-1])
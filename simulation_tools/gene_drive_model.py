@@ -0,0 +1,408 @@
+import numpy as np
+import pandas as pd
+
+FEMALE, MALE = 0, 1
+
+
+def point_from_species_params(species_params):
+    """
+    Convert one entry of Vector_Species_Params, as written by set_species_genes, set_species_drivers and
+    set_species_trait_modifiers, into a parameter point
+    :param species_params: species parameter dictionary from a config
+    :return: dictionary with genes, drivers and traits keyed by species, as passed to the set_species_* functions
+    """
+
+    species = species_params['Name']
+    return {'genes': {species: species_params.get('Genes', [])},
+            'drivers': {species: species_params.get('Drivers', [])},
+            'traits': {species: species_params.get('Gene_To_Trait_Modifiers', [])}}
+
+
+def _combination_matches(combination, alleles, sex):
+    """
+    Does an Allele_Combinations entry, e.g. [['a0', 'a1']] or [['X', 'Y'], ['a1', '*']], apply to a genotype
+    """
+
+    for pair in combination:
+        if set(pair) <= {'X', 'Y'}:
+            if sorted(pair) != (['X', 'X'] if sex == FEMALE else ['X', 'Y']):
+                return False
+            continue
+        wanted = [a for a in pair if a != '*']
+        remaining = list(alleles)
+        for a in wanted:
+            if a not in remaining:
+                return False
+            remaining.remove(a)
+
+    return True
+
+
+def compile_points(species, points):
+    """
+    Turn gene specifications into the arrays used by the model, one row per parameter point
+    :param species: species name, e.g. 'arabiensis'
+    :param points: list of dictionaries with 'genes', 'drivers' and 'traits' in the format passed to
+    set_species_genes, set_species_drivers (CLASSIC drivers) and set_species_trait_modifiers
+    (MORTALITY and TRANSMISSION_TO_HUMAN are used); only one gene per species is supported
+    :return: dictionary of model arrays
+    """
+
+    alleles = []
+    for point in points:
+        genes = point['genes'][species]
+        if len(genes) != 1:
+            raise ValueError('Only a single gene per species is supported, got %i' % len(genes))
+        alleles += [a for a in genes[0]['Alleles'] if a not in alleles]
+    n_alleles = len(alleles)
+    position = {a: i for i, a in enumerate(alleles)}
+
+    # unordered diploid genotypes; allele_i <= allele_j
+    gi, gj = np.triu_indices(n_alleles)
+    genomes = ['X-%s:X-%s' % (alleles[i], alleles[j]) for i, j in zip(gi, gj)]
+    n_points, n_genotypes = len(points), len(genomes)
+
+    initial = np.zeros((n_points, n_alleles))
+    gametes = np.zeros((n_points, n_genotypes, n_alleles))
+    mortality = np.ones((n_points, 2, n_genotypes))
+    transmission = np.ones((n_points, n_genotypes))
+    for p, point in enumerate(points):
+        gene = point['genes'][species][0]
+        for a, freq in gene['Alleles'].items():
+            initial[p, position[a]] = freq
+
+        # Mendelian segregation, then CLASSIC drive conversion in the germline of drive carriers
+        for g, (i, j) in enumerate(zip(gi, gj)):
+            gametes[p, g, i] += 0.5
+            gametes[p, g, j] += 0.5
+        for driver in point.get('drivers', {}).get(species, []):
+            if driver.get('Driver_Type', 'CLASSIC') != 'CLASSIC':
+                raise ValueError('Only CLASSIC drivers are supported')
+            driving = position[driver['Driving_Allele']]
+            for driven in driver['Alleles_Driven']:
+                copy_allele = position[driven['Allele_To_Copy']]
+                replace = position[driven['Allele_To_Replace']]
+                for g, (i, j) in enumerate(zip(gi, gj)):
+                    if driving not in (i, j) or sorted((i, j)) != sorted((copy_allele, replace)):
+                        continue
+                    gametes[p, g, replace] -= 0.5
+                    for a, likelihood in driven['Copy_To_Likelihood'].items():
+                        gametes[p, g, position[a]] += 0.5 * likelihood
+
+        # mutation of gametes, 'a0:a1' is the rate from a0 to a1
+        mutation = np.eye(n_alleles)
+        for pair, rate in gene.get('Mutations', {}).items():
+            source, target = (position[a] for a in pair.split(':'))
+            mutation[source, target] += rate
+            mutation[source, source] -= rate
+        gametes[p] = gametes[p] @ mutation
+
+        for modifier in point.get('traits', {}).get(species, []):
+            for g, (i, j) in enumerate(zip(gi, gj)):
+                for sex in (FEMALE, MALE):
+                    if not _combination_matches(modifier['Allele_Combinations'], (alleles[i], alleles[j]), sex):
+                        continue
+                    traits = modifier['Trait_Modifiers']
+                    mortality[p, sex, g] *= traits.get('MORTALITY', 1.0)
+                    if sex == FEMALE:
+                        transmission[p, g] *= traits.get('TRANSMISSION_TO_HUMAN', 1.0)
+
+    return {'alleles': alleles, 'genomes': genomes, 'gi': gi, 'gj': gj, 'initial': initial, 'gametes': gametes,
+            'mortality': mortality, 'transmission': transmission}
+
+
+def offspring_genotypes(model, females, males):
+    """
+    Genotype distribution of offspring from random mating, for any leading batch dimensions
+    :param model: compiled arrays from compile_points
+    :param females: (..., point, genotype) female counts
+    :param males: (..., point, genotype) male counts
+    :return: (..., point, genotype) offspring genotype probabilities
+    """
+
+    def gamete_pool(adults):
+        pool = np.einsum('...pg,pga->...pa', adults, model['gametes'])
+        total = pool.sum(axis=-1, keepdims=True)
+        return np.divide(pool, total, out=np.zeros_like(pool), where=total > 0)
+
+    f, m = gamete_pool(females), gamete_pool(males)
+    gi, gj = model['gi'], model['gj']
+    probabilities = f[..., gi] * m[..., gj] + (gi != gj) * f[..., gj] * m[..., gi]
+
+    return probabilities
+
+
+def equilibrium_adults(capacity, eggs_per_day, life_expectancy):
+    """
+    Adults of each sex at equilibrium, where daily emergence capacity * E / (capacity + E) from E eggs
+    balances daily adult deaths
+    """
+
+    death = 1 - np.exp(-1.0 / np.array(life_expectancy, dtype=float))
+    females = capacity * (0.5 * eggs_per_day / death[FEMALE] - 1) / eggs_per_day
+    if np.any(females <= 0):
+        raise ValueError('Population cannot persist with these life history parameters')
+
+    return females, females * death[FEMALE] / death[MALE]
+
+
+def _migrate(migration, adults, stochastic, rng):
+    """
+    Move adults (..., node, point, genotype) between nodes for one day with a sparse product over the node axis
+    """
+
+    shape = np.moveaxis(adults, -3, 0).shape
+    if stochastic:
+        # the number leaving each node is drawn, arrivals are spread over destinations in expectation and
+        # rounded at random
+        leaving = rng.binomial(adults.astype(np.int64), migration['leave'][:, None, None])
+        arriving = (migration['destinations'] @ np.moveaxis(leaving, -3, 0).reshape(shape[0], -1)).reshape(shape)
+        arriving = np.moveaxis(arriving, 0, -3)
+        whole = np.floor(arriving)
+        return adults - leaving + whole + rng.binomial(1, arriving - whole)
+
+    moved = migration['operator'] @ np.moveaxis(adults, -3, 0).reshape(shape[0], -1)
+    return np.moveaxis(moved.reshape(shape), 0, -3)
+
+
+def _record(output, name, day, values, reduce_replicates):
+    index = (Ellipsis, day, slice(None)) if name == 'fractions' else (Ellipsis, day)
+    if reduce_replicates:
+        output[name][index] = values.mean(axis=0)
+        output[name + '_std'][index] = values.std(axis=0)
+    else:
+        output[name][index] = values
+
+
+def simulate(model, days, releases=(), capacity=10000, female_life_expectancy=10, male_life_expectancy=5,
+             eggs_per_day=100 / 3.0, immature_duration=10, stochastic=False, rng=None, batch_shape=(),
+             reduce_replicates=False, migration=None, female_survival=None, seasonality=None):
+    """
+    Daily compartmental model of adult vectors by sex and genotype with delayed, density dependent emergence
+    :param model: compiled arrays from compile_points
+    :param days: number of days to simulate
+    :param releases: list of dictionaries with start_day, number and released_genome, as used by
+    add_mosquito_release, e.g. {'start_day': 200, 'number': 1000, 'released_genome': [['X', 'Y'], ['a1', 'a1']]}
+    :param capacity: Beverton-Holt emergence capacity per day; one value per node for spatial runs
+    :param female_life_expectancy: female adult life expectancy in days
+    :param male_life_expectancy: male adult life expectancy in days
+    :param eggs_per_day: eggs laid per female per day
+    :param immature_duration: days from egg to adult
+    :param stochastic: use binomial, Poisson and multinomial draws instead of expected values
+    :param rng: numpy Generator, or ReplicateStreams for per-replicate random streams, for stochastic runs
+    :param batch_shape: extra leading dimensions of the state, e.g. (replicates,)
+    :param reduce_replicates: the first batch dimension holds replicates; only keep their mean and standard
+    deviation (as *_std entries) instead of every trajectory
+    :param migration: daily adult movement between nodes from load_migration in spatial_gene_drive/migration_file.py;
+    adds a node dimension before the point dimension and releases go to the nodeIDs listed in each release
+    :param female_survival: optional (point, day, genotype) daily multiplier of female survival, e.g. the killing of
+    insecticide treated nets from single_node_simulations/insecticide_resistance_model.py
+    :param seasonality: optional (day,) multiplier of the emergence capacity, e.g. a larval habitat spline
+    :return: dictionary with genomes, female genotype fractions (..., [node,] point, day, genotype), female
+    population (..., [node,] point, day) and transmission, the genotype-weighted mean TRANSMISSION_TO_HUMAN of
+    females; nodeids for spatial runs
+    """
+
+    rng = rng if rng is not None else np.random.default_rng()
+    n_points, n_genotypes = model['initial'].shape[0], len(model['genomes'])
+    capacity = np.asarray(capacity, dtype=float)
+    if migration is not None:
+        capacity = np.broadcast_to(capacity, (len(migration['nodeids']),))
+        # node ids are in the NodeOffsets order of the migration file, which need not be sorted
+        node_position = {nodeid: i for i, nodeid in enumerate(np.asarray(migration['nodeids']).tolist())}
+    shape = tuple(batch_shape) + capacity.shape + (n_points, n_genotypes)
+    life_expectancy = (female_life_expectancy, male_life_expectancy)
+    survival = np.exp(-model['mortality'] / np.array(life_expectancy)[None, :, None])
+
+    # start at equilibrium in Hardy-Weinberg proportions
+    n_female, n_male = equilibrium_adults(capacity[..., None, None], eggs_per_day, life_expectancy)
+    hardy_weinberg = model['initial'][:, model['gi']] * model['initial'][:, model['gj']] * \
+        np.where(model['gi'] != model['gj'], 2, 1)
+    females = np.broadcast_to(n_female * hardy_weinberg, shape).copy()
+    males = np.broadcast_to(n_male * hardy_weinberg, shape).copy()
+    # emerging adults by day in the development pipeline and sex
+    emerging = np.zeros((immature_duration, 2) + shape)
+    emerging[:] = n_female * (1 - np.exp(-1.0 / female_life_expectancy)) * hardy_weinberg
+    capacity = capacity[..., None]
+    if stochastic:
+        females, males, emerging = np.round(females), np.round(males), np.round(emerging)
+
+    release_genotypes = []
+    for release in releases:
+        sex_pair, allele_pair = release['released_genome']
+        sex = MALE if 'Y' in sex_pair else FEMALE
+        genome = 'X-%s:X-%s' % tuple(sorted(allele_pair, key=model['alleles'].index))
+        index = (Ellipsis, model['genomes'].index(genome))
+        if migration is not None:
+            missing = [nodeid for nodeid in release['nodeIDs'] if nodeid not in node_position]
+            if missing:
+                raise KeyError('Release nodes not in the migration file: %s' % missing)
+            nodes = [node_position[nodeid] for nodeid in release['nodeIDs']]
+            index = (Ellipsis, nodes, slice(None), index[-1])
+        release_genotypes.append((release['start_day'], sex, index, release['number']))
+
+    output_shape = tuple(batch_shape[1:] if reduce_replicates else batch_shape) + capacity.shape[:-1] + \
+        (n_points, days)
+    output = {name: np.zeros(output_shape + extra) for name, extra in
+              [('fractions', (n_genotypes,)), ('population', ()), ('transmission', ())]}
+    if reduce_replicates:
+        output.update({name + '_std': np.zeros_like(output[name]) for name in list(output)})
+    for day in range(days):
+        for start_day, sex, index, number in release_genotypes:
+            if start_day == day:
+                (females if sex == FEMALE else males)[index] += number
+
+        # eggs laid today emerge as adults immature_duration days later
+        slot = day % immature_duration
+        eggs = females.sum(axis=-1) * eggs_per_day
+        offspring = offspring_genotypes(model, females, males)
+        day_capacity = capacity * seasonality[day] if seasonality is not None else capacity
+        female_survival_today = survival[:, FEMALE] * female_survival[:, day] if female_survival is not None \
+            else survival[:, FEMALE]
+        if stochastic:
+            eggs = rng.poisson(eggs)
+            recruits = rng.binomial(eggs, day_capacity / (day_capacity + eggs))
+            # without males there are no offspring; multinomial would put every recruit in the last genotype
+            recruits = np.where(offspring.sum(axis=-1) > 0, recruits, 0)
+            offspring = offspring / np.maximum(offspring.sum(axis=-1, keepdims=True), 1e-12)
+            recruits = rng.multinomial(recruits, offspring)
+            new_females = rng.binomial(recruits, 0.5)
+            new_males = recruits - new_females
+            females = rng.binomial(females.astype(np.int64), female_survival_today) + emerging[slot, FEMALE]
+            males = rng.binomial(males.astype(np.int64), survival[:, MALE]) + emerging[slot, MALE]
+        else:
+            recruits = (eggs * day_capacity / (day_capacity + eggs))[..., None] * offspring
+            new_females = new_males = recruits / 2
+            females = females * female_survival_today + emerging[slot, FEMALE]
+            males = males * survival[:, MALE] + emerging[slot, MALE]
+        emerging[slot, FEMALE] = new_females
+        emerging[slot, MALE] = new_males
+        if migration is not None:
+            females = _migrate(migration, females, stochastic, rng)
+            males = _migrate(migration, males, stochastic, rng)
+
+        total = females.sum(axis=-1)
+        fractions = np.divide(females, total[..., None], out=np.zeros(shape), where=total[..., None] > 0)
+        for name, values in [('fractions', fractions), ('population', total),
+                             ('transmission', (fractions * model['transmission']).sum(axis=-1))]:
+            _record(output, name, day, values, reduce_replicates)
+
+    output['genomes'] = model['genomes']
+    if migration is not None:
+        output['nodeids'] = migration['nodeids']
+    return output
+
+
+def to_dataframe(result, tags):
+    """
+    Long format output matching the columns of GMEstablishmentAnalyzer
+    :param result: output of simulate without batch dimensions
+    :param tags: list of dictionaries of sweep tags, one per parameter point
+    :return: dataframe with the tags, Time, NodeID for spatial runs, one column per genome, Female_Population and
+    Transmission
+    """
+
+    *leading, days, n_genotypes = result['fractions'].shape
+    n_rows = int(np.prod(leading))
+    df = pd.DataFrame(result['fractions'].reshape(-1, n_genotypes), columns=result['genomes'])
+    df['Female_Population'] = result['population'].ravel()
+    df['Transmission'] = result['transmission'].ravel()
+    df['Time'] = np.tile(np.arange(days), n_rows)
+    tag_frame = pd.DataFrame(tags)
+    for column in tag_frame.columns:
+        df[column] = np.tile(np.repeat(tag_frame[column].values, days), n_rows // len(tag_frame))
+    node_column = []
+    if 'nodeids' in result:
+        df['NodeID'] = np.repeat(result['nodeids'], n_rows // len(result['nodeids']) * days)
+        node_column = ['NodeID']
+
+    return df[list(tag_frame.columns) + ['Time'] + node_column + result['genomes'] +
+              ['Female_Population', 'Transmission']]
+
+
+class ReplicateStreams(object):
+    """
+    Random draws for a batch of replicates, each from its own Generator seeded by its Run_Number.
+
+    A replicate reproduces the same trajectory whatever else is in the batch; every draw is vectorised over all
+    parameter points and genotypes of a replicate. Arrays passed in have the replicate as their first dimension
+    or broadcast against it.
+    """
+
+    def __init__(self, run_numbers, seed=0):
+        self.generators = [np.random.default_rng(np.random.SeedSequence([seed, int(run_number)]))
+                           for run_number in run_numbers]
+
+    def _draw(self, method, *args):
+        shape = np.broadcast_shapes(*[np.shape(a) for a in args])
+        args = [np.broadcast_to(a, shape) for a in args]
+        return np.stack([getattr(g, method)(*[a[k] for a in args]) for k, g in enumerate(self.generators)])
+
+    def poisson(self, lam):
+        return self._draw('poisson', lam)
+
+    def binomial(self, n, p):
+        return self._draw('binomial', n, p)
+
+    def multinomial(self, n, pvals):
+        return np.stack([g.multinomial(n[k], pvals[k]) for k, g in enumerate(self.generators)])
+
+
+def simulate_ensemble(model, days, run_numbers, tags, seed=0, **kwargs):
+    """
+    Stochastic ensemble of every replicate and parameter point advanced together as one
+    (replicate, point, genotype) state
+    :param model: compiled arrays from compile_points
+    :param days: number of days to simulate
+    :param run_numbers: Run_Number of each replicate, e.g. range(num_seeds)
+    :param tags: list of dictionaries of sweep tags, one per parameter point
+    :param seed: base seed combined with each Run_Number
+    :param kwargs: other arguments of simulate
+    :return: dataframe of the replicate mean and standard deviation per point and Time, in the format written by
+    GMEstablishmentAnalyzer.finalize
+    """
+
+    result = simulate(model, days, stochastic=True, rng=ReplicateStreams(run_numbers, seed),
+                      batch_shape=(len(run_numbers),), reduce_replicates=True, **kwargs)
+    df = to_dataframe(result, tags)
+    for i, genome in enumerate(result['genomes']):
+        df[genome + '_std'] = result['fractions_std'][..., i].ravel()
+    df['Female_Population_std'] = result['population_std'].ravel()
+    df['Transmission_std'] = result['transmission_std'].ravel()
+
+    return df
+
+
+if __name__ == "__main__":
+
+    # screen the copy likelihood x fitness cost grid of single_node_gene_drive_fitness_cost.py
+    species = 'arabiensis'
+    copy_to_likelihoods = np.arange(0.5, 1.01, 0.05).tolist()
+    mortality = np.arange(1.0, 2.01, 0.05).tolist()
+
+    points, tags = [], []
+    for likelihood in copy_to_likelihoods:
+        for m in mortality:
+            points.append({
+                'genes': {species: [{"Alleles": {"a0": 1.0, "a1": 0.0}, "Mutations": {"a0:a1": 0.0, "a1:a0": 0.0}}]},
+                'drivers': {species: [{
+                    "Alleles_Driven": [
+                        {"Allele_To_Copy": "a1",
+                         "Allele_To_Replace": "a0",
+                         "Copy_To_Likelihood": {"a0": 1 - likelihood, "a1": likelihood}
+                         }],
+                    "Driver_Type": "CLASSIC",
+                    "Driving_Allele": "a1"
+                }]},
+                'traits': {species: [
+                    {"Allele_Combinations": [["a0", "a1"]], "Trait_Modifiers": {"MORTALITY": m}},
+                    {"Allele_Combinations": [["a1", "a1"]], "Trait_Modifiers": {"MORTALITY": m}}
+                ]}
+            })
+            tags.append({'Copy_To_Likelihood': likelihood, 'Mortality': m})
+
+    result = simulate(compile_points(species, points), days=365 * 10,
+                      releases=[{'start_day': 200, 'number': 1000, 'released_genome': [['X', 'Y'], ['a1', 'a1']]}],
+                      female_life_expectancy=10, male_life_expectancy=5)
+    df = to_dataframe(result, tags)
+    df[df['Time'] == df['Time'].max()].to_csv('gene_drive_screen.csv', index=False)
@@ -0,0 +1,239 @@
+import copy
+import glob
+import json
+import os
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from simtools.ModBuilder import ModBuilder
+
+from simulation_tools.config_cache import ConfigCache
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class LocalExperiment(object):
+
+    def __init__(self, exp_name, exp_dir):
+        self.exp_name = exp_name
+        self.exp_dir = exp_dir
+
+
+class LocalSimulation(object):
+    """
+    A simulation materialized on local disk; exposes id, tags and experiment like a COMPS simulation so the
+    existing analyzers can be used unchanged.
+    """
+
+    def __init__(self, sim_dir, experiment):
+        self.sim_dir = sim_dir
+        self.id = os.path.basename(sim_dir)
+        self.experiment = experiment
+        with open(os.path.join(sim_dir, 'tags.json')) as f:
+            self.tags = json.load(f)
+        self.num_cores = self.tags.pop('__num_cores__', 1)
+        self.process = None
+        self.log_files = ()
+        self.status = 'Created'
+
+    def __repr__(self):
+        return self.id
+
+
+def find_executable(exe_dir=os.path.join(repo_dir, 'EXE')):
+    for name in ['Eradication', 'Eradication.exe']:
+        if os.path.exists(os.path.join(exe_dir, name)):
+            return os.path.join(exe_dir, name)
+    raise FileNotFoundError('No Eradication executable in %s' % exe_dir)
+
+
+class LocalExperimentRunner(object):
+    """
+    Stand-in for the COMPS experiment manager that runs Eradication on local cores.
+
+    run_simulations takes the same config_builder/exp_name/exp_builder arguments. Every simulation gets its own
+    folder with config.json, campaign.json and tags.json, and writes its reports to output/ exactly as on COMPS.
+    Simulations are packed onto max_cores so that the Num_Cores of MPI runs is respected.
+
+    With a config_cache directory, the json files are stored once per distinct content (see config_cache.py) and
+    simulations that already succeeded with identical files are not run again; with verbose=True the cache summary is
+    printed after the simulations are created.
+    """
+
+    def __init__(self, experiment_dir, input_dir=os.path.join(repo_dir, 'input_files'), exe_path=None,
+                 max_cores=None, mpi_command='mpiexec', poll_interval=1.0, config_cache=None, verbose=False):
+        self.experiment_dir = experiment_dir
+        self.input_dir = os.path.abspath(input_dir)
+        self.exe_path = os.path.abspath(exe_path or find_executable())
+        self.max_cores = max_cores or os.cpu_count() or 1
+        self.mpi_command = mpi_command
+        self.poll_interval = poll_interval
+        self.config_cache = ConfigCache(config_cache) if config_cache else None
+        self.verbose = verbose
+        self.simulations = []
+
+    def create_simulations(self, config_builder, exp_name, exp_builder):
+        """
+        Apply every ModFn list of the builder to a copy of the config builder and write the simulation folders
+        :return: list of LocalSimulation
+        """
+
+        exp_dir = os.path.join(self.experiment_dir, exp_name)
+        experiment = LocalExperiment(exp_name, exp_dir)
+        simulations = []
+        if self.config_cache is not None:
+            base_files = {}
+            config_builder.file_writer(lambda name, content: base_files.update({name: content}))
+            self.config_cache.set_base(json.loads(base_files['config']))
+        for i, mod_fn_list in enumerate(exp_builder.mod_generator):
+            ModBuilder.metadata = {}
+            cb = copy.deepcopy(config_builder)
+            for fn in mod_fn_list:
+                fn(cb)
+
+            sim_dir = os.path.join(exp_dir, 'sim_%05d' % i)
+            os.makedirs(os.path.join(sim_dir, 'output'), exist_ok=True)
+            done = False
+            if self.config_cache is None:
+                cb.dump_files(sim_dir)
+            else:
+                files = {}
+                cb.file_writer(lambda name, content: files.update({name: content}))
+                manifest = self.config_cache.add_simulation(files)
+                done = self._succeeded(sim_dir, manifest['digest'])
+                if not done:
+                    self.config_cache.materialize(manifest, sim_dir)
+            tags = dict(ModBuilder.metadata, __num_cores__=int(cb.get_param('Num_Cores', 1) or 1))
+            with open(os.path.join(sim_dir, 'tags.json'), 'w') as f:
+                json.dump(tags, f, indent=2)
+            simulation = LocalSimulation(sim_dir, experiment)
+            if done:
+                simulation.status = 'Succeeded'
+            simulations.append(simulation)
+        if self.verbose and self.config_cache is not None:
+            print(self.config_cache.summary())
+
+        too_large = [sim for sim in simulations if sim.num_cores > self.max_cores]
+        if too_large:
+            raise ValueError('%i simulations need more than the %i available cores'
+                             % (len(too_large), self.max_cores))
+
+        return simulations
+
+    @staticmethod
+    def _succeeded(sim_dir, digest):
+        # an earlier run of the same experiment already produced the outputs of these exact files
+        try:
+            with open(os.path.join(sim_dir, 'manifest.json')) as f:
+                manifest = json.load(f)
+            with open(os.path.join(sim_dir, 'status.txt')) as f:
+                status = f.read().split()[0]
+        except (OSError, ValueError, IndexError):
+            return False
+
+        return manifest.get('digest') == digest and status == 'Succeeded'
+
+    def command(self, simulation):
+        command = [self.exe_path, '--config', 'config.json', '--input-path', self.input_dir,
+                   '--output-path', 'output']
+        if simulation.num_cores > 1:
+            command = [self.mpi_command, '-n', str(simulation.num_cores)] + command
+
+        return command
+
+    def _launch(self, simulation):
+        stdout = open(os.path.join(simulation.sim_dir, 'StdOut.txt'), 'w')
+        stderr = open(os.path.join(simulation.sim_dir, 'StdErr.txt'), 'w')
+        simulation.process = subprocess.Popen(self.command(simulation), cwd=simulation.sim_dir,
+                                              stdout=stdout, stderr=stderr)
+        simulation.log_files = (stdout, stderr)
+        simulation.status = 'Running'
+
+    def _finish(self, simulation, return_code):
+        for f in simulation.log_files:
+            f.close()
+        simulation.status = 'Succeeded' if return_code == 0 else 'Failed'
+        with open(os.path.join(simulation.sim_dir, 'status.txt'), 'w') as f:
+            f.write('%s %i\n' % (simulation.status, return_code))
+
+    def run_simulations(self, config_builder, exp_name, exp_builder):
+        self.simulations = self.create_simulations(config_builder, exp_name, exp_builder)
+
+        return self.simulations
+
+    def wait_for_finished(self, verbose=False):
+        """
+        Run every created simulation, keeping the cores in use at or below max_cores
+        :param verbose: print progress whenever a simulation finishes
+        :return: True if every simulation succeeded
+        """
+
+        # largest jobs first so MPI runs are not starved by a stream of single core runs
+        pending = sorted([sim for sim in self.simulations if sim.status == 'Created'],
+                         key=lambda sim: -sim.num_cores)
+        running = []
+        while pending or running:
+            free_cores = self.max_cores - sum(sim.num_cores for sim in running)
+            for sim in list(pending):
+                if sim.num_cores <= free_cores:
+                    self._launch(sim)
+                    pending.remove(sim)
+                    running.append(sim)
+                    free_cores -= sim.num_cores
+
+            time.sleep(self.poll_interval)
+            for sim in list(running):
+                return_code = sim.process.poll()
+                if return_code is not None:
+                    self._finish(sim, return_code)
+                    running.remove(sim)
+                    if verbose:
+                        done = len([s for s in self.simulations if s.status in ['Succeeded', 'Failed']])
+                        print('%s %s (%i/%i)' % (sim.id, sim.status, done, len(self.simulations)))
+
+        return all(sim.status == 'Succeeded' for sim in self.simulations)
+
+
+def load_local_experiment(exp_dir):
+    experiment = LocalExperiment(os.path.basename(os.path.normpath(exp_dir)), exp_dir)
+    return [LocalSimulation(sim_dir, experiment) for sim_dir in sorted(glob.glob(os.path.join(exp_dir, 'sim_*')))]
+
+
+def read_simulation_files(simulation, filenames, parse=True):
+    data = {}
+    for filename in filenames:
+        path = os.path.join(simulation.sim_dir, filename)
+        if parse and filename.endswith('.csv'):
+            data[filename] = pd.read_csv(path)
+        elif parse and filename.endswith('.json'):
+            with open(path) as f:
+                data[filename] = json.load(f)
+        else:
+            with open(path, 'rb') as f:
+                data[filename] = f.read()
+
+    return data
+
+
+def _select(args):
+    analyzer, simulation = args
+    return analyzer.select_simulation_data(read_simulation_files(simulation, analyzer.filenames, analyzer.parse),
+                                           simulation)
+
+
+def analyze_local(exp_dir, analyzers, processes=None):
+    """
+    Run analyzers over a locally run experiment the way AnalyzeManager does for COMPS experiments
+    :param exp_dir: experiment folder written by LocalExperimentRunner
+    :param analyzers: analyzer instances
+    :param processes: number of worker processes for select_simulation_data
+    """
+
+    simulations = load_local_experiment(exp_dir)
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        for analyzer in analyzers:
+            selected = [sim for sim in simulations if analyzer.filter(sim)]
+            all_data = dict(zip(selected, pool.map(_select, [(analyzer, sim) for sim in selected])))
+            analyzer.finalize(all_data)
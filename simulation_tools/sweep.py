@@ -0,0 +1,229 @@
+import itertools
+
+import numpy as np
+from dtk.utils.core.DTKConfigBuilder import DTKConfigBuilder
+from simtools.ModBuilder import ModBuilder, ModFn
+
+
+class SweepVar(object):
+    """
+    Placeholder for the value of a sweep variable in the arguments of a ModSpec
+    """
+
+    def __init__(self, name, transform=None):
+        """
+        :param name: sweep variable, e.g. net_coverage
+        :param transform: optional function applied to the value, e.g. lambda x: x + 3 * 365
+        """
+
+        self.name = name
+        self.transform = transform
+
+    def resolve(self, point):
+        value = point[self.name]
+        return self.transform(value) if self.transform else value
+
+    def __repr__(self):
+        return 'SweepVar(%r)' % self.name
+
+
+class ModSpec(object):
+    """
+    ModFn template taking the same arguments as ModFn; SweepVar arguments are filled in from each point of the sweep
+    """
+
+    def __init__(self, func, *args, **kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+    def resolve(self, point):
+        args = tuple(x.resolve(point) if isinstance(x, SweepVar) else x for x in self.args)
+        kwargs = {k: v.resolve(point) if isinstance(v, SweepVar) else v for k, v in self.kwargs.items()}
+
+        return args, kwargs
+
+
+def tag_simulation(cb, **tags):
+    return tags
+
+
+def _freeze(value):
+    # hashable form of resolved ModFn arguments, used to recognize identical configurations
+    if callable(value):
+        # by identity: two lambdas of one scope share a __qualname__ but are different functions
+        return 'callable', id(value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return tuple(_freeze(x) for x in value)
+    if isinstance(value, np.generic):
+        return value.item()
+
+    return value
+
+
+class Arm(object):
+
+    def __init__(self, name, mods, factors=None, design=None):
+        """
+        :param name: arm name, e.g. VC_and_GM
+        :param mods: ModSpec list applied to every simulation of the arm
+        :param factors: dictionary of sweep variable to values, expanded as a full factorial with the first variable
+        varying slowest, as in nested list comprehensions
+        :param design: alternatively a list of points (dictionaries of sweep variable to value), e.g. a Latin
+        hypercube sample
+        """
+
+        if factors is not None and design is not None:
+            raise ValueError('Arm %s takes either factors or a design, not both' % name)
+        self.name = name
+        self.mods = list(mods)
+        self.factors = {k: list(v) for k, v in (factors or {}).items()}
+        self.design = design
+
+    def __len__(self):
+        if self.design is not None:
+            return len(self.design)
+
+        return int(np.prod([len(values) for values in self.factors.values()]))
+
+    def points(self):
+        if self.design is not None:
+            return iter(self.design)
+        names = list(self.factors)
+
+        return (dict(zip(names, values)) for values in itertools.product(*self.factors.values()))
+
+
+class Sweep(object):
+    """
+    Declarative sweep of arms x factors x seeds that expands lazily into ModFn lists.
+
+    Every simulation starts with ModFn(DTKConfigBuilder.set_param, 'Run_Number', seed), followed by the arm's ModSpecs
+    filled in from one point of the arm. Simulations are generated arm by arm, seed by seed, so the order matches the
+    hand-written list comprehensions. A configuration an arm already generated is skipped, and with dedupe_arms also
+    one generated by an earlier arm. The size is known before anything is expanded.
+    """
+
+    def __init__(self, seeds, seed_variable='Run_Number', arm_tag=None, dedupe_arms=False):
+        """
+        :param seeds: run numbers, e.g. range(num_seeds)
+        :param seed_variable: config parameter and sweep variable holding the seed
+        :param arm_tag: if set, tag every simulation with its arm name under this tag, e.g. Experiment
+        :param dedupe_arms: also skip configurations generated by an earlier arm. The simulation that is kept is
+        tagged with the later arms' names under e.g. Experiment_Duplicates, but the analyzers group it under its own
+        arm only, so outputs grouped by the arm tag miss the later arms' points; off by default
+        """
+
+        self.seeds = list(seeds)
+        self.seed_variable = seed_variable
+        self.arm_tag = arm_tag
+        self.dedupe_arms = dedupe_arms
+        self.arms = []
+        self.duplicates = {}
+
+    def add_arm(self, name, mods, factors=None, design=None):
+        """
+        :param name: arm name, e.g. VC_and_GM
+        :param mods: ModSpec list applied to every simulation of the arm
+        :param factors: dictionary of sweep variable to values, expanded as a full factorial
+        :param design: alternatively a list of points (dictionaries of sweep variable to value)
+        :return: the sweep, so arms can be chained
+        """
+
+        if name in [arm.name for arm in self.arms]:
+            raise ValueError('Sweep already has an arm named %s' % name)
+        self.arms.append(Arm(name, mods, factors=factors, design=design))
+
+        return self
+
+    def _select(self, arms):
+        if arms is None:
+            return self.arms
+        missing = set(arms) - set(arm.name for arm in self.arms)
+        if missing:
+            raise KeyError('Arms %s are not in the sweep' % sorted(missing))
+
+        return [arm for arm in self.arms if arm.name in arms]
+
+    def size(self, arms=None):
+        """
+        :param arms: names of the arms to count, every arm if None
+        :return: number of simulations before duplicate configurations are removed
+        """
+
+        return len(self.seeds) * sum(len(arm) for arm in self._select(arms))
+
+    def _configurations(self, arms):
+        # (arm, seed, resolved ModSpecs, configuration key) of every simulation, in the order they are generated
+        for arm in self._select(arms):
+            for seed in self.seeds:
+                for point in arm.points():
+                    point = dict(point, **{self.seed_variable: seed})
+                    resolved = [(spec.func,) + spec.resolve(point) for spec in arm.mods]
+                    yield arm, seed, resolved, (seed, _freeze(resolved))
+
+    def arm_overlaps(self, arms=None):
+        """
+        :param arms: names of the arms to compare, every arm if None
+        :return: dictionary of configuration key to the names of the arms generating it, in generation order, for the
+        configurations generated by more than one arm
+        """
+
+        arm_names = {}
+        for arm, seed, resolved, key in self._configurations(arms):
+            arm_names.setdefault(key, []).append(arm.name)
+
+        return {key: list(dict.fromkeys(names)) for key, names in arm_names.items() if len(set(names)) > 1}
+
+    def describe(self, arms=None):
+        lines = ['%s: %i points x %i seeds = %i simulations' % (arm.name, len(arm), len(self.seeds),
+                                                                 len(arm) * len(self.seeds))
+                 for arm in self._select(arms)]
+        lost = {}
+        for names in self.arm_overlaps(arms).values():
+            for name in names[1:]:
+                lost[(name, names[0])] = lost.get((name, names[0]), 0) + 1
+        outcome = 'are not run separately' if self.dedupe_arms else 'are run in both arms'
+        lines += ['%s: %i simulations repeat configurations of %s and %s' % (name, n, kept, outcome)
+                  for (name, kept), n in sorted(lost.items())]
+        lines.append('Total: %i simulations before removing duplicate configurations' % self.size(arms))
+
+        return '\n'.join(lines)
+
+    def mod_generator(self, arms=None):
+        """
+        :param arms: names of the arms to expand, every arm if None
+        :return: generator of ModFn lists, one per simulation; afterwards duplicates holds the number of simulations
+        skipped per arm
+        """
+
+        overlaps = self.arm_overlaps(arms) if self.arm_tag and self.dedupe_arms else {}
+        seen = set()
+        self.duplicates = {}
+        for arm, seed, resolved, key in self._configurations(arms):
+            if not self.dedupe_arms:
+                key = (arm.name,) + key
+            if key in seen:
+                self.duplicates[arm.name] = self.duplicates.get(arm.name, 0) + 1
+                continue
+            seen.add(key)
+
+            mod_fns = [ModFn(DTKConfigBuilder.set_param, self.seed_variable, seed)]
+            mod_fns += [ModFn(func, *args, **kwargs) for func, args, kwargs in resolved]
+            if self.arm_tag:
+                tags = {self.arm_tag: arm.name}
+                if key in overlaps:
+                    # the later arms' points are only run here; analyses selecting by arm can look them up
+                    tags['%s_Duplicates' % self.arm_tag] = ','.join(overlaps[key][1:])
+                mod_fns.append(ModFn(tag_simulation, **tags))
+            yield mod_fns
+
+    def builder(self, arms=None):
+        """
+        :param arms: names of the arms to run, every arm if None
+        :return: ModBuilder streaming the simulations to the experiment manager
+        """
+
+        return ModBuilder.from_list(self.mod_generator(arms))
@@ -1,14 +1,19 @@
 import os
 import pandas as pd
-import numpy as np
 from simtools.Analysis.AnalyzeManager import AnalyzeManager
 from simtools.Analysis.BaseAnalyzers import BaseAnalyzer
 from simtools.SetupParser import SetupParser
 
+from analysis_tools.branch_stitching import branch_prefix, read_prefix_file, stitch_channels
+from analysis_tools.ensemble_reducer import EnsembleReducer
+from analysis_tools.incremental_analysis import IncrementalAnalysis
+from analysis_tools.results_io import remove_results, results_path, write_results
 
-class InsetAnalyzer(BaseAnalyzer):
 
-    def __init__(self, expt_name, report_names=["InsetChart"], channels=None, sweep_variables=None, working_dir="."):
+class InsetAnalyzer(IncrementalAnalysis, BaseAnalyzer):
+
+    def __init__(self, expt_name, report_names=["InsetChart"], channels=None, sweep_variables=None, working_dir=".",
+                 incremental=False, output_format='csv'):
         super(InsetAnalyzer, self).__init__(working_dir=working_dir, filenames=["output/{name}.json".format(name=name)
                                                                                 for name in report_names]
                                             )
@@ -16,8 +21,12 @@ class InsetAnalyzer(BaseAnalyzer):
         self.channels = channels or ['Annual EIR']
         self.reports = report_names
         self.expt_name = expt_name
-        self.output_fname = os.path.join(self.working_dir, "%s_inset_data.csv" % self.expt_name)
-        self.output_fname_full = os.path.join(self.working_dir, "%s_inset_data_full.csv" % self.expt_name)
+        # csv, or parquet datasets partitioned by sweep variable that plotting scripts can read with filters
+        self.output_fname = results_path(self.working_dir, "%s_inset_data" % self.expt_name, output_format)
+        self.output_fname_full = results_path(self.working_dir, "%s_inset_data_full" % self.expt_name, output_format)
+        # incremental analysis keeps the seed statistics of analyzed simulations next to the outputs and only
+        # processes simulations it has not seen before
+        self.init_incremental(incremental, os.path.join(self.working_dir, "%s_inset_data_stats.npz" % self.expt_name))
 
     def select_simulation_data(self, data, simulation):
         simdata = []
@@ -25,6 +34,12 @@ class InsetAnalyzer(BaseAnalyzer):
         for report in self.reports:
 
             datatemp = data["output/{name}.json".format(name=report)]
+            prefix = branch_prefix(simulation)
+            if prefix:
+                # a continuation of a branching ensemble only reports from the branch day on
+                prefix_dir, prefix_id, branch_day = prefix
+                datatemp = stitch_channels(read_prefix_file(prefix_dir, "output/{name}.json".format(name=report)),
+                                           datatemp, branch_day)
 
             prevalence = datatemp['Channels']['Blood Smear Parasite Prevalence']['Data']
             eir = datatemp['Channels']['Daily EIR']['Data']
@@ -45,26 +60,31 @@ class InsetAnalyzer(BaseAnalyzer):
         return simdata
 
     def finalize(self, all_data):
-
-        data_sets_per_experiment = {}
-
-        # for simulation, associated_data in all_data.items():
-        for simulation, associated_data in all_data.items():
-            experiment_name = simulation.experiment.exp_name
-            if experiment_name not in data_sets_per_experiment:
-                data_sets_per_experiment[experiment_name] = []
-
-            data_sets_per_experiment[experiment_name].append(associated_data)
-
-        for experiment_name, data_sets in data_sets_per_experiment.items():
-            d = pd.concat(data_sets).reset_index(drop=True)
-            d.to_csv(self.output_fname_full)
-            self.sweep_variables.remove('Run_Number')
-            d_mean = d.groupby(self.sweep_variables + ['Time'])[self.channels].apply(np.mean).reset_index()
-            d_std = d.groupby(self.sweep_variables + ['Time'])[self.channels].apply(np.std).reset_index()
-            for channel in ['RDT Prevalence', 'Annual EIR', 'Clinical Cases', 'True Prevalence']:
-                d_mean[channel + '_std'] = d_std[channel]
-            d_mean.to_csv(self.output_fname, index=False)
+        group_variables = [x for x in self.sweep_variables if x != 'Run_Number']
+        reducers = {}
+
+        # new simulations, from this or any other experiment, are merged into the saved statistics
+        reducer = self.load_statistics()
+        if reducer is not None:
+            reducers[self.expt_name] = reducer
+        else:
+            remove_results(self.output_fname_full)
+        for simulation in self.new_simulations(all_data):
+            associated_data = all_data[simulation]
+            experiment_name = self.expt_name if self.incremental else simulation.experiment.exp_name
+            if experiment_name not in reducers:
+                reducers[experiment_name] = EnsembleReducer(group_variables + ['Time'], self.channels)
+
+            # fold each simulation in as it comes; the full dump is appended rather than concatenated
+            reducers[experiment_name].add(associated_data)
+            write_results(associated_data, self.output_fname_full, partition_cols=group_variables, append=True,
+                          basename=str(simulation.id))
+            self.processed.add(str(simulation.id))
+
+        self.save_statistics(reducers.get(self.expt_name))
+
+        for experiment_name, reducer in reducers.items():
+            write_results(reducer.to_dataframe(), self.output_fname, partition_cols=group_variables)
 
 
 if __name__ == "__main__":
@@ -6,23 +6,29 @@ from simtools.SetupParser import SetupParser
 from dtk.generic.serialization import add_SerializationTimesteps
 
 from single_node_simulations.helper_functions import change_vector_params, update_config_params, add_reporters
+from simulation_tools.equilibrium import candidate_serialization_days
+from simulation_tools.local_runner import LocalExperimentRunner
 
 
-if __name__ == "__main__":
+def build_burnin(num_years=40, num_seeds=1):
+    """
+    Config and builder of the burn-in, also run by BurnInStage from the run files
+    :param num_years: burn-in duration
+    :param num_seeds: number of serialization seeds
+    :return: config builder and ModBuilder of the burn-in simulations
+    """
+
     dir = './'
     geography = 'Burkina Faso'
     prefix = 'single_node_simulations'
     exp = 8.60
-    exp_name = "insecticide_resistance_single_node_serialization"
-
-    num_years = 40
-    num_seeds = 1
 
     cb = DTKConfigBuilder.from_defaults('MALARIA_SIM',
                                         Simulation_Duration=int(365 * num_years))
 
     update_config_params(cb, direc=dir, geography=geography)
-    add_SerializationTimesteps(cb, [num_years*365], end_at_final=True)
+    # candidate serialization days every 5 years, the burn-in stage keeps the earliest one in equilibrium
+    add_SerializationTimesteps(cb, candidate_serialization_days(num_years), end_at_final=True)
 
     ########################## VECTOR GENETICS ####################################################
 
@@ -65,15 +71,25 @@ if __name__ == "__main__":
                        start_day=(num_years - 10) * 365,
                        broadcast_event_name='Received_Treatment')
 
-    #####################################################################################
+    return cb, builder
+
+
+if __name__ == "__main__":
+    exp_name = "insecticide_resistance_single_node_serialization"
+    cb, builder = build_burnin()
 
     run_sim_args = {'config_builder': cb,
                     'exp_name': exp_name,
                     'exp_builder': builder}
 
-    SetupParser.default_block = 'HPC'
+    run_locally = 0
+    if run_locally:
+        # run on local cores instead of COMPS, outputs are written to _local/<exp_name>/sim_*/output
+        exp_manager = LocalExperimentRunner(experiment_dir='_local', input_dir='.')
+    else:
+        SetupParser.default_block = 'HPC'
 
-    SetupParser.init('HPC')
-    exp_manager = ExperimentManagerFactory.init()
+        SetupParser.init('HPC')
+        exp_manager = ExperimentManagerFactory.init()
     exp_manager.run_simulations(**run_sim_args)
     exp_manager.wait_for_finished(verbose=True)
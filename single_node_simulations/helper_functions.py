@@ -6,6 +6,12 @@ from dtk.utils.Campaign.CampaignClass import WaningEffectExponential
 from dtk.utils.reports import BaseVectorGeneticsReport, BaseVectorStatsReport
 from dtk.vector.species import set_species
 
+# nets distributed by add_ITNs are discarded and lose their killing effect exponentially (mean times in days); also used
+# by insecticide_resistance_model.py
+itn_discard_period = 660
+itn_blocking_decay = 730
+itn_killing_decay = 1460
+
 
 def change_vector_params(cb, species, mutation_rate1, mutation_rate2, serialization_seed,
                          initial_a0=0.99, initial_a1=0.01, initial_a2=0.0):
@@ -133,9 +139,11 @@ def add_ITNs(cb, start=0, coverage=0.8, insecticide='', label='No_nets', killing
     add_ITN_age_season(cb, start=start, demographic_coverage=coverage,
                        insecticide=insecticide,
                        discard_times={"Expiration_Distribution_Type": "EXPONENTIAL_DISTRIBUTION",
-                                      "Expiration_Period_Exponential": 660},
-                       blocking_config=WaningEffectExponential(Initial_Effect=0.9, Decay_Time_Constant=730),
-                       killing_config=WaningEffectExponential(Initial_Effect=killing, Decay_Time_Constant=1460))
+                                      "Expiration_Period_Exponential": itn_discard_period},
+                       blocking_config=WaningEffectExponential(Initial_Effect=0.9,
+                                                               Decay_Time_Constant=itn_blocking_decay),
+                       killing_config=WaningEffectExponential(Initial_Effect=killing,
+                                                              Decay_Time_Constant=itn_killing_decay))
 
     cb.update_params({"Report_Event_Recorder": 1,
                       "Report_Event_Recorder_Events": ["Bednet_Got_New_One",
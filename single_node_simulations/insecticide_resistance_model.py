@@ -0,0 +1,251 @@
+import copy
+import inspect
+
+import numpy as np
+import pandas as pd
+
+from simulation_tools.gene_drive_model import FEMALE, _combination_matches, compile_points, \
+    point_from_species_params, simulate, simulate_ensemble, to_dataframe
+from single_node_simulations.helper_functions import add_ITNs, itn_discard_period, itn_killing_decay
+
+
+def get_species_params(cb, species):
+    """
+    :param cb: config builder after change_vector_params
+    :param species: species name, e.g. 'gambiae'
+    :return: the species' entry of Vector_Species_Params
+    """
+
+    for species_params in cb.get_param('Vector_Species_Params'):
+        if species_params['Name'] == species:
+            return species_params
+    raise KeyError('%s is not in Vector_Species_Params' % species)
+
+
+def life_history(species_params):
+    """
+    :param species_params: entry of Vector_Species_Params, as written by change_vector_params
+    :return: life history arguments of simulate and the daily probability of a female feeding indoors on a person,
+    the exposure to nets
+    """
+
+    days_between_feeds = species_params['Days_Between_Feeds']
+    return {'female_life_expectancy': species_params['Adult_Life_Expectancy'],
+            'male_life_expectancy': species_params['Male_Life_Expectancy'],
+            'eggs_per_day': species_params['Egg_Batch_Size'] / float(days_between_feeds),
+            'immature_duration': int(round(species_params['Immature_Duration']))}, \
+        species_params['Anthropophily'] * species_params['Indoor_Feeding_Fraction'] / float(days_between_feeds)
+
+
+def habitat_seasonality(species_params, days):
+    """
+    :param species_params: entry of Vector_Species_Params
+    :param days: number of days to simulate
+    :return: (day,) capacity multiplier with mean 1 from the LINEAR_SPLINE habitat, None for other habitats
+    """
+
+    spline = species_params.get('Larval_Habitat_Types', {}).get('LINEAR_SPLINE')
+    if spline is None:
+        return None
+    distribution = spline['Capacity_Distribution_Over_Time']
+    curve = np.interp(np.arange(days) % 365, distribution['Times'], distribution['Values'], period=365)
+
+    return curve / curve.mean()
+
+
+def killing_modifiers(insecticides, species, model):
+    """
+    :param insecticides: Insecticides config parameter, as written by add_insecticides
+    :param species: species name
+    :param model: compiled arrays from compile_points
+    :return: dictionary of insecticide name to the (genotype,) Killing_Modifier of each female genotype; entries
+    repeating a name, e.g. the two pyrethroid entries of add_insecticides, are combined
+    """
+
+    alleles = model['alleles']
+    modifiers = {}
+    for insecticide in insecticides:
+        modifier = modifiers.setdefault(insecticide['Name'], np.ones(len(model['genomes'])))
+        for resistance in insecticide.get('Resistances', []):
+            if resistance.get('Species', species) != species:
+                continue
+            for g, (i, j) in enumerate(zip(model['gi'], model['gj'])):
+                if _combination_matches(resistance['Allele_Combinations'], (alleles[i], alleles[j]), FEMALE):
+                    modifier[g] *= resistance.get('Killing_Modifier', 1.0)
+
+    return modifiers
+
+
+def net_survival(nets, modifiers, days, feeding, n_genotypes):
+    """
+    Daily female survival of net distributions; a net kills a feeding female with its waning killing effect times
+    the Killing_Modifier of her genotype for the net's insecticide
+    :param nets: list of add_ITNs arguments (start, coverage, insecticide, killing), one per distribution
+    :param modifiers: insecticide name to (genotype,) Killing_Modifier from killing_modifiers
+    :param days: number of days to simulate
+    :param feeding: daily probability of a female feeding indoors on a person, from life_history
+    :param n_genotypes: number of genotypes
+    :return: (day, genotype) survival multiplier
+    """
+
+    survival = np.ones((days, n_genotypes))
+    for net in nets:
+        age = np.arange(days) - net['start']
+        # nets are discarded and their killing decays exponentially, as configured by add_ITNs
+        killing = net['coverage'] * net['killing'] * np.exp(-np.maximum(age, 0) * (1.0 / itn_discard_period +
+                                                                                     1.0 / itn_killing_decay))
+        killing[age < 0] = 0
+        modifier = modifiers.get(net['insecticide'], np.ones(n_genotypes))
+        survival *= 1 - feeding * killing[:, None] * modifier[None, :]
+
+    return survival
+
+
+def sweep_scenarios(cb, sweep, arms=None, species='gambiae'):
+    """
+    One scenario per point of a sweep's arms, seeds aside. The arm's ModSpecs are applied to a copy of the config
+    builder except add_ITNs, whose arguments become the scenario's net distributions.
+    :param cb: config builder with the parameters set outside the sweep, e.g. by add_insecticides
+    :param sweep: Sweep of the run file, e.g. the arms of insecticide_resistance_run_file.py
+    :param arms: names of the arms to include, every arm if None
+    :param species: species name
+    :return: list of dictionaries with species_params, insecticides, nets and the tags the ModFns would return; the
+    Insecticide, Coverage, Start and Label tags are those of the first net, later nets are tagged with their number,
+    e.g. Start_2
+    """
+
+    scenarios = []
+    for arm in sweep.arms:
+        if arms is not None and arm.name not in arms:
+            continue
+        for point in arm.points():
+            scenario_cb = copy.deepcopy(cb)
+            nets, tags = [], {'Experiment': arm.name}
+            for spec in arm.mods:
+                args, kwargs = spec.resolve(point)
+                if spec.func is add_ITNs:
+                    call = inspect.signature(add_ITNs).bind(scenario_cb, *args, **kwargs)
+                    call.apply_defaults()
+                    net = {k: v for k, v in call.arguments.items() if k != 'cb'}
+                    nets.append(net)
+                else:
+                    tags.update(spec.func(scenario_cb, *args, **kwargs) or {})
+            for i, net in enumerate(nets):
+                suffix = '_%i' % (i + 1) if i else ''
+                tags.update({'Insecticide' + suffix: net['insecticide'], 'Coverage' + suffix: net['coverage'],
+                             'Start' + suffix: net['start'], 'Label' + suffix: net['label']})
+            scenarios.append({'species_params': get_species_params(scenario_cb, species),
+                              'insecticides': scenario_cb.get_param('Insecticides', []),
+                              'nets': nets, 'tags': tags})
+
+    return scenarios
+
+
+def simulate_scenarios(scenarios, days, run_numbers=None, species='gambiae', capacity=10000, seasonal=True, seed=0):
+    """
+    Every scenario (and replicate) advanced together by simulate in one (replicate, scenario, genotype) state
+    :param scenarios: scenarios from sweep_scenarios
+    :param days: number of days to simulate
+    :param run_numbers: Run_Number of each stochastic replicate, e.g. range(num_seeds); deterministic if None
+    :param species: species name
+    :param capacity: mean daily emergence capacity
+    :param seasonal: scale the capacity by the LINEAR_SPLINE habitat of the species
+    :param seed: base seed combined with each Run_Number
+    :return: dataframe in the format of simulate_ensemble (to_dataframe if deterministic), one row per scenario and Time
+    """
+
+    life, feeding = life_history(scenarios[0]['species_params'])
+    if any(life_history(scenario['species_params']) != (life, feeding) for scenario in scenarios):
+        raise ValueError('Scenarios simulated together need the same life history parameters')
+    model = compile_points(species, [point_from_species_params(scenario['species_params']) for scenario in scenarios])
+    n_genotypes = len(model['genomes'])
+    female_survival = np.stack([
+        net_survival(scenario['nets'], killing_modifiers(scenario['insecticides'], species, model), days, feeding,
+                     n_genotypes)
+        for scenario in scenarios])
+    seasonality = habitat_seasonality(scenarios[0]['species_params'], days) if seasonal else None
+    tags = [scenario['tags'] for scenario in scenarios]
+
+    kwargs = dict(life, capacity=capacity, female_survival=female_survival, seasonality=seasonality)
+    if run_numbers is None:
+        return to_dataframe(simulate(model, days, **kwargs), tags)
+
+    return simulate_ensemble(model, days, run_numbers, tags, seed=seed, **kwargs)
+
+
+def summarize(df, tag_columns, last_days=365):
+    """
+    One row per scenario to rank rotation schedules by before simulating them in full
+    :param df: output of simulate_scenarios
+    :param tag_columns: columns identifying a scenario; NaN, e.g. Start_2 of a scenario with a single net, is a
+    value of its own
+    :param last_days: days at the end of the simulation the female population is averaged over
+    :return: dataframe with the tags, female allele frequencies on the last day and the mean female population
+    over the last days
+    """
+
+    genomes = [c for c in df.columns if c.startswith('X-') and not c.endswith('_std')]
+    last_day = df['Time'].max()
+    final = df[df['Time'] == last_day].set_index(tag_columns)
+    summary = pd.DataFrame(index=final.index)
+    for genome in genomes:
+        for allele in genome.replace('X-', '').split(':'):
+            column = '%s_Frequency' % allele
+            summary[column] = summary.get(column, 0) + final[genome] / 2
+    summary['Female_Population'] = df[df['Time'] > last_day - last_days] \
+        .groupby(tag_columns, dropna=False)['Female_Population'].mean()
+
+    return summary.reset_index()
+
+
+if __name__ == "__main__":
+    from dtk.utils.core.DTKConfigBuilder import DTKConfigBuilder
+    from single_node_simulations.helper_functions import add_insecticides, change_vector_params
+    from simulation_tools.sweep import ModSpec, Sweep, SweepVar
+
+    # screen rotation timings over the mutation grid of insecticide_resistance_run_file.py, with its comparison arms
+    start = 180
+    num_years = 6
+    num_seeds = 50
+
+    cb = DTKConfigBuilder.from_defaults('MALARIA_SIM', Simulation_Duration=int(365 * num_years))
+    add_insecticides(cb, pyrethroid_killing=0.125, carbamate_killing=0.25)
+
+    vector_params = ModSpec(change_vector_params, species='gambiae', mutation_rate1=SweepVar('mutation_rate1'),
+                            mutation_rate2=SweepVar('mutation_rate2'), serialization_seed=0)
+    mutation_grid = {'mutation_rate1': [pow(10, x) for x in range(-4, -1)],
+                     'mutation_rate2': [pow(10, x) for x in range(-4, -1)]}
+    resistance_factors = {'mutation_rate1': [0.01], 'mutation_rate2': [0], 'start': [start]}
+
+    sweep = Sweep(seeds=range(num_seeds))
+    sweep.add_arm('rotation',
+                  [vector_params,
+                   ModSpec(add_ITNs, start=SweepVar('start'), insecticide='pyrethroid', label='rotation'),
+                   ModSpec(add_ITNs, start=SweepVar('gap', lambda gap: start + gap), insecticide='carbamate',
+                           label='rotation')],
+                  factors=dict(mutation_grid, start=[start], gap=[365 * x for x in [0.5, 1, 2, 3, 4, 5]]))
+    sweep.add_arm('no_rotation_three_year',
+                  [vector_params,
+                   ModSpec(add_ITNs, coverage=0.6, start=SweepVar('start'), insecticide='pyrethroid',
+                           label='No_rotation_3year'),
+                   ModSpec(add_ITNs, coverage=0.6, start=SweepVar('start', lambda x: x + 3 * 365),
+                           insecticide='pyrethroid', label='No_rotation_3year')],
+                  factors=resistance_factors)
+    sweep.add_arm('no_nets',
+                  [vector_params,
+                   ModSpec(add_ITNs, coverage=0, start=SweepVar('start'), insecticide='pyrethroid', label='No_nets')],
+                  factors=resistance_factors)
+    sweep.add_arm('no_resistance',
+                  [vector_params,
+                   ModSpec(add_ITNs, coverage=0.6, start=SweepVar('start'), insecticide='carbamate',
+                           label='No_resistance'),
+                   ModSpec(add_ITNs, coverage=0.6, start=SweepVar('start', lambda x: x + 3 * 365),
+                           insecticide='carbamate', label='No_resistance')],
+                  factors=resistance_factors)
+
+    scenarios = sweep_scenarios(cb, sweep)
+    df = simulate_scenarios(scenarios, days=365 * num_years, run_numbers=range(num_seeds))
+    tag_columns = ['Experiment', 'Label', 'Mutation_Rate1', 'Mutation_Rate2', 'Start', 'Start_2']
+    # rank by the female population from the first distribution on, the schedules worth running in EMOD come first
+    summarize(df, tag_columns, last_days=365 * num_years - start).sort_values('Female_Population') \
+        .to_csv('rotation_screen.csv', index=False)
@@ -1,11 +1,17 @@
+import os
+
 from malaria.interventions.health_seeking import add_health_seeking
 
 from simtools.ExperimentManager.ExperimentManagerFactory import ExperimentManagerFactory
 from dtk.utils.core.DTKConfigBuilder import DTKConfigBuilder
-from simtools.ModBuilder import ModBuilder, ModFn
 from simtools.SetupParser import SetupParser
 from single_node_simulations.helper_functions import change_vector_params, update_config_params, add_reporters, \
     add_ITNs, add_insecticides
+from single_node_simulations.create_serialized_file import build_burnin
+from simulation_tools.burnin import BurnInStage, serialized_population, set_serialized_population
+from simulation_tools.equilibrium import inset_channels
+from simulation_tools.local_runner import LocalExperimentRunner
+from simulation_tools.sweep import ModSpec, Sweep, SweepVar
 
 if __name__ == "__main__":
     dir = './'
@@ -28,64 +34,57 @@ if __name__ == "__main__":
         'Serialized_Population_Filenames': serialized_file_list
     })
 
+    ########################## BURN-IN ####################################################
+
+    run_locally = 0
+    if run_locally:
+        # the 40 year burn-in only runs again when its own config changes, every simulation starts from its earliest
+        # serialized population with vectors and prevalence in equilibrium
+        burnins = BurnInStage(os.path.join('_local', 'burnins'), input_dir='.').run(*build_burnin(), verbose=True,
+                                                                                    equilibrium_channels=inset_channels)
+    else:
+        # serialized population on COMPS, fill in its path and files
+        burnins = [serialized_population('', serialized_file_list)]
+
     ########################## VECTOR GENETICS ############################################
 
-    three_year_gap = [
-            [ModFn(DTKConfigBuilder.set_param, 'Run_Number', seed),
-             ModFn(change_vector_params, species='gambiae', mutation_rate1=mutation_rate1,
-                   mutation_rate2=mutation_rate2, serialization_seed=0),
-             ModFn(DTKConfigBuilder.set_param, 'Serialized_Population_Path', ''),
-             ModFn(add_ITNs, start=start, insecticide='pyrethroid', label='3year'),
-             ModFn(add_ITNs, start=start+3*365, insecticide='carbamate', label='3year')
-             ]
-            for seed in range(num_seeds)
-            for mutation_rate1 in [pow(10, x) for x in range(-4, -1)]
-            for mutation_rate2 in [pow(10, x) for x in range(-4, -1)]
-            for start in [180 + extra*365]
-        ]
-
-    no_rotation_three_year = [
-        [ModFn(DTKConfigBuilder.set_param, 'Run_Number', seed),
-         ModFn(change_vector_params, species='gambiae', mutation_rate1=mutation_rate1,
-               mutation_rate2=mutation_rate2, serialization_seed=0),
-         ModFn(DTKConfigBuilder.set_param, 'Serialized_Population_Path', ''),
-         ModFn(add_ITNs, coverage=0.6, start=start, insecticide='pyrethroid', label='No_rotation_3year'),
-         ModFn(add_ITNs, coverage=0.6, start=start + 3 * 365, insecticide='pyrethroid', label='No_rotation_3year')
-         ]
-        for seed in range(num_seeds)
-        for mutation_rate1 in [0.01]
-        for mutation_rate2 in [0]
-        for start in [180 + extra*365]
-    ]
-
-    no_nets = [
-        [ModFn(DTKConfigBuilder.set_param, 'Run_Number', seed),
-         ModFn(change_vector_params, species='gambiae', mutation_rate1=mutation_rate1,
-               mutation_rate2=mutation_rate2, serialization_seed=0),
-         ModFn(DTKConfigBuilder.set_param, 'Serialized_Population_Path', ''),
-         ModFn(add_ITNs, coverage=0, start=start, insecticide='pyrethroid', label='No_nets'),
-         ]
-        for seed in range(num_seeds)
-        for mutation_rate1 in [0.01]
-        for mutation_rate2 in [0]
-        for start in [180 + extra*365]
-    ]
-
-    no_resistance = [
-        [ModFn(DTKConfigBuilder.set_param, 'Run_Number', seed),
-         ModFn(change_vector_params, species='gambiae', mutation_rate1=mutation_rate1,
-               mutation_rate2=mutation_rate2, serialization_seed=0),
-         ModFn(DTKConfigBuilder.set_param, 'Serialized_Population_Path', ''),
-         ModFn(add_ITNs, coverage=0.6, start=start, insecticide='carbamate', label='No_resistance'),
-         ModFn(add_ITNs, coverage=0.6, start=start + 3 * 365, insecticide='carbamate', label='No_resistance')
-         ]
-        for seed in range(num_seeds)
-        for mutation_rate1 in [0.01]
-        for mutation_rate2 in [0]
-        for start in [180 + extra * 365]
-    ]
-
-    builder = ModBuilder.from_list(no_rotation_three_year + no_nets + no_resistance)
+    vector_params = ModSpec(change_vector_params, species='gambiae', mutation_rate1=SweepVar('mutation_rate1'),
+                            mutation_rate2=SweepVar('mutation_rate2'), serialization_seed=0)
+    serialized_path = ModSpec(set_serialized_population, SweepVar('burnin'))
+    second_start = SweepVar('start', lambda start: start + 3 * 365)
+    resistance_factors = {'mutation_rate1': [0.01], 'mutation_rate2': [0], 'start': [180 + extra * 365],
+                          'burnin': burnins}
+
+    sweep = Sweep(seeds=range(num_seeds))
+    sweep.add_arm('three_year_gap',
+                  [vector_params, serialized_path,
+                   ModSpec(add_ITNs, start=SweepVar('start'), insecticide='pyrethroid', label='3year'),
+                   ModSpec(add_ITNs, start=second_start, insecticide='carbamate', label='3year')],
+                  factors={'mutation_rate1': [pow(10, x) for x in range(-4, -1)],
+                           'mutation_rate2': [pow(10, x) for x in range(-4, -1)],
+                           'start': [180 + extra * 365], 'burnin': burnins})
+    sweep.add_arm('no_rotation_three_year',
+                  [vector_params, serialized_path,
+                   ModSpec(add_ITNs, coverage=0.6, start=SweepVar('start'), insecticide='pyrethroid',
+                           label='No_rotation_3year'),
+                   ModSpec(add_ITNs, coverage=0.6, start=second_start, insecticide='pyrethroid',
+                           label='No_rotation_3year')],
+                  factors=resistance_factors)
+    sweep.add_arm('no_nets',
+                  [vector_params, serialized_path,
+                   ModSpec(add_ITNs, coverage=0, start=SweepVar('start'), insecticide='pyrethroid', label='No_nets')],
+                  factors=resistance_factors)
+    sweep.add_arm('no_resistance',
+                  [vector_params, serialized_path,
+                   ModSpec(add_ITNs, coverage=0.6, start=SweepVar('start'), insecticide='carbamate',
+                           label='No_resistance'),
+                   ModSpec(add_ITNs, coverage=0.6, start=second_start, insecticide='carbamate',
+                           label='No_resistance')],
+                  factors=resistance_factors)
+
+    arms = ['no_rotation_three_year', 'no_nets', 'no_resistance']
+    print(sweep.describe(arms))
+    builder = sweep.builder(arms)
 
     ############################### REPORTERS ###############################################
     vector_genetics_report = 1
@@ -120,9 +119,14 @@ if __name__ == "__main__":
                     'exp_name': exp_name,
                     'exp_builder': builder}
 
-    SetupParser.default_block = 'HPC'
+    if run_locally:
+        # run on local cores instead of COMPS, outputs are written to _local/<exp_name>/sim_*/output
+        exp_manager = LocalExperimentRunner(experiment_dir='_local', input_dir='.',
+                                            config_cache=os.path.join('_local', 'config_cache'), verbose=True)
+    else:
+        SetupParser.default_block = 'HPC'
 
-    SetupParser.init('HPC')
-    exp_manager = ExperimentManagerFactory.init()
+        SetupParser.init('HPC')
+        exp_manager = ExperimentManagerFactory.init()
     exp_manager.run_simulations(**run_sim_args)
     exp_manager.wait_for_finished(verbose=True)
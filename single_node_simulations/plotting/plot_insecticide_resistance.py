@@ -1,8 +1,9 @@
 import os
-import pandas as pd
 import matplotlib.pyplot as plt
 from matplotlib.ticker import MultipleLocator, FormatStrFormatter
 
+from analysis_tools.results_io import filter_results, read_result_groups, read_results
+
 plot_inset = 1
 plot_GM = 0
 
@@ -11,8 +12,8 @@ data_path = os.path.join('_data', exp_name)
 fig_path = os.path.join('_data', exp_name)
 os.makedirs(fig_path, exist_ok=True)
 
-df_est = pd.read_csv(os.path.join(data_path, 'insecticide_resistance_establishment.csv'))
-df_inset = pd.read_csv(os.path.join(data_path, 'insecticide_resistance_inset.csv'))
+est_file = os.path.join(data_path, 'insecticide_resistance_establishment.csv')
+inset_file = os.path.join(data_path, 'insecticide_resistance_inset.csv')
 
 channels = ['Annual EIR']
 groupby_columns = ['Mutation_Rate2']
@@ -21,12 +22,14 @@ colors = ['#2cbcb2', '#5e495a', '#d44e28', '#56445D', 'r']
 if plot_inset:
     for channel in channels:
         if any(x in channel for x in channels):
-            for group, gdf in df_inset.groupby(groupby_columns):
+            # one figure per Mutation_Rate2 group over the first six years; a parquet output is read group by group
+            for group, gdf in read_result_groups(inset_file, groupby_columns[0],
+                                                 columns=['Label', 'Time', 'Annual EIR', 'Clinical Cases',
+                                                          channel, channel + '_std'],
+                                                 filters=[('Time', '<', 6*365)]):
                 fig = plt.figure()
                 fig.set_size_inches((9.951, 6.72))
                 for i, (start, startdf) in enumerate(gdf.groupby('Label')):
-                    df_label = df_inset[df_inset['Label'] == start]
-                    startdf = startdf[:6*365]
                     eir = sum(startdf['Annual EIR'][-365:])
                     clinical_cases = sum(startdf['Clinical Cases'])
                     time = list(range(len(startdf)))
@@ -59,8 +62,9 @@ if plot_inset:
                 plt.close('all')
 
 if plot_GM:
-    for start, startdf in df_est.groupby('Label'):
-        startdf_inset = df_inset[df_inset['Label'] == start]
+    inset_df = read_results(inset_file, columns=['Label', 'Mutation_Rate2', 'Annual EIR', 'Clinical Cases'])
+    for start, startdf in read_result_groups(est_file, 'Label'):
+        startdf_inset = filter_results(inset_df, [('Label', '==', start)])
         for group, gdf in startdf.groupby(groupby_columns):
             gdf_inset = startdf_inset[(startdf_inset['Mutation_Rate2'] == group)
                                       ]
@@ -1,9 +1,10 @@
-import pandas as pd
 import os
 import matplotlib.pyplot as plt
 import matplotlib as mpl
 from matplotlib.ticker import MultipleLocator, FormatStrFormatter
 
+from analysis_tools.scenario_cube import ScenarioCube
+
 mpl.rcParams['pdf.fonttype'] = 42
 
 
@@ -14,10 +15,6 @@ os.makedirs(fig_path, exist_ok=True)
 
 file = os.path.join(data_path, 'introgression_data.csv')
 
-df = pd.read_csv(file)
-if 'Unnamed: 0' in df.columns:
-    df = df.drop('Unnamed: 0', axis=1)
-
 majorLocator = MultipleLocator(365)
 majorFormatter = FormatStrFormatter('%d')
 minorLocator = MultipleLocator(365/12.0)
@@ -26,11 +23,14 @@ channel = 'Label'
 linestyle = ['-', '-.']
 labels = {'X-a0:X-a0': 'Species 1', 'X-b0:X-b0': 'Species 2',
           'X-a0:X-b0': 'Hybrid'}
-for j, label in enumerate(list(df[channel].unique())):
-    df_temp = df[df[channel] == label]
+columns = ['X-a0:X-a0', 'X-a0:X-b0', 'X-b0:X-b0']
+# the table is read once into a label x time cube; each figure is a lookup by label
+cube = ScenarioCube.from_results(file, [channel, 'Time'], columns + [x + '_std' for x in columns],
+                                 filters=[('Time', '<=', 6*365)])
+for j, label in enumerate(cube.labels(channel)):
+    df_temp = cube.to_frame(**{channel: label})
     fig, ax = plt.subplots()
     colors = ['b', 'r', 'g', 'y']
-    columns = ['X-a0:X-a0', 'X-a0:X-b0', 'X-b0:X-b0']
     for i, column in enumerate(columns):
         ax.plot(df_temp['Time'], df_temp[column], label=labels[column], color=colors[i],
                 linestyle=linestyle[j])
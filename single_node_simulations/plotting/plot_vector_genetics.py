@@ -1,9 +1,10 @@
-import pandas as pd
 import os
 import matplotlib.pyplot as plt
 import matplotlib as mpl
 from matplotlib.ticker import MultipleLocator, FormatStrFormatter
 
+from analysis_tools.results_io import read_results
+
 mpl.rcParams['pdf.fonttype'] = 42
 
 exp_name = 'vector_genetics_single'
@@ -13,9 +14,8 @@ os.makedirs(fig_path, exist_ok=True)
 
 file = os.path.join(data_path, 'vector_genetics_data.csv')
 
-df = pd.read_csv(file)
-if 'Unnamed: 0' in df.columns:
-    df = df.drop('Unnamed: 0', axis=1)
+columns = ['X-a0:X-a0', 'X-a0:X-a1', 'X-a1:X-a1']
+df = read_results(file, columns=['Time'] + columns + [x + '_std' for x in columns], filters=[('Time', '<=', 6*365)])
 
 majorLocator = MultipleLocator(365)
 majorFormatter = FormatStrFormatter('%d')
@@ -23,7 +23,6 @@ minorLocator = MultipleLocator(365/12.0)
 
 fig, ax = plt.subplots()
 colors = ['b', 'r', 'g', 'y']
-columns = ['X-a0:X-a0', 'X-a0:X-a1', 'X-a1:X-a1']
 for i, column in enumerate(columns):
     ax.plot(df['Time'], df[column], label=column, color=colors[i])
     ax.fill_between(df['Time'],
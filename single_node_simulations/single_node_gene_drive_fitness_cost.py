@@ -6,6 +6,7 @@ from dtk.generic.climate import set_climate_constant
 from simtools.ExperimentManager.ExperimentManagerFactory import ExperimentManagerFactory
 from simtools.ModBuilder import ModFn, ModBuilder
 from simtools.SetupParser import SetupParser
+from simulation_tools.local_runner import LocalExperimentRunner
 
 import numpy as np
 
@@ -59,9 +60,11 @@ if __name__ == "__main__":
     expname = 'vector_genetics_single_node_gene_drive_fitness_cost'
 
     sim_duration = 365 * 10
+    run_locally = 0
     num_seeds = 5
 
-    SetupParser('HPC')
+    if not run_locally:
+        SetupParser('HPC')
 
     cb = DTKConfigBuilder.from_defaults('VECTOR_SIM')
 
@@ -156,6 +159,10 @@ if __name__ == "__main__":
                     'exp_name': expname,
                     'exp_builder': builder}
 
-    exp_manager = ExperimentManagerFactory.from_setup()
+    if run_locally:
+        # run on local cores instead of COMPS, outputs are written to _local/<exp_name>/sim_*/output
+        exp_manager = LocalExperimentRunner(experiment_dir='_local')
+    else:
+        exp_manager = ExperimentManagerFactory.from_setup()
     exp_manager.run_simulations(**run_sim_args)
     exp_manager.wait_for_finished(verbose=True)
\ No newline at end of file
@@ -6,6 +6,7 @@ from dtk.generic.climate import set_climate_constant
 from simtools.ExperimentManager.ExperimentManagerFactory import ExperimentManagerFactory
 from simtools.ModBuilder import ModFn, ModBuilder
 from simtools.SetupParser import SetupParser
+from simulation_tools.local_runner import LocalExperimentRunner
 
 import numpy as np
 
@@ -40,6 +41,7 @@ if __name__ == "__main__":
     expname = 'vector_genetics_single_node_gene_drive'
 
     sim_duration = 365 * 6
+    run_locally = 0
     num_seeds = 50
 
     cb = DTKConfigBuilder.from_defaults('VECTOR_SIM')
@@ -129,11 +131,16 @@ if __name__ == "__main__":
                       "Enable_Vector_Aging": 1
                       })
 
-    SetupParser('HPC')
+    if not run_locally:
+        SetupParser('HPC')
     run_sim_args = {'config_builder': cb,
                     'exp_name': expname,
                     'exp_builder': builder}
 
-    exp_manager = ExperimentManagerFactory.from_setup()
+    if run_locally:
+        # run on local cores instead of COMPS, outputs are written to _local/<exp_name>/sim_*/output
+        exp_manager = LocalExperimentRunner(experiment_dir='_local')
+    else:
+        exp_manager = ExperimentManagerFactory.from_setup()
     exp_manager.run_simulations(**run_sim_args)
     exp_manager.wait_for_finished(verbose=True)
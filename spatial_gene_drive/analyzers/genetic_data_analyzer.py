@@ -1,38 +1,54 @@
 import os
 
-import pandas as pd
-import numpy as np
 from simtools.Analysis.AnalyzeManager import AnalyzeManager
 from simtools.Analysis.BaseAnalyzers import BaseAnalyzer
 from simtools.SetupParser import SetupParser
 
+from analysis_tools.branch_stitching import branch_prefix, read_prefix_file, stitch_frame
+from analysis_tools.ensemble_reducer import EnsembleReducer
+from analysis_tools.genotype_frequencies import genotype_fractions
+from analysis_tools.incremental_analysis import IncrementalAnalysis
+from analysis_tools.report_cache import load_report
+from analysis_tools.results_io import remove_results, results_path, write_results
 
-class GMEstablishmentAnalyzer(BaseAnalyzer):
 
-    def __init__(self, exp_name, sweep_variables, working_dir='.'):
-        super(GMEstablishmentAnalyzer, self).__init__(working_dir=working_dir,
+class GMEstablishmentAnalyzer(IncrementalAnalysis, BaseAnalyzer):
+
+    def __init__(self, exp_name, sweep_variables, working_dir='.', genomes=None, incremental=False, output_format='csv'):
+        super(GMEstablishmentAnalyzer, self).__init__(working_dir=working_dir, parse=False,
                                                       filenames=
                                                       ['output/ReportVectorGenetics_gambiae_Female_SPECIFIC_GENOME.csv']
                                                       )
 
         self.exp_name = exp_name
         self.sweep_variables = sweep_variables
-        self.output_fname = os.path.join(self.working_dir, "%s_establishment_rates.csv" % self.exp_name)
-        self.output_fname_full = os.path.join(self.working_dir, "%s_establishment_rates_full.csv" % self.exp_name)
+        # genome columns to report, e.g. a0/a1/a2 for insecticide resistance or a0/b0 for introgression;
+        # every genome in the report if None
+        self.genomes = genomes
+        # csv, or parquet datasets partitioned by sweep variable that plotting scripts can read with filters
+        self.output_fname = results_path(self.working_dir, "%s_establishment_rates" % self.exp_name, output_format)
+        self.output_fname_full = results_path(self.working_dir, "%s_establishment_rates_full" % self.exp_name,
+                                              output_format)
+        # incremental analysis keeps the seed statistics of analyzed simulations next to the outputs and only
+        # processes simulations it has not seen before
+        self.init_incremental(incremental,
+                              os.path.join(self.working_dir, "%s_establishment_rates_stats.npz" % self.exp_name))
+        self.cache_dir = os.path.join(self.working_dir, 'report_cache')
 
     def select_simulation_data(self, data, simulation):
 
-        simdata = data['output/ReportVectorGenetics_gambiae_Female_SPECIFIC_GENOME.csv']
-        genomes = simdata['Genome'].unique()
-        simdata = simdata.pivot_table('VectorPopulation', ['Time', 'NodeID'], 'Genome').reset_index()
-        simdata['sum'] = [0] * len(simdata)
-        for genome in genomes:
-            simdata['sum'] += simdata[genome]
-        for genome in genomes:
-            simdata[genome] = simdata[genome] / simdata['sum']
-
-        simdata = simdata[['Time', 'X-a0:X-a0',
-                           'X-a0:X-a1', 'X-a1:X-a1']]
+        # parsed reports are cached per simulation and file hash, so re-runs only parse new simulations
+        report = 'output/ReportVectorGenetics_gambiae_Female_SPECIFIC_GENOME.csv'
+        simdata = load_report(data[report], simulation.id, self.cache_dir)
+        prefix = branch_prefix(simulation)
+        if prefix:
+            # a continuation of a branching ensemble only reports from the branch day on; the shared prefix is
+            # parsed once and cached under its own id
+            prefix_dir, prefix_id, branch_day = prefix
+            # continuations tagged before Start_Time was recorded also started at the branch day
+            simdata = stitch_frame(load_report(read_prefix_file(prefix_dir, report), prefix_id, self.cache_dir),
+                                   simdata, branch_day, float(simulation.tags.get('Start_Time', branch_day)))
+        simdata = genotype_fractions(simdata, genomes=self.genomes).drop(columns='NodeID')
 
         for sweep_var in self.sweep_variables:
             if sweep_var in simulation.tags.keys():
@@ -42,27 +58,33 @@ class GMEstablishmentAnalyzer(BaseAnalyzer):
         return simdata
 
     def finalize(self, all_data):
-        data_sets_per_experiment = {}
-
-        for simulation, associated_data in all_data.items():
-            experiment_name = simulation.experiment.exp_name
-            if experiment_name not in data_sets_per_experiment:
-                data_sets_per_experiment[experiment_name] = []
-
-            data_sets_per_experiment[experiment_name].append(associated_data)
-
-        for experiment_name, data_sets in data_sets_per_experiment.items():
-            d = pd.concat(data_sets).reset_index(drop=True)
-            d.to_csv(self.output_fname_full)
-            self.sweep_variables.remove('Run_Number')
-            columns = ['X-a0:X-a0', 'X-a0:X-a1', 'X-a1:X-a1']
-            d_mean = d.groupby(self.sweep_variables + ['Time'])['X-a0:X-a0', 'X-a0:X-a1',
-                                                                'X-a1:X-a1'].apply(np.mean).reset_index()
-            d_std = d.groupby(self.sweep_variables + ['Time'])['X-a0:X-a0', 'X-a0:X-a1',
-                                                               'X-a1:X-a1'].apply(np.std).reset_index()
-            for channel in columns:
-                d_mean[channel + '_std'] = d_std[channel]
-            d_mean.to_csv(self.output_fname, index=False)
+        group_variables = [x for x in self.sweep_variables if x != 'Run_Number']
+        reducers = {}
+
+        # new simulations, from this or any other experiment, are merged into the saved statistics
+        reducer = self.load_statistics()
+        if reducer is not None:
+            reducers[self.exp_name] = reducer
+        else:
+            remove_results(self.output_fname_full)
+        for simulation in self.new_simulations(all_data):
+            associated_data = all_data[simulation]
+            experiment_name = self.exp_name if self.incremental else simulation.experiment.exp_name
+            if experiment_name not in reducers:
+                columns = self.genomes or [x for x in associated_data.columns
+                                           if x not in ['Time'] + self.sweep_variables]
+                reducers[experiment_name] = EnsembleReducer(group_variables + ['Time'], columns)
+
+            # fold each simulation in as it comes; the full dump is appended rather than concatenated
+            reducers[experiment_name].add(associated_data)
+            write_results(associated_data, self.output_fname_full, partition_cols=group_variables, append=True,
+                          basename=str(simulation.id))
+            self.processed.add(str(simulation.id))
+
+        self.save_statistics(reducers.get(self.exp_name))
+
+        for experiment_name, reducer in reducers.items():
+            write_results(reducer.to_dataframe(), self.output_fname, partition_cols=group_variables)
 
 
 if __name__ == "__main__":
@@ -5,73 +5,106 @@ import numpy as np
 from simtools.Analysis.AnalyzeManager import AnalyzeManager
 from simtools.Analysis.BaseAnalyzers import BaseAnalyzer
 from simtools.SetupParser import SetupParser
-from spatial_output_dataframe import construct_spatial_output_df
 import glob
 
+from analysis_tools.branch_stitching import branch_prefix, read_prefix_file, stitch_spatial_report
+from analysis_tools.ensemble_reducer import EnsembleReducer
+from analysis_tools.incremental_analysis import IncrementalAnalysis
+from analysis_tools.results_io import results_path, write_results
+from spatial_gene_drive.analyzers.spatial_output_dataframe import decode_spatial_report
+from spatial_gene_drive.analyzers.spatial_report_store import SpatialReportStore, check_layout
+
 projectdir = os.path.join(os.path.expanduser('~'), 'Dropbox (IDM)', 'Malaria Team Folder', 'projects', 'Vector_genetics',
                           'Data', 'simulation_data', 'Establishment_Burkina')
 
 
-class SpatialAnalyzer(BaseAnalyzer):
+class SpatialAnalyzer(IncrementalAnalysis, BaseAnalyzer):
 
-    def __init__(self, exp_name, spatial_channels, sweep_variables, working_dir='.'):
-        super(SpatialAnalyzer, self).__init__(working_dir=working_dir,
+    def __init__(self, exp_name, spatial_channels, sweep_variables, working_dir='.', incremental=False,
+                 output_format='csv'):
+        super(SpatialAnalyzer, self).__init__(working_dir=working_dir, parse=False,
                                              filenames=['output/SpatialReportMalariaFiltered_%s.bin' % x for x in spatial_channels]
                                            )
 
         self.exp_name = exp_name
         self.sweep_variables = sweep_variables
         self.spatial_channels = spatial_channels
-        self.output_fname = os.path.join(self.working_dir, "%s_spatial_data.csv" % self.exp_name)
+        # csv, or a parquet dataset partitioned by sweep variable that plotting scripts can read with filters
+        self.output_fname = results_path(self.working_dir, "%s_spatial_data" % self.exp_name, output_format)
+        self.store_dir = os.path.join(self.working_dir, "%s_spatial_store" % self.exp_name)
+        # incremental analysis keeps the seed statistics of analyzed simulations next to the outputs and only
+        # processes simulations it has not seen before; their reports are appended to the store
+        self.init_incremental(incremental, os.path.join(self.working_dir, "%s_spatial_data_stats.npz" % self.exp_name))
 
     def select_simulation_data(self, data, simulation):
 
-        simdata = construct_spatial_output_df(data['output/SpatialReportMalariaFiltered_%s.bin' % self.spatial_channels[0]], self.spatial_channels[0])
-        if len(self.spatial_channels) > 1:
-            for ch in self.spatial_channels[1:]:
-                simdata = pd.merge(left=simdata,
-                                   right=construct_spatial_output_df(data['output/SpatialReportMalariaFiltered_%s.bin' % ch], ch),
-                                   on=['time', 'node'])
+        # keep only the compact float32 (time, node) blocks, the long format frame is never built per simulation
+        reports = {ch: decode_spatial_report(data['output/SpatialReportMalariaFiltered_%s.bin' % ch])
+                   for ch in self.spatial_channels}
+        prefix = branch_prefix(simulation)
+        if prefix:
+            # a continuation of a branching ensemble only reports from the branch day on
+            prefix_dir, prefix_id, branch_day = prefix
+            reports = {ch: stitch_spatial_report(decode_spatial_report(read_prefix_file(
+                prefix_dir, 'output/SpatialReportMalariaFiltered_%s.bin' % ch)), report, branch_day)
+                for ch, report in reports.items()}
+        first = reports[self.spatial_channels[0]]
+        simdata = {'arrays': {ch: report['data'] for ch, report in reports.items()},
+                   'times': first['start'] + first['interval'] * np.arange(first['n_tstep']),
+                   'nodeids': first['nodeids'],
+                   'tags': {}}
 
         for sweep_var in self.sweep_variables:
             if sweep_var in simulation.tags.keys():
-                simdata[sweep_var] = simulation.tags[sweep_var]
+                simdata['tags'][sweep_var] = simulation.tags[sweep_var]
             else:
-                simdata[sweep_var] = 0
+                simdata['tags'][sweep_var] = 0
         return simdata
-        # # ensure data directory
-        # # because we are running in threads, this could happen in multiple threads
-        # try:
-        #     os.makedirs('intermediate_data', exist_ok=True)
-        # except FileExistsError:
-        #     pass
-        # out_path = f'intermediate_data/{simulation.id}.pickle'
-        #
-        # simdata.to_pickle(out_path)
-        # # return out_path
-        # return out_path
 
     def finalize(self, all_data):
-        # load all the simulations
-        # all_data_dict = dict()
-        # for simulation, path in all_data.items():
-        #     all_data_dict[simulation] = pd.read_pickle(path)
-
-        data_sets_per_experiment = {}
-
-        # for simulation, associated_data in all_data.items():
-        for simulation, associated_data in all_data.items():
-            experiment_name = simulation.experiment.exp_name
-            if experiment_name not in data_sets_per_experiment:
-                data_sets_per_experiment[experiment_name] = []
-
-            data_sets_per_experiment[experiment_name].append(associated_data)
-
-        for experiment_name, data_sets in data_sets_per_experiment.items():
-            d = pd.concat(data_sets).reset_index(drop=True)
-            self.sweep_variables.remove('Run_Number')
-            d = d.groupby(self.sweep_variables + ['time', 'node'])[self.spatial_channels].apply(np.mean).reset_index()
-            d.to_csv(self.output_fname, index=False)
+        resume = self.resuming()
+        reducer = self.load_statistics()
+        simulations = self.new_simulations(all_data)
+        if not simulations:
+            return
+        store = SpatialReportStore(self.store_dir, mode='r+') if resume else None
+        if resume:
+            times, nodeids = store.times, store.nodeids
+        else:
+            first = all_data[simulations[0]]
+            times = first['times'].astype(np.int64) if np.all(first['times'] == np.round(first['times'])) \
+                else first['times']
+            nodeids = first['nodeids']
+        # rows are labelled with the times and nodes of the store, so every simulation has to report exactly those
+        for simulation in simulations:
+            check_layout(simulation.id, all_data[simulation]['times'], all_data[simulation]['nodeids'], times, nodeids)
+        n_nodes = len(nodeids)
+        group_variables = [x for x in self.sweep_variables if x != 'Run_Number']
+
+        # write every simulation into the memory-mapped store and fold it into the running seed statistics
+        if resume:
+            start = store.extend(len(simulations))
+        else:
+            reducer = EnsembleReducer(group_variables + ['time', 'node'], self.spatial_channels)
+            store = SpatialReportStore.create(self.store_dir, self.spatial_channels, len(simulations),
+                                              times, nodeids)
+            start = 0
+        for index, simulation in enumerate(simulations, start):
+            associated_data = all_data[simulation]
+            store.write_simulation(index, simulation.id, associated_data['arrays'], associated_data['tags'])
+
+            simdata = pd.DataFrame({ch: np.asarray(associated_data['arrays'][ch]).ravel()
+                                    for ch in self.spatial_channels})
+            simdata['time'] = np.repeat(times, n_nodes)
+            simdata['node'] = np.tile(nodeids, len(times))
+            for sweep_var in group_variables:
+                simdata[sweep_var] = associated_data['tags'][sweep_var]
+            reducer.add(simdata)
+            self.processed.add(str(simulation.id))
+        store.flush()
+        self.save_statistics(reducer)
+
+        write_results(reducer.to_dataframe(), self.output_fname, partition_cols=group_variables)
 
 
 if __name__ == "__main__":
@@ -88,7 +121,7 @@ if __name__ == "__main__":
                    }
     sweep_vars = ['Run_Number', 'Release_Number', 'Copy_To_Likelihood',
                   'ITN_Coverage', 'Transmission_To_Human',
-                  'Start_Day', 'Num_Nodes']
+                  'Start_Day', 'Num_Nodes', 'Experiment']
 
     for expt_name, exp_id in experiments.items():
         am = AnalyzeManager(exp_list=exp_id,
@@ -1,24 +1,100 @@
+import numpy as np
 import pandas as pd
 
 
-def construct_spatial_output_df(rawdata, channel, timesteps=[]):
-    n_nodes = rawdata['n_nodes']
-    n_tstep = rawdata['n_tstep']
-    if 'start' in rawdata:
-        start = rawdata['start']
-        interval = rawdata['interval']
+def decode_spatial_report(raw, filtered=True):
+    """
+    Decode the bytes of a SpatialReport(MalariaFiltered) binary file without copying the data block
+    :param raw: contents of the .bin file
+    :param filtered: True for SpatialReportMalariaFiltered files, which carry start and interval in the header
+    :return: dictionary with n_nodes, n_tstep, start, interval, nodeids and a (n_tstep, n_nodes) data array
+    """
+
+    n_nodes, n_tstep = (int(x) for x in np.frombuffer(raw, dtype=np.int32, count=2))
+    offset = 8
+    if filtered:
+        start, interval = (float(x) for x in np.frombuffer(raw, dtype=np.float32, count=2, offset=offset))
+        offset += 8
     else:
         start, interval = 0, 1
-    nodeids = rawdata['nodeids']
-    data = rawdata['data']
+    nodeids = np.frombuffer(raw, dtype=np.uint32, count=n_nodes, offset=offset)
+    offset += 4 * n_nodes
+    data = np.frombuffer(raw, dtype=np.float32, count=n_tstep * n_nodes, offset=offset).reshape(n_tstep, n_nodes)
+
+    return {'n_nodes': n_nodes, 'n_tstep': n_tstep, 'start': start, 'interval': interval,
+            'nodeids': nodeids, 'data': data}
+
+
+def _as_spatial_dict(rawdata):
+    if isinstance(rawdata, (bytes, bytearray, memoryview)):
+        return decode_spatial_report(rawdata)
+    return rawdata
+
+
+def _time_axis(rawdata):
+    start = rawdata.get('start', 0)
+    interval = rawdata.get('interval', 1)
+    all_timesteps = start + interval * np.arange(rawdata['n_tstep'])
+    if float(start).is_integer() and float(interval).is_integer():
+        all_timesteps = all_timesteps.astype(np.int64)
+
+    return all_timesteps
+
+
+def _timestep_index(all_timesteps, timesteps):
+    # report times are an arithmetic sequence, so requested times map straight onto row indices
+    if len(all_timesteps) < 2:
+        return np.flatnonzero(np.isin(all_timesteps, timesteps))
+    start, interval = all_timesteps[0], all_timesteps[1] - all_timesteps[0]
+    position = (np.unique(np.asarray(timesteps, dtype=float)) - start) / interval
+    position = position[(position == np.round(position)) & (position >= 0) & (position < len(all_timesteps))]
+
+    return position.astype(np.int64)
+
+
+def construct_spatial_output_df(rawdata, channel, timesteps=[]):
+    """
+    Convert one spatial report into a long format dataframe
+    :param rawdata: parsed spatial report dictionary or the raw bytes of the .bin file
+    :param channel: name of the column holding the report values
+    :param timesteps: if given, only keep these report times
+    :return: dataframe with columns channel, time and node
+    """
+
+    return construct_spatial_output_multichannel_df({channel: rawdata}, [channel], timesteps=timesteps)
+
+
+def construct_spatial_output_multichannel_df(rawdata, channels, timesteps=[]):
+    """
+    Convert several spatial reports of the same simulation into one wide dataframe
+    :param rawdata: dictionary of channel to parsed spatial report dictionary or raw .bin bytes
+    :param channels: channels to include, in column order
+    :param timesteps: if given, only keep these report times
+    :return: dataframe with one column per channel plus time and node
+    """
+
+    reports = [_as_spatial_dict(rawdata[ch]) for ch in channels]
+    n_nodes = reports[0]['n_nodes']
+    nodeids = np.asarray(reports[0]['nodeids'])
+    all_timesteps = _time_axis(reports[0])
+    for ch, report in zip(channels[1:], reports[1:]):
+        if report['n_nodes'] != n_nodes or not np.array_equal(np.asarray(report['nodeids']), nodeids) \
+                or not np.array_equal(_time_axis(report), all_timesteps):
+            raise ValueError('Spatial report for %s does not share nodes and times with %s' % (ch, channels[0]))
+
+    if len(timesteps):
+        rows = _timestep_index(all_timesteps, timesteps)
+    else:
+        rows = slice(None)
+    selected_timesteps = all_timesteps[rows]
 
-    all_timesteps = range(start, (start + n_tstep) * interval, interval)
+    # one allocation for every channel; each report is copied straight into its column
+    values = np.empty((len(selected_timesteps) * n_nodes, len(channels)), dtype=np.float32)
+    for i, report in enumerate(reports):
+        values[:, i] = np.asarray(report['data'], dtype=np.float32).reshape(-1, n_nodes)[rows].ravel()
 
-    df = pd.DataFrame({channel: [item for sublist in data for item in sublist],
-                       'time': [item for sublist in [[x] * n_nodes for x in all_timesteps] for item in sublist],
-                       'node': [item for sublist in [list(nodeids) * len(all_timesteps)] for item in sublist]})
-    if not timesteps:
-        return df
+    df = pd.DataFrame(values, columns=list(channels))
+    df['time'] = np.repeat(selected_timesteps, n_nodes)
+    df['node'] = np.tile(nodeids, len(selected_timesteps))
 
-    timesteps = sorted(list(set(all_timesteps).intersection(timesteps)))
-    return df[df['time'].isin(timesteps)]
+    return df
@@ -0,0 +1,197 @@
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+def check_layout(sim_id, times, nodeids, store_times, store_nodeids):
+    """
+    Every simulation of a store shares its report times and node ids, which label the rows of its arrays
+    :param sim_id: simulation id, for the error message
+    :param times: report times of the simulation
+    :param nodeids: node ids of the simulation
+    :param store_times: report times of the store
+    :param store_nodeids: node ids of the store
+    :raise ValueError: if the simulation reports other times or other nodes than the store
+    """
+
+    times, store_times = np.asarray(times, dtype=float), np.asarray(store_times, dtype=float)
+    if times.shape != store_times.shape or not np.allclose(times, store_times):
+        raise ValueError('Simulation %s reports %i time steps on days %s, the store holds %i time steps on days %s'
+                         % (sim_id, len(times), np.array2string(times, threshold=4), len(store_times),
+                            np.array2string(store_times, threshold=4)))
+    if not np.array_equal(np.asarray(nodeids), np.asarray(store_nodeids)):
+        raise ValueError('Simulation %s reports %i nodes that are not the %i nodes of the store'
+                         % (sim_id, len(nodeids), len(store_nodeids)))
+
+
+class SpatialReportStore(object):
+    """
+    On-disk store of spatial report channels for a whole experiment.
+
+    Each channel is one memory-mapped float32 .npy array indexed by [sim, time, node], next to a sweep tag
+    table with one row per simulation. Readers only page in the slices they ask for.
+    """
+
+    meta_file = 'meta.json'
+    tags_file = 'tags.csv'
+
+    def __init__(self, store_dir, mode='r'):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, self.meta_file)) as f:
+            meta = json.load(f)
+        self.channels = meta['channels']
+        self.times = np.array(meta['times'])
+        self.nodeids = np.array(meta['nodeids'])
+        self.n_sims = meta['n_sims']
+        self.tags = pd.read_csv(os.path.join(store_dir, self.tags_file)) \
+            if os.path.exists(os.path.join(store_dir, self.tags_file)) else pd.DataFrame()
+        self._arrays = {ch: np.load(self._channel_path(ch), mmap_mode=mode) for ch in self.channels}
+        self._tag_rows = {}
+
+    @classmethod
+    def create(cls, store_dir, channels, n_sims, times, nodeids):
+        """
+        Allocate an empty store on disk
+        :param store_dir: directory to hold the store, created if missing
+        :param channels: spatial channels to store
+        :param n_sims: number of simulations
+        :param times: report times shared by every simulation
+        :param nodeids: node ids shared by every simulation
+        :return: store opened for writing
+        """
+
+        os.makedirs(store_dir, exist_ok=True)
+        times = np.asarray(times)
+        nodeids = np.asarray(nodeids)
+        for ch in channels:
+            np.lib.format.open_memmap(os.path.join(store_dir, '%s.npy' % ch), mode='w+', dtype=np.float32,
+                                      shape=(n_sims, len(times), len(nodeids)))
+        with open(os.path.join(store_dir, cls.meta_file), 'w') as f:
+            json.dump({'channels': list(channels), 'n_sims': n_sims, 'times': times.tolist(),
+                       'nodeids': nodeids.tolist()}, f)
+        if os.path.exists(os.path.join(store_dir, cls.tags_file)):
+            os.remove(os.path.join(store_dir, cls.tags_file))
+
+        return cls(store_dir, mode='r+')
+
+    def _channel_path(self, channel):
+        return os.path.join(self.store_dir, '%s.npy' % channel)
+
+    def _write_meta(self):
+        with open(os.path.join(self.store_dir, self.meta_file), 'w') as f:
+            json.dump({'channels': list(self.channels), 'n_sims': self.n_sims, 'times': self.times.tolist(),
+                       'nodeids': self.nodeids.tolist()}, f)
+
+    def extend(self, n_new):
+        """
+        Add rows for n_new simulations, keeping the stored simulations in place
+        :param n_new: number of simulations to add
+        :return: row of the first new simulation
+        """
+
+        first = self.n_sims
+        n_sims = first + n_new
+        self._arrays = {}
+        for ch in self.channels:
+            path = self._channel_path(ch)
+            with open(path, 'r+b') as f:
+                np.lib.format.read_magic(f)
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+                header_length = f.tell()
+                header = io.BytesIO()
+                np.lib.format.write_array_header_1_0(header, {'descr': np.lib.format.dtype_to_descr(dtype),
+                                                              'fortran_order': False,
+                                                              'shape': (n_sims,) + tuple(shape[1:])})
+                # simulations are the outer axis, so growing the file and its header shape appends empty rows
+                if len(header.getvalue()) == header_length:
+                    f.seek(0)
+                    f.write(header.getvalue())
+                    f.truncate(header_length + n_sims * int(np.prod(shape[1:])) * dtype.itemsize)
+                    continue
+            old = np.load(path, mmap_mode='r')
+            new = np.lib.format.open_memmap(path + '.tmp.npy', mode='w+', dtype=dtype,
+                                            shape=(n_sims,) + tuple(shape[1:]))
+            new[:first] = old
+            new.flush()
+            del old, new
+            os.replace(path + '.tmp.npy', path)
+
+        self.n_sims = n_sims
+        self._write_meta()
+        self._arrays = {ch: np.load(self._channel_path(ch), mmap_mode='r+') for ch in self.channels}
+
+        return first
+
+    def write_simulation(self, index, sim_id, arrays, tags):
+        """
+        Store one simulation
+        :param index: row of the simulation in the store
+        :param sim_id: simulation id
+        :param arrays: dictionary of channel to (time, node) array
+        :param tags: dictionary of sweep tags for the simulation
+        """
+
+        for ch in self.channels:
+            self._arrays[ch][index] = arrays[ch]
+        self._tag_rows[index] = dict(tags, sim_index=index, sim_id=str(sim_id))
+
+    def flush(self):
+        for array in self._arrays.values():
+            array.flush()
+        if self._tag_rows:
+            new_tags = pd.DataFrame([self._tag_rows[i] for i in sorted(self._tag_rows)])
+            self.tags = pd.concat([self.tags, new_tags]).drop_duplicates('sim_index', keep='last')
+            self.tags = self.tags.sort_values('sim_index').reset_index(drop=True)
+            self._tag_rows = {}
+        self.tags.to_csv(os.path.join(self.store_dir, self.tags_file), index=False)
+
+    def time_index(self, times):
+        index = np.flatnonzero(np.isin(self.times, times))
+        if len(index) != len(np.unique(times)):
+            missing = sorted(set(np.asarray(times).tolist()) - set(self.times[index].tolist()))
+            raise KeyError('Times %s are not in the store' % missing)
+
+        return index
+
+    def read(self, channel, times=None, sims=None):
+        """
+        Read a slice of one channel
+        :param channel: channel to read
+        :param times: report times to keep, all times if None
+        :param sims: simulation rows to keep, all simulations if None
+        :return: (sim, time, node) array holding only the requested slice
+        """
+
+        array = self._arrays[channel]
+        if sims is not None:
+            array = array[np.asarray(sims)]
+        if times is not None:
+            array = array[:, self.time_index(times)]
+
+        return np.asarray(array)
+
+    def to_dataframe(self, times=None, channels=None, sims=None):
+        """
+        Long format dataframe of a slice of the store with the sweep tags attached
+        :param times: report times to keep, all times if None
+        :param channels: channels to include, all channels if None
+        :param sims: simulation rows to keep, all simulations if None
+        :return: dataframe with columns time, node, the channels and the sweep tags
+        """
+
+        channels = channels or self.channels
+        sims = np.arange(self.n_sims) if sims is None else np.asarray(sims)
+        selected_times = self.times if times is None else self.times[self.time_index(times)]
+        n_times, n_nodes = len(selected_times), len(self.nodeids)
+
+        df = pd.DataFrame({ch: self.read(ch, times=times, sims=sims).ravel() for ch in channels})
+        df['time'] = np.tile(np.repeat(selected_times, n_nodes), len(sims))
+        df['node'] = np.tile(self.nodeids, len(sims) * n_times)
+        tags = self.tags.set_index('sim_index').loc[sims].reset_index()
+        for column in tags.columns:
+            df[column] = np.repeat(tags[column].values, n_times * n_nodes)
+
+        return df
@@ -0,0 +1,178 @@
+import copy
+import json
+import os
+
+import numpy as np
+
+from spatial_gene_drive.demographics_index import load_demographics_index
+from spatial_gene_drive.node_offsets import read_node_offsets, write_node_offsets
+
+# config parameters of the daily climate files set by standard_cb_updates
+climate_parameters = ('Air_Temperature_Filename', 'Land_Temperature_Filename', 'Rainfall_Filename',
+                      'Relative_Humidity_Filename')
+
+
+def climate_file_path(climate_dir, geography, climate_type, resolution='30arcsec'):
+    """
+    Path of a daily climate file as named in standard_cb_updates, e.g. Burkina Faso_30arcsec_rainfall_daily.bin
+    """
+
+    return os.path.join(climate_dir, '%s_%s_%s_daily.bin' % (geography, resolution, climate_type))
+
+
+def read_climate_header(bin_path):
+    """
+    :param bin_path: path to the climate .bin file; the header is read from <bin_path>.json
+    :return: header dictionary, node ids and byte offsets
+    """
+
+    with open(bin_path + '.json') as f:
+        header = json.load(f)
+    nodeids, offsets = read_node_offsets(header['NodeOffsets'])
+    if len(nodeids) != header['Metadata']['NodeCount']:
+        raise ValueError('%s lists %i nodes in NodeOffsets but NodeCount is %i'
+                         % (bin_path, len(nodeids), header['Metadata']['NodeCount']))
+
+    return header, nodeids, offsets
+
+
+def open_climate_file(bin_path, mode='r'):
+    """
+    Memory-map a climate file as a (node, day) float32 array
+    :param bin_path: path to the climate .bin file
+    :param mode: numpy memmap mode; 'r+' edits the file in place
+    :return: node ids and the (node, day) values in the order of the node ids. This is a view of the file when
+    nodes are stored in order, as written by write_climate_file, and a copy when nodes share weather cells
+    """
+
+    header, nodeids, offsets = read_climate_header(bin_path)
+    n_days = header['Metadata']['DatavalueCount']
+    row_bytes = 4 * n_days
+    if np.any(offsets % row_bytes):
+        raise ValueError('NodeOffsets of %s do not match %i values per node' % (bin_path, n_days))
+
+    data = np.memmap(bin_path, dtype='<f4', mode=mode).reshape(-1, n_days)
+    rows = offsets // row_bytes
+    if rows.max() >= len(data):
+        raise ValueError('%s is shorter than its NodeOffsets' % bin_path)
+    if not np.array_equal(rows, np.arange(len(data))):
+        data = data[rows]
+
+    return nodeids, data
+
+
+def write_climate_file(bin_path, nodeids, data, template=None, metadata=None):
+    """
+    Write a climate file and its header from an array
+    :param bin_path: path of the .bin file to write; the header goes to <bin_path>.json
+    :param nodeids: node ids, one per row of data
+    :param data: (node, day) values
+    :param template: existing climate .bin file whose metadata is copied, e.g. the Burkina Faso file of the same type
+    :param metadata: metadata entries to set or override
+    """
+
+    nodeids = np.asarray(nodeids, dtype=np.int64)
+    data = np.ascontiguousarray(data, dtype='<f4')
+    if data.ndim != 2 or data.shape[0] != len(nodeids):
+        raise ValueError('data must have one row per node, got shape %s for %i nodes'
+                         % (data.shape, len(nodeids)))
+
+    header = {'Metadata': {}}
+    if template is not None:
+        header = copy.deepcopy(read_climate_header(template)[0])
+    n_nodes, n_days = data.shape
+    header['Metadata'].update({'NodeCount': n_nodes, 'WeatherCellCount': n_nodes, 'OffsetEntryCount': n_nodes,
+                               'NumberDTKNodes': n_nodes, 'DatavaluePerCell': n_days, 'DatavalueCount': n_days})
+    header['Metadata'].update(metadata or {})
+    header['NodeOffsets'] = write_node_offsets(nodeids, 4 * n_days * np.arange(n_nodes))
+
+    data.tofile(bin_path)
+    with open(bin_path + '.json', 'w') as f:
+        json.dump(header, f, indent=4)
+
+
+def seasonal_climate(nodeids, mean, amplitude, peak_day, n_days=730, noise=0.0, minimum=None, rng=None):
+    """
+    Synthetic daily climate with a yearly cycle
+    :param nodeids: node ids
+    :param mean: yearly mean, per node or shared
+    :param amplitude: amplitude of the yearly cycle, per node or shared
+    :param peak_day: day of year of the peak
+    :param n_days: number of days
+    :param noise: standard deviation of independent daily noise
+    :param minimum: values are clipped to this, e.g. 0 for rainfall
+    :param rng: numpy Generator for the noise
+    :return: (node, day) values
+    """
+
+    rng = rng if rng is not None else np.random.default_rng()
+    days = np.arange(n_days)
+    mean = np.broadcast_to(np.asarray(mean, dtype=float), (len(nodeids),))[:, None]
+    amplitude = np.broadcast_to(np.asarray(amplitude, dtype=float), (len(nodeids),))[:, None]
+    data = mean + amplitude * np.cos(2 * np.pi * (days - peak_day) / 365.0)
+    if noise:
+        data = data + rng.normal(0, noise, data.shape)
+    if minimum is not None:
+        data = np.maximum(data, minimum)
+
+    return data.astype(np.float32)
+
+
+def perturb_climate(data, scale=1.0, shift=0.0, day_shift=0):
+    """
+    Scenario from existing climate values: data * scale + shift, moved later by day_shift days with wraparound
+    """
+
+    return (np.roll(np.asarray(data, dtype=float), day_shift, axis=-1) * scale + shift).astype(np.float32)
+
+
+def validate_climate_nodes(climate_files, demographics_file, n_days=None):
+    """
+    Check before submission that every node of the demographics file has climate values
+    :param climate_files: climate .bin files; only their headers are read
+    :param demographics_file: demographics json of the simulation
+    :param n_days: minimum number of daily values required, e.g. the simulation duration for non-repeating climate
+    """
+
+    nodeids = load_demographics_index(demographics_file).nodeids
+    problems = []
+    for bin_path in climate_files:
+        header, climate_nodeids, offsets = read_climate_header(bin_path)
+        missing = np.setdiff1d(nodeids, climate_nodeids)
+        if len(missing):
+            problems.append('%s is missing %i nodes: %s' % (bin_path, len(missing), missing[:10].tolist()))
+        if n_days is not None and header['Metadata']['DatavalueCount'] < n_days:
+            problems.append('%s has %i values per node, %i needed'
+                            % (bin_path, header['Metadata']['DatavalueCount'], n_days))
+    if problems:
+        raise ValueError('\n'.join(problems))
+
+
+def input_file(input_dir, filename):
+    """
+    :param input_dir: local input directory, e.g. input_files/spatial
+    :param filename: input file as set in the config, e.g. ./Climate/Burkina Faso_30arcsec_rainfall_daily.bin
+    :return: the file under input_dir as EMOD finds it with --input-path, or the file of the same name directly in
+    input_dir as in input_files/spatial; for .bin files, the one whose .json header is there
+    """
+
+    suffix = '.json' if filename.endswith('.bin') else ''
+    for path in [os.path.join(input_dir, filename), os.path.join(input_dir, os.path.basename(filename))]:
+        if os.path.exists(path + suffix):
+            return path
+    raise FileNotFoundError('%s is not in %s' % (filename, input_dir))
+
+
+def validate_config_climate(cb, input_dir, n_days=None):
+    """
+    validate_climate_nodes for the climate and demographics files set in a config
+    :param cb: config builder with the climate and demographics filenames set, e.g. by standard_cb_updates
+    :param input_dir: local input directory holding the files or their headers, e.g. input_files/spatial
+    :param n_days: minimum number of daily values required
+    """
+
+    climate_files = sorted(set(input_file(input_dir, cb.get_param(name)) for name in climate_parameters
+                               if cb.get_param(name)))
+    # overlays list a subset of the nodes of the first demographics file
+    demographics_file = input_file(input_dir, cb.get_param('Demographics_Filenames')[0])
+    validate_climate_nodes(climate_files, demographics_file, n_days=n_days)
@@ -3,10 +3,20 @@ import os
 from dtk.utils.core.DTKConfigBuilder import DTKConfigBuilder
 from dtk.vector.species import set_species, set_species_param
 
+from spatial_gene_drive.climate_files import validate_config_climate
+
 inputs_directory = './'
 
 
-def standard_cb_updates(cb, prefix, geography, migration_mul):
+def standard_cb_updates(cb, prefix, geography, migration_mul, input_dir=None):
+    """
+    :param cb: config builder
+    :param prefix: prefix of the demographics and migration files
+    :param geography: geography of the climate files
+    :param migration_mul: vector migration multiplier
+    :param input_dir: local copy of the input files, e.g. input_files/spatial; if set, the climate files are checked
+    to cover every node of the demographics file before anything is submitted
+    """
 
     # Demographics and geography
     cb.update_params({'Demographics_Filenames': [os.path.join(inputs_directory, 'Demographics', "%s_demographics.json" % prefix)]})
@@ -52,6 +62,8 @@ def standard_cb_updates(cb, prefix, geography, migration_mul):
         "Relative_Humidity_Filename": os.path.join(inputs_directory, 'Climate',
                                                    "%s_30arcsec_relative_humidity_daily.bin" % geography),
     }))
+    if input_dir:
+        validate_config_climate(cb, input_dir)
 
 
 def update_vector_params(cb):
@@ -88,7 +100,7 @@ def update_vector_params(cb):
 
 def configure_VC_GM_intervention_system(prefix, geography,
                                         num_cores=1, num_years=100,
-                                        migration_mul=1):
+                                        migration_mul=1, input_dir=None):
 
     # General
 
@@ -97,7 +109,7 @@ def configure_VC_GM_intervention_system(prefix, geography,
                                         Simulation_Duration=int(365 * num_years),
                                         )
 
-    standard_cb_updates(cb, prefix, geography, migration_mul)
+    standard_cb_updates(cb, prefix, geography, migration_mul, input_dir=input_dir)
     update_vector_params(cb)
 
     return cb
\ No newline at end of file
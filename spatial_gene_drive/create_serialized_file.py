@@ -8,22 +8,29 @@ from dtk.generic.serialization import add_SerializationTimesteps
 from dtk.vector.species import set_species, set_species_param, set_species_genes
 
 from malaria.interventions.health_seeking import add_health_seeking
+from simulation_tools.equilibrium import candidate_serialization_days
+from simulation_tools.local_runner import LocalExperimentRunner
+from spatial_gene_drive.climate_files import validate_config_climate
+
+
+def build_burnin(num_years=11, num_seeds=1, num_cores=5, migration_mul=100, input_dir=None):
+    """
+    Config and builder of the burn-in, also run by BurnInStage from the run files
+    :param num_years: burn-in duration
+    :param num_seeds: number of serialization seeds
+    :param num_cores: should be less than or equal to number of nodes requested by summary report and should ensure
+    each core gets a job
+    :param migration_mul: vector migration multiplier
+    :param input_dir: local copy of the input files whose climate files are checked to cover every node of the
+    demographics file, no check if None
+    :return: config builder and ModBuilder of the burn-in simulations
+    """
 
-
-if __name__ == "__main__":
     dir = './'
     geography = 'Burkina Faso'
     prefix = "vector_genetics_spatial"
 
     exp = 8.6
-    migration_mul = 100
-    exp_name = "spatial_vector_genetics_serialization"
-
-    # should be less than or equal to number of nodes requested by summary report and should ensure each core gets a job
-    num_cores = 5
-
-    num_years = 11
-    num_seeds = 1
 
     cb = DTKConfigBuilder.from_defaults('MALARIA_SIM',
                                         Num_Cores=num_cores,
@@ -79,6 +86,8 @@ if __name__ == "__main__":
         "Relative_Humidity_Filename": os.path.join(dir, 'Climate',
                                                    "%s_30arcsec_relative_humidity_daily.bin" % geography),
     }))
+    if input_dir:
+        validate_config_climate(cb, input_dir)
 
     cb.update_params({"Default_Geography_Initial_Node_Population": 1000,
                       "Default_Geography_Torus_Size": 10,
@@ -110,7 +119,8 @@ if __name__ == "__main__":
     set_species_param(cb, "gambiae", "Male_Life_Expectancy", 10)
     set_species_param(cb, "gambiae", "Indoor_Feeding_Fraction", 0.9)
 
-    add_SerializationTimesteps(cb, [num_years * 365], end_at_final=True)
+    # candidate serialization days every 5 years, the burn-in stage keeps the earliest one in equilibrium
+    add_SerializationTimesteps(cb, candidate_serialization_days(num_years), end_at_final=True)
     cb.update_params({
         "Report_Event_Recorder": 1,
         "Listed_Events": ["Immigrating", "Emigrating"],
@@ -155,15 +165,27 @@ if __name__ == "__main__":
                        drug=['Artemether', 'Lumefantrine'],
                        start_day=(num_years-10)*365,
                        broadcast_event_name='Received_Treatment')
-    #################################################################################################
+    return cb, builder
+
+
+if __name__ == "__main__":
+    exp_name = "spatial_vector_genetics_serialization"
+    run_locally = 0
+    input_dir = os.path.join('input_files', 'spatial')
+    # the local input files are only checked for local runs, COMPS runs use the files of the cluster
+    cb, builder = build_burnin(input_dir=input_dir if run_locally else None)
 
     run_sim_args = {'config_builder': cb,
                     'exp_name': exp_name,
                     'exp_builder': builder}
 
-    SetupParser.default_block = 'HPC'
+    if run_locally:
+        # run on local cores instead of COMPS, outputs are written to _local/<exp_name>/sim_*/output
+        exp_manager = LocalExperimentRunner(experiment_dir='_local', input_dir=input_dir)
+    else:
+        SetupParser.default_block = 'HPC'
 
-    SetupParser.init('HPC')
-    exp_manager = ExperimentManagerFactory.init()
+        SetupParser.init('HPC')
+        exp_manager = ExperimentManagerFactory.init()
     exp_manager.run_simulations(**run_sim_args)
     exp_manager.wait_for_finished(verbose=True)
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# parsed indexes of this process, keyed by path, modification time and size
+_loaded = {}
+
+
+def _file_key(demographics_file):
+    stat = os.stat(demographics_file)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _file_hash(demographics_file):
+    with open(demographics_file, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def sidecar_path(demographics_file):
+    return demographics_file + '.index.npz'
+
+
+class DemographicsIndex(object):
+    """
+    Node table of a demographics file held as arrays: NodeID, InitialPopulation, Latitude and Longitude.
+
+    Nodes keep the order of the demographics file; position maps a NodeID to its row in constant time.
+    """
+
+    def __init__(self, nodeids, population, lat, lon):
+        self.nodeids = np.asarray(nodeids, dtype=np.int64)
+        self.population = np.asarray(population, dtype=float)
+        self.lat = np.asarray(lat, dtype=float)
+        self.lon = np.asarray(lon, dtype=float)
+        self._position = np.full(self.nodeids.max() + 1, -1, dtype=np.int64)
+        self._position[self.nodeids] = np.arange(len(self.nodeids))
+
+    def __len__(self):
+        return len(self.nodeids)
+
+    @classmethod
+    def from_json(cls, demographics_file):
+        with open(demographics_file) as f:
+            nodes = json.load(f)['Nodes']
+        return cls([node['NodeID'] for node in nodes],
+                   [node['NodeAttributes']['InitialPopulation'] for node in nodes],
+                   [node['NodeAttributes']['Latitude'] for node in nodes],
+                   [node['NodeAttributes']['Longitude'] for node in nodes])
+
+    def position(self, nodeids):
+        """
+        Rows of the given node ids
+        """
+
+        nodeids = np.asarray(nodeids, dtype=np.int64)
+        if np.any(nodeids >= len(self._position)) or np.any(self._position[nodeids] < 0):
+            raise KeyError('Node ids not in demographics: %s' % np.setdiff1d(nodeids, self.nodeids).tolist())
+
+        return self._position[nodeids]
+
+    def lat_lon(self, nodeids):
+        rows = self.position(nodeids)
+        return self.lat[rows], self.lon[rows]
+
+    def n_largest(self, n=1):
+        """
+        Node ids of the n most populous nodes, largest first
+        """
+
+        n = min(n, len(self))
+        if n <= 0:
+            return []
+        rows = np.argpartition(-self.population, n - 1)[:n] if n < len(self) else np.arange(len(self))
+        rows = rows[np.lexsort((rows, -self.population[rows]))]
+
+        return self.nodeids[rows].tolist()
+
+    def to_dataframe(self, nodeids=None):
+        """
+        :param nodeids: nodes to return, in order; all nodes if None
+        :return: dataframe with NodeID, pop, lat and lon
+        """
+
+        rows = slice(None) if nodeids is None else self.position(nodeids)
+        return pd.DataFrame({'NodeID': self.nodeids[rows], 'pop': self.population[rows],
+                             'lat': self.lat[rows], 'lon': self.lon[rows]})
+
+    def save(self, path, key, digest):
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, nodeids=self.nodeids, population=self.population, lat=self.lat, lon=self.lon,
+                 key=np.array(key, dtype=np.int64), digest=np.array(digest))
+        os.replace(tmp_path, path)
+
+
+def load_demographics_index(demographics_file):
+    """
+    Node table of a demographics file, parsed once and reused.
+
+    The table is kept for the life of the process and in a <demographics_file>.index.npz sidecar that is valid
+    while the file's modification time and size, or failing those its hash, are unchanged. The sidecar is not
+    written if the folder is read-only.
+    :param demographics_file: path to the demographics json
+    :return: DemographicsIndex
+    """
+
+    demographics_file = os.path.abspath(demographics_file)
+    key = _file_key(demographics_file)
+    if (demographics_file, key) in _loaded:
+        return _loaded[(demographics_file, key)]
+
+    path = sidecar_path(demographics_file)
+    index, save = None, True
+    if os.path.exists(path):
+        with np.load(path, allow_pickle=False) as f:
+            cached = {name: f[name] for name in f.files}
+        # a touched but unchanged file keeps its table; only the key is refreshed
+        if tuple(cached['key']) == key or _file_hash(demographics_file) == str(cached['digest']):
+            index = DemographicsIndex(cached['nodeids'], cached['population'], cached['lat'], cached['lon'])
+            save = tuple(cached['key']) != key
+
+    if index is None:
+        index = DemographicsIndex.from_json(demographics_file)
+    if save:
+        try:
+            index.save(path, key, _file_hash(demographics_file))
+        except OSError:
+            pass
+
+    _loaded[(demographics_file, key)] = index
+    return index
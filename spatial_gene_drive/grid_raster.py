@@ -0,0 +1,172 @@
+import json
+
+import numpy as np
+import pandas as pd
+from matplotlib import animation
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from spatial_gene_drive.demographics_index import load_demographics_index
+
+
+class NodeGrid(object):
+    """
+    Raster layout of the simulation nodes on the population grid.
+
+    Every node sits in one cell of the grid (gidx, gidy columns of the pop grid file); cell ids come from the
+    id_2_cell_id mapping ("gidx_gidy": cell id). Node values are scattered into a (gidy, gidx) image with one indexed
+    assignment, so a whole map is drawn by a single imshow and animated by replacing the image data.
+    """
+
+    def __init__(self, nodeids, cells, cell_xy, extent):
+        """
+        :param nodeids: node ids
+        :param cells: cell id of each node
+        :param cell_xy: (n_cells, 2) gidx, gidy of every cell id
+        :param extent: (lngmin, lngmax, latmin, latmax) of the cell edges
+        """
+
+        self.nx, self.ny = (int(x) + 1 for x in cell_xy.max(axis=0))
+        self.extent = tuple(extent)
+        flat = cell_xy[:, 1] * self.nx + cell_xy[:, 0]
+        # flat image index of every node id, -1 for ids without a cell
+        self.lookup = np.full(int(np.max(nodeids)) + 1, -1, dtype=np.int64)
+        self.lookup[np.asarray(nodeids, dtype=np.int64)] = flat[np.asarray(cells, dtype=np.int64)]
+        self._frame = None
+
+    @classmethod
+    def from_files(cls, grid_file, id_2_cell_id_file, demographics_file=None):
+        """
+        :param grid_file: pop grid csv with lat, lon, gidx and gidy columns,
+        e.g. vector_genetics_spatial_full_pop_grid.csv
+        :param id_2_cell_id_file: json mapping "gidx_gidy" to cell id,
+        e.g. vector_genetics_spatial_full_pop_grid_id_2_cell_id.json
+        :param demographics_file: demographics json whose nodes are placed in the cells at their Latitude and
+        Longitude; if None, the NodeIDs are the row numbers of the pop grid file from 1, the order the demographics
+        were generated in (node_label is a cell index, not a NodeID)
+        :return: NodeGrid
+        """
+
+        grid = pd.read_csv(grid_file)
+        with open(id_2_cell_id_file) as f:
+            id_2_cell_id = json.load(f)
+        cell_xy = np.zeros((max(id_2_cell_id.values()) + 1, 2), dtype=np.int64)
+        for key, cell in id_2_cell_id.items():
+            cell_xy[cell] = [int(x) for x in key.split('_')]
+        gidx, gidy = grid['gidx'].astype(int).to_numpy(), grid['gidy'].astype(int).to_numpy()
+
+        # cell edges from the regular spacing of the grid, so the raster lines up with lon/lat layers
+        lng0, dlng = cls._fit(gidx, grid['lon'].to_numpy())
+        lat0, dlat = cls._fit(gidy, grid['lat'].to_numpy())
+        nx, ny = (int(x) + 1 for x in cell_xy.max(axis=0))
+        extent = (lng0 - dlng / 2, lng0 + dlng * (nx - 0.5), lat0 - dlat / 2, lat0 + dlat * (ny - 0.5))
+
+        if demographics_file is None:
+            nodeids = np.arange(len(grid)) + 1
+        else:
+            nodes = load_demographics_index(demographics_file)
+            nodeids = nodes.nodeids
+            gidx = np.rint((nodes.lon - lng0) / dlng).astype(int)
+            gidy = np.rint((nodes.lat - lat0) / dlat).astype(int)
+        keys = ['%i_%i' % xy for xy in zip(gidx, gidy)]
+        outside = [nodeid for nodeid, key in zip(nodeids, keys) if key not in id_2_cell_id]
+        if outside:
+            raise ValueError('Nodes %s are not in a cell of %s' % (outside, id_2_cell_id_file))
+
+        return cls(nodeids, [id_2_cell_id[key] for key in keys], cell_xy, extent)
+
+    @staticmethod
+    def _fit(index, coordinate):
+        # coordinate = origin + spacing * index
+        spacing, origin = np.polyfit(index, coordinate, 1)
+        return origin, spacing
+
+    def rasterize(self, nodeids, values, out=None):
+        """
+        :param nodeids: node ids of the values
+        :param values: one value per node
+        :param out: (ny, nx) float array to fill in place, e.g. the data of an image being animated
+        :return: (ny, nx) image, NaN in cells without a node
+        """
+
+        if out is None:
+            out = np.empty((self.ny, self.nx))
+        out.fill(np.nan)
+        nodeids = np.asarray(nodeids, dtype=np.int64)
+        index = np.where(nodeids < len(self.lookup), self.lookup[np.minimum(nodeids, len(self.lookup) - 1)], -1)
+        known = index >= 0
+        out.reshape(-1)[index[known]] = np.asarray(values)[known]
+
+        return out
+
+    def draw(self, ax, nodeids, values, cmap, norm, **kwargs):
+        """
+        :param ax: axes to draw on
+        :param nodeids: node ids of the values
+        :param values: one value per node
+        :param cmap: colormap
+        :param norm: normalization of the values
+        :param kwargs: further imshow arguments, e.g. zorder
+        :return: AxesImage, update it with update()
+        """
+
+        # NaN cells are drawn in the colormap's transparent "bad" color
+        return ax.imshow(self.rasterize(nodeids, values), origin='lower', extent=self.extent, cmap=cmap, norm=norm,
+                         interpolation='nearest', **kwargs)
+
+    def update(self, image, nodeids, values):
+        """
+        Replace the values of an image from draw() without creating new artists
+        :param image: AxesImage returned by draw
+        :param nodeids: node ids of the values
+        :param values: one value per node
+        :return: the image
+        """
+
+        self._frame = self.rasterize(nodeids, values, out=self._frame)
+        image.set_data(self._frame)
+
+        return image
+
+
+def animate_nodes(node_grid, nodeids, frames, times, movie_file, cmap, norm, basemap=None, basemap_extent=None,
+                  title='Day %i', fps=30, writer=None, figsize=(7, 7)):
+    """
+    Animate node values over time in one figure: the basemap and axes are set up once, and each frame only replaces
+    the data of the node image and the day label, the two animated (blitted) artists
+    :param node_grid: NodeGrid
+    :param nodeids: node ids, one per column of frames
+    :param frames: (time, node) array, e.g. the seed mean of a SpatialReportStore channel
+    :param times: day of each frame
+    :param movie_file: output file, e.g. GM_spread.mp4
+    :param cmap: colormap
+    :param norm: normalization of the values
+    :param basemap: optional RGBA image drawn under the nodes, see plot_spatial_sim.render_basemap
+    :param basemap_extent: (lngmin, lngmax, latmin, latmax) of the basemap, the grid extent if None
+    :param title: format of the day label
+    :param fps: frames per second
+    :param writer: name of a matplotlib animation writer, e.g. 'pillow' for a gif; ffmpeg by default
+    :param figsize: figure size in inches
+    :return: path of the movie
+    """
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    ax = fig.add_axes([0, 0, 1, 0.93])
+    ax.set_axis_off()
+    if basemap is not None:
+        ax.imshow(basemap, extent=basemap_extent or node_grid.extent, zorder=1, interpolation='antialiased')
+    image = node_grid.draw(ax, nodeids, frames[0], cmap, norm, zorder=2, animated=True)
+    ax.set_xlim(node_grid.extent[:2])
+    ax.set_ylim(node_grid.extent[2:])
+    label = fig.text(0.5, 0.96, title % times[0], ha='center', va='center', animated=True)
+
+    def update(i):
+        node_grid.update(image, nodeids, frames[i])
+        label.set_text(title % times[i])
+        return image, label
+
+    movie = animation.FuncAnimation(fig, update, frames=len(times), blit=True)
+    movie.save(movie_file, writer=writer, fps=fps)
+
+    return movie_file
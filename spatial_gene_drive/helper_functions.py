@@ -1,8 +1,6 @@
 import numpy as np
 import math
 import os
-import json
-import pandas as pd
 import configparser
 
 from dtk.utils.Campaign.CampaignClass import WaningEffectExponential
@@ -13,6 +11,8 @@ from COMPS import Client
 from dtk.interventions.itn_age_season import add_ITN_age_season
 from dtk.vector.species import set_species_trait_modifiers, set_species_drivers
 
+from spatial_gene_drive.demographics_index import load_demographics_index
+
 
 def add_summary_report(cb, start_day=0, ipfilter='', description=''):
     summary_report_fn(start=start_day + 1, interval=30.0, description='Monthly_Report_%s' %description,
@@ -98,23 +98,16 @@ def add_drivers(cb, copy_to_likelihood=1.0):
     return {'Copy_To_Likelihood': copy_to_likelihood}
 
 
-def find_n_largest(n=1):
+def demographics_file_path():
 
     config = configparser.ConfigParser()
     config.read('simtools.ini')
     direc = config['HPC']['input_root']
 
-    file = os.path.join(direc, 'Demographics', '%s_demographics.json' % 'vector_genetics')
-    nodes = []
-    pop = []
-    with open(file) as f:
-        data = json.load(f)
-        for node in data['Nodes']:
-            nodes.append(node['NodeID'])
-            pop.append(node['NodeAttributes']['InitialPopulation'])
-    df = pd.DataFrame({'nodes': nodes, 'pop': pop})
-    df = df.sort_values(by=['pop'], ascending=False)
+    return os.path.join(direc, 'Demographics', '%s_demographics.json' % 'vector_genetics')
 
-    node_list = list(df['nodes'][:n])
 
-    return node_list
+def find_n_largest(n=1):
+
+    # the node table is parsed once per process and cached next to the demographics file
+    return load_demographics_index(demographics_file_path()).n_largest(n)
@@ -1,12 +1,17 @@
 from dtk.utils.reports import BaseVectorGeneticsReport
 from malaria.reports.MalariaReport import add_filtered_spatial_report
 from simtools.ExperimentManager.ExperimentManagerFactory import ExperimentManagerFactory
-from simtools.ModBuilder import ModBuilder, ModFn
 from simtools.SetupParser import SetupParser
 from dtk.vector.species import set_species_genes
 
 from spatial_gene_drive.configure_interventions import *
 from spatial_gene_drive.helper_functions import *
+from spatial_gene_drive.create_serialized_file import build_burnin
+from simulation_tools.branching import BranchingEnsemble
+from simulation_tools.burnin import BurnInStage, serialized_population, set_serialized_population
+from simulation_tools.equilibrium import inset_channels
+from simulation_tools.local_runner import LocalExperimentRunner
+from simulation_tools.sweep import ModSpec, Sweep, SweepVar
 from malaria.interventions.health_seeking import add_health_seeking
 
 
@@ -22,10 +27,15 @@ if __name__ == "__main__":
     num_years = 6
     num_seeds = 50
 
+    run_locally = 0
+    input_dir = os.path.join('input_files', 'spatial')
+
     ############################ SETUP CONFIG FILE and SERIALIZED FILE ##################3
+    # local runs check that the climate files in input_dir cover every node of the demographics file
     cb = configure_VC_GM_intervention_system(prefix, geography,
                                              num_cores=num_cores, num_years=num_years,
-                                             migration_mul=migration_mul)
+                                             migration_mul=migration_mul,
+                                             input_dir=input_dir if run_locally else None)
 
     serialized_file_list = ['', '']
 
@@ -44,6 +54,16 @@ if __name__ == "__main__":
         'logLevel_SusceptibilityMalaria': 'ERROR'
     })
 
+    if run_locally:
+        # the 11 year burn-in only runs again when its own config changes; it must use the same number of cores
+        burnin_stage = BurnInStage(os.path.join('_local', 'burnins'), input_dir=input_dir)
+        burnins = burnin_stage.run(*build_burnin(num_cores=num_cores, migration_mul=migration_mul,
+                                                 input_dir=input_dir), verbose=True,
+                                   equilibrium_channels=inset_channels)
+    else:
+        # serialized population on COMPS, fill in its path and files
+        burnins = [serialized_population('', serialized_file_list)]
+
     #################################### VECTOR GENETICS ##############################
 
     # Add genes
@@ -60,74 +80,37 @@ if __name__ == "__main__":
     release_nodes = [6]
     transmission_probs = [0.3]
     start_days = [180]
-    VC_and_GM = [
-            [ModFn(DTKConfigBuilder.set_param, 'Run_Number', seed),
-             ModFn(DTKConfigBuilder.set_param, 'Serialized_Population_Path', ''),
-             ModFn(add_nets, coverage=net_coverage, number=number, num_nodes=numnodes, start_day=start_day),
-             ModFn(add_release, number=number, num_nodes=numnodes, start_day=start_day),
-             ModFn(add_drivers, copy_to_likelihood=likelihood),
-             ModFn(add_trait_modifiers, transmission_to_human=transmission_prob)
-             ]
-            for seed in range(num_seeds)
-            for start_day in start_days
-            for number in release_numbers
-            for numnodes in release_nodes
-            for net_coverage in net_coverages
-            for likelihood in copy_to_likelihoods
-            for transmission_prob in transmission_probs
-        ]
-
-    VC = [
-            [ModFn(DTKConfigBuilder.set_param, 'Run_Number', seed),
-             ModFn(DTKConfigBuilder.set_param, 'Serialized_Population_Path', ''),
-             ModFn(add_nets, coverage=net_coverage, number=0, num_nodes=0, start_day=start_day),
-             ModFn(add_drivers, copy_to_likelihood=likelihood),
-             ModFn(add_trait_modifiers, transmission_to_human=transmission_prob)
-             ]
-            for seed in range(num_seeds)
-            for start_day in [0]
-            for number in [0]
-            for numnodes in [0]
-            for net_coverage in net_coverages
-            for likelihood in [0.0]
-            for transmission_prob in [1.0]
-        ]
-
-    GM = [
-        [ModFn(DTKConfigBuilder.set_param, 'Run_Number', seed),
-         ModFn(DTKConfigBuilder.set_param, 'Serialized_Population_Path', ''),
-         ModFn(add_nets, coverage=net_coverage, number=number, num_nodes=numnodes, start_day=start_day),
-         ModFn(add_release, number=number, num_nodes=numnodes, start_day=start_day),
-         ModFn(add_drivers, copy_to_likelihood=likelihood),
-         ModFn(add_trait_modifiers, transmission_to_human=transmission_prob)
-         ]
-        for seed in range(num_seeds)
-        for start_day in start_days
-        for number in release_numbers
-        for numnodes in release_nodes
-        for net_coverage in [0.0]
-        for likelihood in copy_to_likelihoods
-        for transmission_prob in transmission_probs
-    ]
-
-    No_interventions = [
-        [ModFn(DTKConfigBuilder.set_param, 'Run_Number', seed),
-         ModFn(DTKConfigBuilder.set_param, 'Serialized_Population_Path', ''),
-         ModFn(add_nets, coverage=net_coverage, number=0, num_nodes=0, start_day=start_day),
-         ModFn(add_drivers, copy_to_likelihood=likelihood),
-         ModFn(add_trait_modifiers, transmission_to_human=transmission_prob)
-         ]
-        for seed in range(num_seeds)
-        for start_day in [0]
-        for number in [0]
-        for numnodes in [0]
-        for net_coverage in [0.0]
-        for likelihood in [0.0]
-        for transmission_prob in [1.0]
-    ]
-
-    builder = ModBuilder.from_list(VC_and_GM + VC + GM + No_interventions)
-    # builder = ModBuilder.from_list(VC)
+    # local runs only: with branch_day = 180 the days before the release run once per arm family and every seed
+    # continues from the serialized state at the branch day; 0 runs every simulation from the burn-in
+    branch_day = 0
+    # every arm starts from the same interventions; the VC only and no intervention arms have no release
+    nets = ModSpec(add_nets, coverage=SweepVar('net_coverage'), number=SweepVar('number'),
+                   num_nodes=SweepVar('numnodes'), start_day=SweepVar('start_day'))
+    release = ModSpec(add_release, number=SweepVar('number'), num_nodes=SweepVar('numnodes'),
+                      start_day=SweepVar('start_day'))
+    drivers = ModSpec(add_drivers, copy_to_likelihood=SweepVar('likelihood'))
+    trait_modifiers = ModSpec(add_trait_modifiers, transmission_to_human=SweepVar('transmission_prob'))
+    serialized_path = ModSpec(set_serialized_population, SweepVar('burnin'))
+
+    sweep = Sweep(seeds=range(num_seeds), arm_tag='Experiment')
+    sweep.add_arm('VC_and_GM', [serialized_path, nets, release, drivers, trait_modifiers],
+                  factors={'start_day': start_days, 'number': release_numbers, 'numnodes': release_nodes,
+                           'net_coverage': net_coverages, 'likelihood': copy_to_likelihoods,
+                           'transmission_prob': transmission_probs, 'burnin': burnins})
+    sweep.add_arm('VC_only', [serialized_path, nets, drivers, trait_modifiers],
+                  factors={'start_day': [0], 'number': [0], 'numnodes': [0], 'net_coverage': net_coverages,
+                           'likelihood': [0.0], 'transmission_prob': [1.0], 'burnin': burnins})
+    sweep.add_arm('GM_only', [serialized_path, nets, release, drivers, trait_modifiers],
+                  factors={'start_day': start_days, 'number': release_numbers, 'numnodes': release_nodes,
+                           'net_coverage': [0.0], 'likelihood': copy_to_likelihoods,
+                           'transmission_prob': transmission_probs, 'burnin': burnins})
+    sweep.add_arm('No_interventions', [serialized_path, nets, drivers, trait_modifiers],
+                  factors={'start_day': [0], 'number': [0], 'numnodes': [0], 'net_coverage': [0.0],
+                           'likelihood': [0.0], 'transmission_prob': [1.0], 'burnin': burnins})
+
+    print(sweep.describe())
+    builder = sweep.builder()
+    # builder = sweep.builder(arms=['VC_only'])
 
     ################################ INTERVENTIONS ###################################
 
@@ -183,9 +166,17 @@ if __name__ == "__main__":
                     'exp_name': exp_name,
                     'exp_builder': builder}
 
-    SetupParser.default_block = 'HPC'
-
-    SetupParser.init('HPC')
-    exp_manager = ExperimentManagerFactory.init()
+    if run_locally:
+        # run on local cores instead of COMPS, outputs are written to _local/<exp_name>/sim_*/output
+        exp_manager = LocalExperimentRunner(experiment_dir='_local', input_dir=input_dir,
+                                            config_cache=os.path.join('_local', 'config_cache'), verbose=True)
+        if branch_day:
+            prefixes = BurnInStage(os.path.join('_local', 'prefixes'), input_dir=input_dir)
+            run_sim_args['exp_builder'] = BranchingEnsemble(branch_day, prefixes).builder(cb, builder, verbose=True)
+    else:
+        SetupParser.default_block = 'HPC'
+
+        SetupParser.init('HPC')
+        exp_manager = ExperimentManagerFactory.init()
     exp_manager.run_simulations(**run_sim_args)
     exp_manager.wait_for_finished(verbose=True)
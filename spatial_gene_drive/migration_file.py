@@ -0,0 +1,82 @@
+import json
+
+import numpy as np
+import scipy.sparse as sparse
+
+from spatial_gene_drive.node_offsets import read_node_offsets
+
+
+def migration_dtype(n_destinations):
+    """
+    One node record of a migration file: destination node ids followed by their daily rates
+    """
+
+    return np.dtype([('destinations', '<u4', (n_destinations,)), ('rates', '<f8', (n_destinations,))])
+
+
+def read_migration_file(bin_path):
+    """
+    Read an EMOD migration file into a sparse rate matrix
+    :param bin_path: path to the .bin file; the header is read from <bin_path>.json
+    :return: node ids and a CSR matrix of daily migration rates, rows are origins and columns destinations,
+    both in the order of the node ids
+    """
+
+    with open(bin_path + '.json') as f:
+        header = json.load(f)
+    n_destinations = header['Metadata']['DatavalueCount']
+    nodeids, offsets = read_node_offsets(header['NodeOffsets'])
+
+    # the records are read in place from the memory-mapped file, in the order given by the header offsets
+    dtype = migration_dtype(n_destinations)
+    records = np.memmap(bin_path, dtype=dtype, mode='r')
+    if np.any(offsets % dtype.itemsize) or offsets.max() // dtype.itemsize >= len(records):
+        raise ValueError('NodeOffsets of %s do not match %i destinations per node' % (bin_path, n_destinations))
+    records = records[offsets // dtype.itemsize]
+
+    position = np.full(max(nodeids.max(), records['destinations'].max()) + 1, -1, dtype=np.int64)
+    position[nodeids] = np.arange(len(nodeids))
+    columns = position[records['destinations']]
+    rates = records['rates']
+    # unused destination slots are zero padded
+    used = rates > 0
+    if np.any(columns[used] < 0):
+        raise ValueError('%s has destinations that are not in its NodeOffsets' % bin_path)
+
+    rows = np.broadcast_to(np.arange(len(nodeids))[:, None], used.shape)
+    matrix = sparse.csr_matrix((rates[used], (rows[used], columns[used])), shape=(len(nodeids), len(nodeids)))
+
+    return nodeids, matrix
+
+
+def migration_operator(rates, multiplier=1.0):
+    """
+    Daily vector movement between nodes. Vectors leave a node with probability 1 - exp(-x * total rate) and pick
+    a destination in proportion to its rate, as EMOD does with x_Vector_Migration_Local
+    :param rates: CSR matrix of daily rates from read_migration_file
+    :param multiplier: x_Vector_Migration_Local
+    :return: dictionary with leave, the probability of leaving each node, destinations, the CSR matrix of destination
+    probabilities with columns for origins, and operator, the CSR matrix that moves node counts forward by a day
+    """
+
+    total = np.asarray(rates.sum(axis=1)).ravel()
+    leave = 1 - np.exp(-multiplier * total)
+    destinations = (sparse.diags(np.divide(1.0, total, out=np.zeros_like(total), where=total > 0)) @ rates).T.tocsr()
+    operator = (destinations @ sparse.diags(leave) + sparse.diags(1 - leave)).tocsr()
+
+    return {'leave': leave, 'destinations': destinations, 'operator': operator}
+
+
+def load_migration(bin_path, multiplier=1.0):
+    """
+    Migration input for simulate in simulation_tools/gene_drive_model.py
+    :param bin_path: path to the vector migration .bin file, e.g. the Vector_Migration_Filename_Local input
+    :param multiplier: x_Vector_Migration_Local, migration_mul in main_run_file.py
+    :return: dictionary with nodeids, rates and the entries of migration_operator
+    """
+
+    nodeids, rates = read_migration_file(bin_path)
+    migration = migration_operator(rates, multiplier)
+    migration.update({'nodeids': nodeids, 'rates': rates})
+
+    return migration
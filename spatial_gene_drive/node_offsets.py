@@ -0,0 +1,24 @@
+import numpy as np
+
+
+def read_node_offsets(node_offsets):
+    """
+    Decode the NodeOffsets string of an EMOD .bin.json header, as used by migration and climate files
+    :param node_offsets: hex string with 8 digits of node id followed by 8 digits of byte offset per node
+    :return: node ids and byte offsets as numpy arrays
+    """
+
+    table = np.frombuffer(node_offsets.encode('ascii'), dtype='S8').astype(str)
+    values = np.array([int(x, 16) for x in table], dtype=np.int64).reshape(-1, 2)
+
+    return values[:, 0], values[:, 1]
+
+
+def write_node_offsets(nodeids, offsets):
+    """
+    :param nodeids: node ids
+    :param offsets: byte offset of each node's record in the .bin file
+    :return: NodeOffsets string of an EMOD .bin.json header
+    """
+
+    return ''.join('%08X%08X' % (nodeid, offset) for nodeid, offset in zip(nodeids, offsets))
@@ -1,20 +1,27 @@
 import pandas as pd
 import numpy as np
 import os
-import json
-import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
 import matplotlib.cm as cm
 import matplotlib as mpl
 import matplotlib.colors as colors
 from matplotlib import rcParams
-# install package pyshp
-import shapefile
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+
+from analysis_tools.results_io import filter_results
+from analysis_tools.scenario_cube import ScenarioCube
+from spatial_gene_drive.analyzers.spatial_report_store import SpatialReportStore
+from spatial_gene_drive.demographics_index import load_demographics_index
+from spatial_gene_drive.grid_raster import NodeGrid, animate_nodes
+from spatial_gene_drive.shapefile_features import load_features
 
 mpl.rcParams['pdf.fonttype'] = 42
 rcParams.update({'font.size': 21})
 
 
-def features_within_polygon(shapefile_path, lngmin, lngmax, latmin, latmax):
+def features_within_polygon(shapefile_path, lngmin, lngmax, latmin, latmax, cache_dir=None):
     """
     Plot man-made features like roads or natural features like rivers
     :param shapefile_path: path to shapefile describing feature
@@ -22,20 +29,11 @@ def features_within_polygon(shapefile_path, lngmin, lngmax, latmin, latmax):
     :param lngmax: easternmost longitude of polygon to plot
     :param latmin: southernmost longitude of polygon to plot
     :param latmax: northernmost longitude of polygon to plot
-    :return: features: coordinates of features
+    :param cache_dir: directory caching the clipped features, so later runs do not read the shapefile
+    :return: features: coordinates of features, one (n, 2) array each
     """
 
-    sf = shapefile.Reader(shapefile_path)
-    features = []
-    for shape in sf.shapeRecords():
-        x = [i[0] for i in shape.shape.points[:]]
-        x2 = [i for i in x if lngmin < i < lngmax]
-        y = [i[1] for i in shape.shape.points[:]]
-        y2 = [i for i in y if latmin < i < latmax]
-        if x2 and y2:
-            features.append(shape.shape.points[:])
-
-    return features
+    return load_features(shapefile_path, lngmin, lngmax, latmin, latmax, cache_dir=cache_dir)
 
 
 def get_roads_rivers(grid_data):
@@ -44,14 +42,17 @@ def get_roads_rivers(grid_data):
     river_shapefile_path = os.path.join('Burkina', 'Burkina shapefiles', 'BFA_wat', 'BFA_water_lines_dcw')
 
     road_shapefile_path = os.path.join('Burkina', 'Burkina shapefiles', 'BFA_rds', 'BFA_roads')
+    cache_dir = os.path.join('Burkina', 'Burkina shapefiles', 'feature_cache')
 
     lngmin = min(grid_data['lon']) - 0.02
     lngmax = max(grid_data['lon']) + 0.02
     latmin = min(grid_data['lat']) - 0.04
     latmax = max(grid_data['lat']) + 0.02
     minmaxes = (lngmin, lngmax, latmin, latmax)
-    rivers = features_within_polygon(river_shapefile_path, lngmin=lngmin, lngmax=lngmax, latmax=latmax, latmin=latmin)
-    roads = features_within_polygon(road_shapefile_path, lngmin=lngmin, lngmax=lngmax, latmax=latmax, latmin=latmin)
+    rivers = features_within_polygon(river_shapefile_path, lngmin=lngmin, lngmax=lngmax, latmax=latmax, latmin=latmin,
+                                     cache_dir=cache_dir)
+    roads = features_within_polygon(road_shapefile_path, lngmin=lngmin, lngmax=lngmax, latmax=latmax, latmin=latmin,
+                                    cache_dir=cache_dir)
 
     return minmaxes, rivers, roads
 
@@ -67,22 +68,36 @@ def get_grid_data():
     direc = 'input/'
     demographics_dir = os.path.join(direc, 'VectorGeneticsSpatial', 'Burkina_Faso', 'Demographics')
     demographics_file = 'vector_genetics_demographics.json'
-    demographics_filepath = os.path.join(demographics_dir, demographics_file)
+    demographics = load_demographics_index(os.path.join(demographics_dir, demographics_file))
+
+    return grid_data, demographics
+
+
+def get_node_grid():
+
+    spatial_dir = os.path.join('input_files', 'spatial')
+
+    return NodeGrid.from_files(os.path.join(spatial_dir, 'vector_genetics_spatial_full_pop_grid.csv'),
+                               os.path.join(spatial_dir, 'vector_genetics_spatial_full_pop_grid_id_2_cell_id.json'),
+                               os.path.join(spatial_dir, 'vector_genetics_spatial_demographics.json'))
+
+
+def load_store_snapshots(store_dir, channels, times):
+    """
+    Read seed-averaged snapshots from the memory-mapped store written by SpatialAnalyzer
+    :param store_dir: directory of the spatial report store
+    :param channels: channels to read
+    :param times: snapshot times; only these slices are read from disk
+    :return: dataframe with Time, NodeID, the channels and the sweep tags
+    """
 
-    nodes = []
-    pop = []
-    lat = []
-    lon = []
-    with open(demographics_filepath) as f:
-        data = json.load(f)
-        for node in data['Nodes']:
-            nodes.append(node['NodeID'])
-            pop.append(node['NodeAttributes']['InitialPopulation'])
-            lat.append(node['NodeAttributes']['Latitude'])
-            lon.append(node['NodeAttributes']['Longitude'])
-    df_release = pd.DataFrame({'NodeID': nodes, 'pop': pop, 'lat': lat, 'lon': lon})
+    store = SpatialReportStore(store_dir)
+    df = store.to_dataframe(times=times, channels=channels)
+    group_variables = [x for x in store.tags.columns if x not in ['sim_index', 'sim_id', 'Run_Number']]
+    df = df.groupby(group_variables + ['time', 'node'])[channels].mean().reset_index()
+    df.rename(columns={'time': 'Time', 'node': 'NodeID'}, inplace=True)
 
-    return grid_data, df_release
+    return df
 
 
 def truncate_colormap(cmap, minval=0.0, maxval=1.0, n=100):
@@ -92,116 +107,186 @@ def truncate_colormap(cmap, minval=0.0, maxval=1.0, n=100):
     return new_cmap
 
 
-def get_relevant_dataframe(df, df_nets_temp, df_no_int_temp, transmission, net_cov):
+def render_basemap(rivers, roads, minmaxes, resolution=800):
+    """
+    Draw rivers and roads once as two line collections and rasterize them, so panels show an image instead of
+    re-drawing every feature
+    :param rivers: river coordinates from features_within_polygon
+    :param roads: road coordinates from features_within_polygon
+    :param minmaxes: (lngmin, lngmax, latmin, latmax) extent of the map
+    :param resolution: pixels along the longer side of the map
+    :return: RGBA image of the basemap with a transparent background, to be drawn with extent=minmaxes
+    """
+
+    lngmin, lngmax, latmin, latmax = minmaxes
+    scale = resolution / max(lngmax - lngmin, latmax - latmin) / 100.0
+    fig = Figure(figsize=((lngmax - lngmin) * scale, (latmax - latmin) * scale), dpi=100)
+    canvas = FigureCanvasAgg(fig)
+    fig.patch.set_alpha(0)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.set_axis_off()
+    ax.add_collection(LineCollection(rivers, colors='#7faddd', linewidths=1.5))
+    ax.add_collection(LineCollection(roads, colors='#969696', linewidths=1.5))
+    ax.set_xlim([lngmin, lngmax])
+    ax.set_ylim([latmin, latmax])
+    canvas.draw()
+
+    return np.asarray(canvas.buffer_rgba()).copy()
+
+
+# map layers shared by every figure, set once per worker process
+_map = {}
+
+
+def _init_map(basemap, minmaxes, node_geometry, df_release, cmap, node_grid):
+    _map.update(basemap=basemap, minmaxes=minmaxes, node_geometry=node_geometry, df_release=df_release, cmap=cmap,
+                node_grid=node_grid)
+
 
-    df_GM_temp = df.loc[(df['Transmission_To_Human'] == transmission) &
-                        (df['ITN_Coverage'] == 0.0)
-                        ]
-    df_VC_GM_temp = df.loc[(df['Transmission_To_Human'] == transmission) &
-                           (df['ITN_Coverage'] == net_cov)
-                           ]
-    df_temp = pd.concat([df_GM_temp, df_VC_GM_temp])
-    df_temp = pd.concat([df_temp, df_nets_temp])
-    df_temp = pd.concat([df_temp, df_no_int_temp])
+def _render_figure(job):
+    nodeids, panels, net_cov, transmission, time, fig_file = job
 
-    return df_temp
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    fig.set_size_inches((28, 7))
+    norm = mpl.colors.Normalize(vmin=0.0, vmax=1.0)
+    m = cm.ScalarMappable(norm=norm, cmap=_map['cmap'])
+    minmaxes = _map['minmaxes']
+    df_release = _map['df_release']
 
+    expts = ['No_interventions', 'VC_only', 'GM_only', 'VC_and_GM']
+    titles = {'No_interventions': 'No interventions', 'VC_only': 'VC', 'GM_only': 'GM', 'VC_and_GM': 'VC and GM'}
 
-def plotting_shapefiles(times, df, cmap):
+    for j, exp in enumerate(expts):
 
-    grid_data, df_release_master = get_grid_data()
+        values = panels[exp]
+
+        ax1 = fig.add_subplot(1, len(expts), j + 1)
+        ax1.imshow(_map['basemap'], extent=minmaxes, zorder=1, interpolation='antialiased')
+        ax1.set_ylim([minmaxes[2], minmaxes[3]])
+        ax1.set_xlim([minmaxes[0], minmaxes[1]])
+
+        if _map['node_grid'] is not None:
+            # one image of the grid cells instead of a marker per node
+            _map['node_grid'].draw(ax1, nodeids, values, _map['cmap'], norm, zorder=2)
+        else:
+            # node positions are looked up by NodeID and colors mapped in one call
+            lonlat = _map['node_geometry'].reindex(nodeids).to_numpy()
+            known = ~np.isnan(lonlat[:, 0]) & ~np.isnan(values)
+            ax1.scatter(lonlat[known, 0], lonlat[known, 1], zorder=2, marker='s', s=100,
+                        c=m.to_rgba(values[known]), edgecolor='silver')
+        sc = ax1.scatter(df_release['lon'], df_release['lat'], zorder=3, marker='s', s=100, c='k',
+                         edgecolor='r' if time == 180 else '#7FFF00')
+        sc.set_facecolor("none")
+
+        # plot scale
+        ax1.plot([-1.57267, -1.52673], [12.0, 12.0], 'k', lw=2)
+        ax1.text(-1.57267, 12.005, r'5 km', fontsize=21)
+        ax1.set_aspect('equal', adjustable='box')
+        ax1.axes.get_xaxis().set_visible(False)
+        ax1.axes.get_yaxis().set_visible(False)
+
+        if exp == 'VC_and_GM':
+            m.set_array(np.array([0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0]))
+            cax = fig.add_axes([0.82, 0.54, 0.02, 0.35])
+            cbar = fig.colorbar(m, cax=cax, ticks=[0.0, 0.5, 1.0])
+            cbar.ax.tick_params(labelsize=21)
+            cax.text(5.8, 0.5, 'GM', verticalalignment='center', horizontalalignment='center', fontsize=21)
+
+        ax1.set_title(titles[exp], fontsize=21)
+
+    fig.subplots_adjust(bottom=0.1, right=0.8, top=0.9, left=0.15, wspace=0.25)
+    fig.suptitle('Netcov = %0.1f, Tran = %0.2f' % (net_cov, transmission))
+    fig.savefig(fig_file, format='pdf')
+
+    return fig_file
+
+
+def plotting_shapefiles(times, results, cmap, fig_dir, processes=None, node_grid=None):
+    """
+    Maps of the GM fraction for every net coverage, transmission and time, one figure with the four experiments each
+    :param times: snapshot times
+    :param results: path of the analyzer output, a dataframe of it or a ScenarioCube with Experiment,
+    Transmission_To_Human, ITN_Coverage, Time and NodeID dimensions
+    :param cmap: colormap of the GM fraction
+    :param fig_dir: directory of the figures
+    :param processes: number of worker processes rendering figures, defaults to the number of cores; 1 renders in
+    this process
+    :param node_grid: NodeGrid to draw the nodes as one raster of grid cells, scatter squares if None
+    :return: paths of the figures
+    """
+
+    grid_data, demographics = get_grid_data()
+    df_release_master = demographics.to_dataframe()
+    minmaxes, rivers, roads = get_roads_rivers(grid_data)
+    node_geometry = df_release_master.drop_duplicates('NodeID').set_index('NodeID')[['lon', 'lat']]
+    df_release = demographics.to_dataframe(demographics.n_largest(6))[['lon', 'lat']]
+    map_layers = (render_basemap(rivers, roads, minmaxes), minmaxes, node_geometry, df_release, cmap, node_grid)
+
+    # the snapshots are loaded once into a cube; each panel is then a lookup by label
+    dims = ['Experiment', 'Transmission_To_Human', 'ITN_Coverage', 'Time', 'NodeID']
+    if isinstance(results, ScenarioCube):
+        cube = results
+    elif isinstance(results, pd.DataFrame):
+        cube = ScenarioCube.from_frame(filter_results(results, [('Time', 'in', times)]), dims, ['GM'])
+    else:
+        cube = ScenarioCube.from_results(results, dims, ['GM'], filters=[('Time', 'in', times)])
+    transmission_to_humans = [x for x in cube.labels('Transmission_To_Human').tolist() if x != 1.0]
+    itn_coverages = [x for x in cube.labels('ITN_Coverage').tolist() if x != 0.0]
+    nodeids = cube.labels('NodeID')
+    expts = ['No_interventions', 'VC_only', 'GM_only', 'VC_and_GM']
+
+    jobs = []
+    for net_cov in itn_coverages:
+        for transmission in transmission_to_humans:
+            # GM only, VC and GM, VC only and no interventions each ran at one of these combinations
+            scenarios = [(tr, cov) for tr in [transmission, 1.0] for cov in [0.0, net_cov]]
+            for time in times:
+                panels = {}
+                for exp in expts:
+                    panels[exp] = np.full(len(nodeids), np.nan)
+                    for tr, cov in scenarios:
+                        labels = {'Experiment': exp, 'Transmission_To_Human': tr, 'ITN_Coverage': cov, 'Time': time}
+                        if cube.has_data(**labels):
+                            panels[exp] = cube.sel(channel='GM', **labels)
+                            break
+                fig_file = os.path.join(fig_dir, 'Spatial_GM_netcov%0.1f_tran%0.2f_%i.pdf' % (net_cov, transmission,
+                                                                                               time))
+                jobs.append((nodeids, panels, net_cov, transmission, time, fig_file))
+
+    if processes == 1:
+        _init_map(*map_layers)
+        return [_render_figure(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_map, initargs=map_layers) as pool:
+        return list(pool.map(_render_figure, jobs))
+
+
+def animate_store(store_dir, node_grid, movie_file, cmap, channel='GM', tags=None, fps=30):
+    """
+    Movie of the seed mean of a channel over every report day of a SpatialAnalyzer store, e.g. all 2190 days of GM
+    spread, drawn in one figure whose node raster is updated in place
+    :param store_dir: directory of the spatial report store
+    :param node_grid: NodeGrid of the nodes
+    :param movie_file: output file, e.g. GM_spread.mp4
+    :param cmap: colormap
+    :param channel: channel to animate
+    :param tags: dictionary of sweep tag to value selecting the simulations averaged, e.g. {'Experiment': 'VC_and_GM'}
+    :param fps: frames per second
+    :return: path of the movie
+    """
+
+    store = SpatialReportStore(store_dir)
+    rows = store.tags
+    for tag, value in (tags or {}).items():
+        rows = rows[rows[tag] == value]
+    frames = store.read(channel, sims=rows['sim_index'].to_numpy()).mean(axis=0)
+
+    grid_data, demographics = get_grid_data()
     minmaxes, rivers, roads = get_roads_rivers(grid_data)
 
-    transmission_to_humans = list(df['Transmission_To_Human'].unique())
-    transmission_to_humans.remove(1.0)
-    itn_coverages = list(df['ITN_Coverage'].unique())
-    itn_coverages.remove(0.0)
-
-    for nc, net_cov in enumerate(itn_coverages):
-        df_nets_temp = df.loc[(df['Transmission_To_Human'] == 1.0) & (df['ITN_Coverage'] == net_cov)]
-        df_no_int_temp = df.loc[(df['Transmission_To_Human'] == 1.0) & (df['ITN_Coverage'] == 0.0)]
-        df_release = df_release_master.sort_values('pop', ascending=False)[:6]
-        for tr, transmission in enumerate(transmission_to_humans):
-
-            df_temp = get_relevant_dataframe(df, df_nets_temp, df_no_int_temp, transmission, net_cov)
-
-            for t, time in enumerate(times):
-
-                fig = plt.figure(t)
-                fig.set_size_inches((28, 7))
-
-                expts = ['No_interventions', 'VC_only', 'GM_only', 'VC_and_GM']
-
-                for j, exp in enumerate(expts):
-
-                    df_frac = df_temp.loc[(df_temp['Experiment'] == exp) & (df_temp['Time']==time)]
-
-                    axes = [fig.add_subplot(1, len(expts), j + 1)]
-                    ax1 = axes[0]
-
-                    for river in rivers:
-                        x = [i[0] for i in river]
-                        y = [i[1] for i in river]
-                        ax1.plot(x, y, zorder=1, color='#7faddd')
-
-                    for road in roads:
-                        x = [i[0] for i in road]
-                        y = [i[1] for i in road]
-                        ax1.plot(x, y, zorder=1, color='#969696')
-
-                    ax1.set_ylim([minmaxes[2], minmaxes[3]])
-                    ax1.set_xlim([minmaxes[0], minmaxes[1]])
-
-                    ##############################################################################################
-
-                    norm = mpl.colors.Normalize(vmin=0.0, vmax=1.0)
-                    m = cm.ScalarMappable(norm=norm, cmap=cmap)
-
-                    df_frac = df_frac[['Time', 'NodeID', 'GM', 'Experiment']]
-                    df_frac = pd.merge(df_frac, df_release_master, on='NodeID')
-                    df_frac['Colors'] = df_frac['GM'].apply(lambda x: m.to_rgba(x))
-                    ax1.scatter(df_frac['lon'], df_frac['lat'], zorder=2, marker='s', s=100, c=df_frac['Colors'],
-                                edgecolor='silver')
-                    if time == 180:
-                        sc = ax1.scatter(df_release['lon'], df_release['lat'], zorder=3, marker='s', s=100, c='k',
-                                         edgecolor='r')
-                    else:
-                        sc = ax1.scatter(df_release['lon'], df_release['lat'], zorder=3, marker='s', s=100, c='k',
-                                         edgecolor='#7FFF00')
-                    sc.set_facecolor("none")
-
-                    # plot scale
-                    ax1.plot([-1.57267, -1.52673], [12.0, 12.0], 'k', lw=2)
-                    ax1.text(-1.57267, 12.005, r'5 km', fontsize=21)
-                    ax1.set_aspect('equal', adjustable='box')
-                    ax1.axes.get_xaxis().set_visible(False)
-                    ax1.axes.get_yaxis().set_visible(False)
-
-                    if exp == 'VC_and_GM':
-                        m.set_array(np.array([0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0]))
-                        cax = fig.add_axes([0.82, 0.54, 0.02, 0.35])
-                        cbar = fig.colorbar(m, cax=cax, ticks=[0.0, 0.5, 1.0])
-                        cbar.ax.tick_params(labelsize=21)
-                        plt.text(5.8, 0.5, 'GM', verticalalignment='center', horizontalalignment='center',
-                                 fontsize=21)
-
-                    if exp == 'No_interventions':
-                        ax1.set_title('No interventions', fontsize=21)
-                    elif exp == 'VC_only':
-                        ax1.set_title('VC', fontsize=21)
-                    elif exp == 'GM_only':
-                        ax1.set_title('GM', fontsize=21)
-                    else:
-                        ax1.set_title('VC and GM', fontsize=21)
-
-                plt.subplots_adjust(bottom=0.1, right=0.8, top=0.9, left=0.15, wspace=0.25)
-
-                fig.suptitle('Netcov = %0.1f, Tran = %0.2f'
-                                         % (net_cov, transmission))
-                fig_file = os.path.join(fig_dir,  'Spatial_GM_%i.pdf'
-                                         % time)
-                plt.savefig(fig_file, type='pdf')
-                plt.close('all')
+    return animate_nodes(node_grid, store.nodeids, frames, store.times, movie_file, cmap,
+                         mpl.colors.Normalize(vmin=0.0, vmax=1.0), basemap=render_basemap(rivers, roads, minmaxes),
+                         basemap_extent=minmaxes, fps=fps)
 
 
 if __name__ == '__main__':
@@ -216,17 +301,25 @@ if __name__ == '__main__':
     os.makedirs(fig_dir, exist_ok=True)
 
     times = [180, 1094, 2189]
-
-    # File from analyzers
-    file_reduced = os.path.join(data_dir, 'simulation_data.csv')
-
-    df = pd.read_csv(file_reduced)
-    if 'Unnamed: 0' in df.columns:
-        df = df.drop('Unnamed: 0', axis=1)
-    if 'Unnamed: 0.1' in df.columns:
-        df = df.drop('Unnamed: 0.1', axis=1)
+    use_store = 0
+    # draw nodes as one raster of pop grid cells rather than a scatter square each
+    use_grid = 0
+    make_movie = 0
+
+    if use_store:
+        # Memory-mapped store from SpatialAnalyzer, only the snapshot times are read
+        results = load_store_snapshots(os.path.join(data_dir, '%s_spatial_store' % exp_name), [channel], times)
+    else:
+        # File from analyzers, csv or parquet; each panel only reads its own rows
+        results = os.path.join(data_dir, 'simulation_data.csv')
 
     #     # Color map
     cmap = cm.plasma
     cmap = truncate_colormap(cmap, 0.0, 1.0)
-    plotting_shapefiles(times, df, cmap)
+    node_grid = get_node_grid() if use_grid or make_movie else None
+    plotting_shapefiles(times, results, cmap, fig_dir, node_grid=node_grid)
+
+    if make_movie:
+        animate_store(os.path.join(data_dir, '%s_spatial_store' % exp_name), node_grid,
+                      os.path.join(fig_dir, 'Spatial_GM_VC_and_GM.mp4'), cmap, channel=channel,
+                      tags={'Experiment': 'VC_and_GM'})
@@ -0,0 +1,85 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from simulation_tools.gene_drive_model import compile_points, simulate
+from spatial_gene_drive.demographics_index import load_demographics_index
+from spatial_gene_drive.migration_file import load_migration
+
+
+def screen_release_nodes(model, tags, migration, capacity, release_nodes, days, number=1000, start_day=180,
+                         num_seeds=10):
+    """
+    Spread of a drive released in the num_nodes largest nodes, as add_release does, for each number of release nodes
+    :param model: compiled arrays from compile_points
+    :param tags: list of dictionaries of sweep tags, one per parameter point
+    :param migration: migration input from load_migration
+    :param capacity: emergence capacity of each node, in the order of migration['nodeids']
+    :param release_nodes: numbers of release nodes to compare, as num_nodes of add_release
+    :param days: number of days to simulate
+    :param number: number of males released in each node
+    :param start_day: day of release
+    :param num_seeds: number of stochastic replicates, 0 for the deterministic model
+    :return: dataframe with the tags, Num_Nodes, Time, the population weighted drive carrier fraction and the
+    fraction of nodes where most females carry the drive
+    """
+
+    largest = migration['nodeids'][np.argsort(-capacity, kind='stable')]
+    frames = []
+    for num_nodes in release_nodes:
+        releases = [{'start_day': start_day, 'number': number, 'released_genome': [['X', 'Y'], ['a1', 'a1']],
+                     'nodeIDs': largest[:num_nodes]}]
+        if num_seeds:
+            result = simulate(model, days, releases, capacity=capacity, migration=migration, stochastic=True,
+                              rng=np.random.default_rng(num_nodes), batch_shape=(num_seeds,),
+                              reduce_replicates=True)
+        else:
+            result = simulate(model, days, releases, capacity=capacity, migration=migration)
+
+        # (node, point, day)
+        carriers = 1 - result['fractions'][..., result['genomes'].index('X-a0:X-a0')]
+        population = result['population']
+        df = pd.DataFrame(tags).loc[np.repeat(np.arange(len(tags)), days)].reset_index(drop=True)
+        df['Num_Nodes'] = num_nodes
+        df['Time'] = np.tile(np.arange(days), len(tags))
+        df['Carrier_Fraction'] = ((carriers * population).sum(axis=0) /
+                                  np.maximum(population.sum(axis=0), 1e-12)).ravel()
+        df['Nodes_Established'] = (carriers > 0.5).mean(axis=0).ravel()
+        frames.append(df)
+
+    return pd.concat(frames, ignore_index=True)
+
+
+if __name__ == "__main__":
+
+    input_dir = os.path.join('input_files', 'spatial')
+    prefix = 'vector_genetics'
+    migration_mul = 100
+    # emergence capacity per person; scales the vector population of each node with its human population
+    capacity_per_person = 5
+
+    migration = load_migration(os.path.join(input_dir, '%s_spatial_local_migration.bin' % prefix), migration_mul)
+    demographics = load_demographics_index(os.path.join(input_dir, '%s_spatial_demographics.json' % prefix))
+    capacity = capacity_per_person * demographics.population[demographics.position(migration['nodeids'])]
+
+    species = 'gambiae'
+    copy_to_likelihoods = np.arange(0.8, 1.01, 0.1).tolist()
+    points = [{
+        'genes': {species: [{"Alleles": {"a0": 1.0, "a1": 0.0}, "Mutations": {"a1:a0": 0.05}}]},
+        'drivers': {species: [{
+            "Alleles_Driven": [
+                {"Allele_To_Copy": "a1",
+                 "Allele_To_Replace": "a0",
+                 "Copy_To_Likelihood": {"a0": 1 - likelihood, "a1": likelihood}
+                 }],
+            "Driver_Type": "CLASSIC",
+            "Driving_Allele": "a1"
+        }]},
+        'traits': {species: []}
+    } for likelihood in copy_to_likelihoods]
+    tags = [{'Copy_To_Likelihood': likelihood} for likelihood in copy_to_likelihoods]
+
+    df = screen_release_nodes(compile_points(species, points), tags, migration, capacity,
+                              release_nodes=[1, 2, 4, 6, 10, 20], days=365 * 6, num_seeds=0)
+    df.to_csv('release_node_screen.csv', index=False)
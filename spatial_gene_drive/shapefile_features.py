@@ -0,0 +1,73 @@
+import hashlib
+import os
+
+import numpy as np
+# install package pyshp (2.3 or later for bbox filtering)
+import shapefile
+
+
+def clip_features(shapefile_path, lngmin, lngmax, latmin, latmax):
+    """
+    Features of a shapefile with points inside a bounding box. Shapes are first selected by the bbox stored with each
+    shape, so the points of shapes outside the box are never decoded.
+    :param shapefile_path: path to shapefile describing feature
+    :param lngmin: westernmost longitude of the box
+    :param lngmax: easternmost longitude of the box
+    :param latmin: southernmost latitude of the box
+    :param latmax: northernmost latitude of the box
+    :return: (coordinates, offsets): all points as one (n, 2) array and the index of the first point of each feature,
+    followed by n
+    """
+
+    sf = shapefile.Reader(shapefile_path)
+    parts = []
+    for shape in sf.iterShapes(bbox=(lngmin, latmin, lngmax, latmax)):
+        if shape is None or not shape.points:
+            continue
+        points = np.asarray(shape.points, dtype=float)[:, :2]
+        # as before, a feature is kept if it has a longitude and a latitude within the box
+        if np.any((lngmin < points[:, 0]) & (points[:, 0] < lngmax)) and \
+                np.any((latmin < points[:, 1]) & (points[:, 1] < latmax)):
+            parts.append(points)
+    sf.close()
+
+    offsets = np.cumsum([0] + [len(x) for x in parts])
+    coordinates = np.concatenate(parts) if parts else np.empty((0, 2))
+
+    return coordinates, offsets
+
+
+def cache_key(shapefile_path, bbox):
+    # a modified shapefile gets a new key
+    shp = shapefile_path if shapefile_path.endswith('.shp') else shapefile_path + '.shp'
+    stat = os.stat(shp)
+    key = '%s|%i|%i|%s' % (os.path.abspath(shp), stat.st_size, stat.st_mtime_ns, ','.join('%.6f' % x for x in bbox))
+
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def load_features(shapefile_path, lngmin, lngmax, latmin, latmax, cache_dir=None):
+    """
+    Clipped features of a shapefile, read from the cache when the same shapefile was clipped to the same box before
+    :param shapefile_path: path to shapefile describing feature
+    :param lngmin: westernmost longitude of the box
+    :param lngmax: easternmost longitude of the box
+    :param latmin: southernmost latitude of the box
+    :param latmax: northernmost latitude of the box
+    :param cache_dir: directory of the packed coordinate arrays, no caching if None
+    :return: list of (n, 2) coordinate arrays, one per feature, as views into one packed array
+    """
+
+    bbox = (lngmin, lngmax, latmin, latmax)
+    path = os.path.join(cache_dir, '%s.npz' % cache_key(shapefile_path, bbox)) if cache_dir else None
+    if path and os.path.exists(path):
+        with np.load(path) as cached:
+            coordinates, offsets = cached['coordinates'], cached['offsets']
+    else:
+        coordinates, offsets = clip_features(shapefile_path, *bbox)
+        if path:
+            os.makedirs(cache_dir, exist_ok=True)
+            np.savez(path + '.tmp.npz', coordinates=coordinates, offsets=offsets)
+            os.replace(path + '.tmp.npz', path)
+
+    return np.split(coordinates, offsets[1:-1]) if len(offsets) > 1 else []
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from analysis_tools.branch_stitching import stitch_channels, stitch_frame
+
+
+def _report(times):
+    return pd.DataFrame({'Time': times, 'NodeID': 1, 'VectorPopulation': np.asarray(times) * 10.0})
+
+
+def test_stitch_frame_on_the_simulation_clock():
+    full = _report(np.arange(300))
+    stitched = stitch_frame(full, full[full['Time'] >= 180], 180, 180)
+
+    pd.testing.assert_frame_equal(stitched, full)
+
+
+def test_stitch_frame_moves_other_start_times():
+    full = _report(np.arange(300))
+    branch = full[full['Time'] >= 180].assign(Time=lambda df: df['Time'] - 180)
+
+    stitched = stitch_frame(full, branch, 180, 0)
+    assert stitched['Time'].tolist() == list(range(300))
+    assert stitched['VectorPopulation'].tolist() == full['VectorPopulation'].tolist()
+
+
+def test_stitch_channels():
+    prefix = {'Header': {'Timesteps': 300}, 'Channels': {'Daily EIR': {'Units': '', 'Data': list(range(300))}}}
+    branch = {'Header': {'Timesteps': 120}, 'Channels': {'Daily EIR': {'Units': '', 'Data': list(range(180, 300))}}}
+    stitched = stitch_channels(prefix, branch, 180)
+
+    assert stitched['Channels']['Daily EIR']['Data'] == list(range(300))
+    assert stitched['Header']['Timesteps'] == 300
@@ -0,0 +1,96 @@
+import pytest
+
+# branching.py serializes through dtk-tools and builds ModBuilders
+pytest.importorskip('dtk')
+pytest.importorskip('simtools')
+
+from simulation_tools.branching import continue_from_prefix, truncate_to_prefix  # noqa: E402
+from simulation_tools.burnin import serialized_population  # noqa: E402
+
+branch_day = 180
+
+
+class Campaign(object):
+    def __init__(self, events):
+        self.Events = events
+
+
+class ConfigBuilder(object):
+    # the parts of DTKConfigBuilder the branching ModFns use, with a campaign of plain dictionaries
+    def __init__(self, events, **params):
+        self.params = dict({'Run_Number': 7, 'Start_Time': 0, 'Simulation_Duration': 2190}, **params)
+        self.campaign = Campaign(events)
+
+    def set_param(self, name, value):
+        self.params[name] = value
+        return {name: value}
+
+    def update_params(self, params):
+        self.params.update(params)
+
+    def get_param(self, name, default=None):
+        return self.params.get(name, default)
+
+
+def _event(day, intervention, repetitions=1, interval=0):
+    return {'Start_Day': day, 'class': 'CampaignEvent',
+            'Event_Coordinator_Config': {'Number_Repetitions': repetitions, 'Timesteps_Between_Repetitions': interval,
+                                         'Intervention_Config': {'class': intervention}}}
+
+
+def _campaign():
+    return [_event(0, 'NodeLevelHealthTriggeredIV'), _event(0, 'SimpleBednet'),
+            _event(90, 'IRSHousingModification', repetitions=3, interval=30), _event(180, 'MosquitoRelease'),
+            _event(365, 'SimpleBednet')]
+
+
+def _classes(cb):
+    return [(event['Start_Day'], event['Event_Coordinator_Config']['Intervention_Config']['class'])
+            for event in cb.campaign.Events]
+
+
+def test_truncate_to_prefix():
+    cb = ConfigBuilder(_campaign())
+    tags = truncate_to_prefix(cb, branch_day, prefix_seed=0)
+
+    assert tags == {'Branch_Day': branch_day}
+    assert cb.get_param('Run_Number') == 0
+    # events from the branch day on belong to the continuations
+    assert _classes(cb) == [(0, 'NodeLevelHealthTriggeredIV'), (0, 'SimpleBednet'), (90, 'IRSHousingModification')]
+    assert cb.get_param('Serialization_Time_Steps') == [branch_day]
+    assert cb.get_param('Simulation_Duration') == branch_day
+
+
+def test_continue_from_prefix():
+    cb = ConfigBuilder(_campaign())
+    prefix = serialized_population('/prefixes/abcdef0123456789/output', ['state-00180.dtk'], 'abcdef0123456789')
+    tags = continue_from_prefix(cb, prefix, branch_day)
+
+    assert tags == {'Branch_Day': branch_day, 'Start_Time': branch_day, 'Prefix': 'abcdef012345',
+                    'Prefix_Dir': '/prefixes/abcdef0123456789'}
+    # the health seeking listener is restarted at the branch day, the other earlier events are in the serialized state
+    assert _classes(cb) == [(180, 'NodeLevelHealthTriggeredIV'), (180, 'MosquitoRelease'), (365, 'SimpleBednet')]
+    assert cb.get_param('Run_Number') == 7
+    assert cb.get_param('Start_Time') == branch_day and cb.get_param('Simulation_Duration') == 2190 - branch_day
+    assert cb.get_param('Serialized_Population_Path') == prefix['path']
+    assert cb.get_param('Serialized_Population_Filenames') == ['state-00180.dtk']
+
+
+@pytest.mark.parametrize('event', [_event(120, 'IRSHousingModification', repetitions=3, interval=30),
+                                   _event(0, 'SimpleBednet', repetitions=-1, interval=365)])
+def test_event_straddling_the_branch_day(event):
+    cb = ConfigBuilder([event])
+    prefix = serialized_population('/prefixes/abc/output', ['state-00180.dtk'], 'abc')
+
+    # its repetitions from the branch day on would be in neither the prefix nor the continuation
+    with pytest.raises(ValueError, match='branch day 180'):
+        continue_from_prefix(cb, prefix, branch_day)
+
+
+def test_event_ending_before_the_branch_day():
+    # the IRS rounds on days 120 and 150 are in the serialized state
+    cb = ConfigBuilder([_event(120, 'IRSHousingModification', repetitions=2, interval=30)])
+    prefix = serialized_population('/prefixes/abc/output', ['state-00180.dtk'], 'abc')
+    continue_from_prefix(cb, prefix, branch_day)
+
+    assert _classes(cb) == []
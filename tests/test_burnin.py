@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+# burnin.py runs simulations through dtk-tools ModBuilders
+pytest.importorskip('simtools')
+
+from simulation_tools.burnin import BurnInStage, find_serialized_files, serialized_states  # noqa: E402
+
+
+def _touch(directory, *names):
+    os.makedirs(directory, exist_ok=True)
+    for name in names:
+        open(os.path.join(directory, name), 'w').close()
+
+
+def test_serialized_states(tmp_path):
+    output_dir = str(tmp_path / 'output')
+    # MPI ranks listed out of order, a single core state and files that are not serialized states
+    _touch(output_dir, 'state-00365-010.dtk', 'state-00365-002.dtk', 'state-00365-000.dtk', 'state-04015.dtk',
+           'state-00365.dtk.tmp', 'InsetChart.json')
+
+    assert serialized_states(output_dir) == {365: ['state-00365-000.dtk', 'state-00365-002.dtk',
+                                                   'state-00365-010.dtk'],
+                                             4015: ['state-04015.dtk']}
+
+
+def test_find_serialized_files(tmp_path):
+    output_dir = str(tmp_path / 'output')
+    _touch(output_dir, 'state-00180.dtk', 'state-00730.dtk')
+
+    assert find_serialized_files(output_dir) == ['state-00730.dtk']
+    assert find_serialized_files(output_dir, 180) == ['state-00180.dtk']
+    with pytest.raises(FileNotFoundError, match='365'):
+        find_serialized_files(output_dir, 365)
+    assert find_serialized_files(str(tmp_path / 'empty')) == []
+
+
+def test_serialized_files_of_finished_burnins(tmp_path):
+    stage = BurnInStage(str(tmp_path))
+
+    def burnin(digest, status, *files):
+        sim_dir = stage.sim_dir(digest)
+        _touch(os.path.join(sim_dir, 'output'), *files)
+        if status:
+            with open(os.path.join(sim_dir, 'status.txt'), 'w') as f:
+                f.write('%s 0\n' % status)
+
+    burnin('done', 'Succeeded', 'state-00365.dtk')
+    burnin('failed', 'Failed', 'state-00365.dtk')
+    burnin('running', None, 'state-00365.dtk')
+    burnin('no_state', 'Succeeded')
+
+    assert stage.serialized_files('done') == ['state-00365.dtk']
+    assert [stage.serialized_files(digest) for digest in ['failed', 'running', 'no_state', 'missing']] == [None] * 4
@@ -0,0 +1,53 @@
+import os
+
+import numpy as np
+import pytest
+
+from spatial_gene_drive.climate_files import climate_parameters, open_climate_file, read_climate_header, \
+    seasonal_climate, validate_climate_nodes, validate_config_climate, write_climate_file
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+input_dir = os.path.join(repo_dir, 'input_files', 'spatial')
+
+
+class ConfigBuilder(object):
+
+    def __init__(self, params):
+        self.params = params
+
+    def get_param(self, name, default=None):
+        return self.params.get(name, default)
+
+
+def test_write_and_open_round_trip(tmp_path):
+    nodeids = [5, 2, 9]
+    data = seasonal_climate(nodeids, mean=[20, 25, 30], amplitude=5, peak_day=100, n_days=730)
+    path = str(tmp_path / 'air_temperature_daily.bin')
+    write_climate_file(path, nodeids, data, metadata={'DataProvenance': 'test'})
+
+    header, header_nodeids, offsets = read_climate_header(path)
+    read_nodeids, read_data = open_climate_file(path)
+
+    assert header['Metadata']['DataProvenance'] == 'test'
+    np.testing.assert_array_equal(header_nodeids, nodeids)
+    np.testing.assert_array_equal(offsets, [0, 4 * 730, 8 * 730])
+    np.testing.assert_array_equal(read_nodeids, nodeids)
+    np.testing.assert_array_equal(read_data, data)
+
+
+def test_shipped_climate_files_cover_the_demographics_nodes():
+    params = {name: os.path.join('.', 'Climate', 'Burkina Faso_30arcsec_air_temperature_daily.bin')
+              for name in climate_parameters}
+    params['Rainfall_Filename'] = os.path.join('.', 'Climate', 'Burkina Faso_30arcsec_rainfall_daily.bin')
+    params['Demographics_Filenames'] = [os.path.join('.', 'Demographics',
+                                                     'vector_genetics_spatial_demographics.json')]
+
+    validate_config_climate(ConfigBuilder(params), input_dir)
+
+
+def test_missing_nodes_are_reported(tmp_path):
+    path = str(tmp_path / 'rainfall_daily.bin')
+    write_climate_file(path, [1, 2, 3], np.zeros((3, 365)))
+
+    with pytest.raises(ValueError, match='missing 147 nodes'):
+        validate_climate_nodes([path], os.path.join(input_dir, 'vector_genetics_spatial_demographics.json'))
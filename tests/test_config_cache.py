@@ -0,0 +1,61 @@
+import json
+import os
+
+from simulation_tools.config_cache import ConfigCache, apply_overlay, canonical_json, config_overlay
+
+base = {'parameters': {'Run_Number': 0, 'Simulation_Duration': 2190, 'Enable_Vital_Dynamics': 1}}
+campaign = json.dumps({'Events': [{'Start_Day': 180, 'class': 'CampaignEvent'}]})
+
+
+def _files(run_number, **params):
+    config = json.loads(json.dumps(base))
+    config['parameters'].update(params, Run_Number=run_number)
+    config['parameters'].pop('Enable_Vital_Dynamics')
+
+    return {'config': json.dumps(config), 'campaign': campaign}
+
+
+def test_overlay_round_trip():
+    config = json.loads(_files(3, x_Temporary_Larval_Habitat=0.5)['config'])
+    overlay = config_overlay(base, config)
+
+    assert overlay == {'Run_Number': 3, 'x_Temporary_Larval_Habitat': 0.5, '__removed__': ['Enable_Vital_Dynamics']}
+    assert apply_overlay(base, overlay) == config
+
+
+def test_shared_files_stored_once(tmp_path):
+    cache = ConfigCache(str(tmp_path))
+    cache.set_base(base)
+    manifests = [cache.add_simulation(_files(run_number)) for run_number in range(3)]
+
+    assert len({manifest['campaign'] for manifest in manifests}) == 1
+    assert len({manifest['digest'] for manifest in manifests}) == 3
+    # the base and the campaign, no temporary files left behind
+    assert sorted(os.listdir(cache.blob_dir)) == sorted('%s.json' % digest for digest in
+                                                        [cache.base_digest, manifests[0]['campaign']])
+
+
+def test_digest_does_not_depend_on_the_base(tmp_path):
+    first = ConfigCache(str(tmp_path / 'first'))
+    first.set_base(base)
+    second = ConfigCache(str(tmp_path / 'second'))
+    # without set_base the first simulation is the base; changing it must not change the other digests
+    second.add_simulation(_files(7, x_Temporary_Larval_Habitat=2.0))
+
+    assert first.add_simulation(_files(1))['digest'] == second.add_simulation(_files(1))['digest']
+
+
+def test_materialize(tmp_path):
+    cache = ConfigCache(str(tmp_path / 'cache'))
+    cache.set_base(base)
+    files = _files(2)
+    manifest = cache.add_simulation(files)
+    sim_dir = str(tmp_path / 'sim_00000')
+    os.makedirs(sim_dir)
+    cache.materialize(manifest, sim_dir)
+
+    for name, content in files.items():
+        with open(os.path.join(sim_dir, '%s.json' % name)) as f:
+            assert canonical_json(json.load(f)) == canonical_json(json.loads(content))
+    with open(os.path.join(sim_dir, 'manifest.json')) as f:
+        assert json.load(f) == manifest
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from analysis_tools.ensemble_reducer import EnsembleReducer
+
+
+def _simulations(n_sims=6, n_days=20, nodes=1, seed=0):
+    rng = np.random.default_rng(seed)
+    frames = []
+    for run_number in range(n_sims):
+        df = pd.DataFrame({'Coverage': run_number % 2 * 0.5,
+                           'Time': np.repeat(np.arange(n_days), nodes),
+                           'a': rng.normal(size=n_days * nodes),
+                           'b': rng.exponential(size=n_days * nodes)})
+        frames.append(df)
+
+    return frames
+
+
+def _expected(frames, channels=('a', 'b')):
+    grouped = pd.concat(frames).groupby(['Coverage', 'Time'])
+    expected = grouped[list(channels)].mean()
+    for ch in channels:
+        expected[ch + '_std'] = grouped[ch].std(ddof=0)
+
+    return expected.reset_index()
+
+
+def _reduce(frames):
+    reducer = EnsembleReducer(['Coverage', 'Time'], ['a', 'b'])
+    for df in frames:
+        reducer.add(df)
+
+    return reducer
+
+
+def test_matches_groupby():
+    frames = _simulations()
+    pd.testing.assert_frame_equal(_reduce(frames).to_dataframe(), _expected(frames), check_dtype=False)
+
+
+def test_rows_sharing_a_group_within_a_simulation():
+    # several nodes of one simulation fall in the same (Coverage, Time) group
+    frames = _simulations(nodes=3)
+    pd.testing.assert_frame_equal(_reduce(frames).to_dataframe(), _expected(frames), check_dtype=False)
+
+
+def test_missing_values_are_skipped_per_channel():
+    frames = _simulations()
+    frames[1].loc[3:8, 'a'] = np.nan
+    pd.testing.assert_frame_equal(_reduce(frames).to_dataframe(), _expected(frames), check_dtype=False)
+
+
+def test_save_and_load_resume(tmp_path):
+    frames = _simulations()
+    path = str(tmp_path / 'stats.npz')
+    _reduce(frames[:4]).save(path, processed=['s0', 's1', 's2', 's3'])
+
+    reducer, processed = EnsembleReducer.load(path)
+    for df in frames[4:]:
+        reducer.add(df)
+
+    assert processed == {'s0', 's1', 's2', 's3'}
+    pd.testing.assert_frame_equal(reducer.to_dataframe(), _expected(frames), check_dtype=False)
@@ -0,0 +1,56 @@
+import numpy as np
+
+from simulation_tools.equilibrium import annual_means, candidate_serialization_days, equilibrium_day, \
+    equilibrium_year, serialization_day
+
+
+def _daily(annual, days_per_year=365):
+    # a seasonal cycle around each annual mean, which averages out over a year
+    season = 0.5 * np.sin(2 * np.pi * np.arange(days_per_year) / days_per_year)
+
+    return np.concatenate([mean * (1 + season) for mean in annual])
+
+
+def test_candidate_serialization_days():
+    assert candidate_serialization_days(20) == [1825, 3650, 5475, 7300]
+    assert candidate_serialization_days(12, every_years=5, first_year=3) == [1095, 2920, 4380]
+
+
+def test_annual_means_drop_incomplete_year():
+    np.testing.assert_allclose(annual_means(np.concatenate([_daily([100, 200]), np.full(100, 1e6)])), [100, 200])
+
+
+def test_converging_series():
+    # vectors grow towards a plateau reached in year 6
+    annual = [10, 40, 70, 90, 97, 99, 100, 100.5, 99.8, 100.2, 100, 99.9]
+    year = equilibrium_year(annual)
+
+    assert year is not None and 4 <= year <= 6
+    assert equilibrium_day({'Adult Vectors': _daily(annual)}) == 365 * year
+    assert equilibrium_year(np.zeros(5)) == 0
+
+
+def test_series_that_never_converges():
+    # a steady trend is never in equilibrium, whatever tail is tested
+    trend = np.arange(1, 13) * 10.0
+    assert equilibrium_year(trend) is None
+    # one channel out of equilibrium is enough for the burn-in to be out of equilibrium
+    assert equilibrium_day({'Adult Vectors': _daily(np.full(12, 100.0)), 'Prevalence': _daily(trend)}) is None
+
+
+def test_series_shorter_than_window():
+    assert equilibrium_year([100, 100], min_years=3) is None
+    assert equilibrium_year([], min_years=3) is None
+    # less than a year of daily values gives no annual means at all
+    assert equilibrium_day({'Adult Vectors': np.ones(300)}) is None
+
+
+def test_serialization_day():
+    days = [3650, 1825, 7300, 5475]
+
+    assert serialization_day(2000, days) == 3650
+    assert serialization_day(1825, days) == 1825
+    assert serialization_day(0, days) == 1825
+    # equilibrium after the last candidate, or never reached: the end of the burn-in
+    assert serialization_day(8000, days) == 7300
+    assert serialization_day(None, days) == 7300
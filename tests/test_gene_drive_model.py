@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from simulation_tools.gene_drive_model import ReplicateStreams, compile_points, equilibrium_adults, simulate
+
+species = 'arabiensis'
+
+
+def _model(alleles=None):
+    point = {'genes': {species: [{'Alleles': alleles or {'a0': 1.0, 'a1': 0.0}}]},
+             'drivers': {species: []}, 'traits': {species: []}}
+    return compile_points(species, [point])
+
+
+def test_deterministic_model_stays_at_equilibrium_without_release():
+    capacity = 10000
+    result = simulate(_model({'a0': 0.7, 'a1': 0.3}), days=365, capacity=capacity, female_life_expectancy=10,
+                      male_life_expectancy=5)
+    females, _ = equilibrium_adults(capacity, 100 / 3.0, (10, 5))
+
+    np.testing.assert_allclose(result['population'], females, rtol=1e-9)
+    # Hardy-Weinberg proportions of a0 0.7, a1 0.3 without selection, drive or mutation
+    np.testing.assert_allclose(result['fractions'][0], np.tile([0.49, 0.42, 0.09], (365, 1)), atol=1e-9)
+
+
+def test_no_recruits_without_males():
+    # a capacity this small rounds the starting population to zero, so the released females find no males to mate
+    # with; their eggs must not be recruited, as in the deterministic model
+    release = {'start_day': 0, 'number': 100, 'released_genome': [['X', 'X'], ['a0', 'a0']]}
+    result = simulate(_model(), days=100, releases=[release], capacity=0.09, stochastic=True,
+                      rng=ReplicateStreams(range(20)), batch_shape=(20,))
+
+    assert np.all(result['population'] <= 100)
+    assert np.all(result['fractions'][..., 1:] == 0)
+
+
+def test_release_nodes_follow_the_migration_file_order():
+    # nodes listed out of order, as read from a migration file's NodeOffsets; nobody moves
+    migration = {'nodeids': np.array([3, 1, 2]), 'operator': np.eye(3)}
+    release = {'start_day': 0, 'number': 1000, 'released_genome': [['X', 'Y'], ['a1', 'a1']], 'nodeIDs': [1]}
+    result = simulate(_model(), days=30, releases=[release], migration=migration)
+
+    carriers = result['fractions'][:, 0, -1, 1:].sum(axis=-1)
+    assert carriers[1] > 0 and carriers[0] == 0 and carriers[2] == 0
+    np.testing.assert_array_equal(result['nodeids'], [3, 1, 2])
+
+    with pytest.raises(KeyError, match='4'):
+        simulate(_model(), days=1, releases=[dict(release, nodeIDs=[4])], migration=migration)
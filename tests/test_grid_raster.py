@@ -0,0 +1,41 @@
+import os
+
+import numpy as np
+
+from spatial_gene_drive.demographics_index import load_demographics_index
+from spatial_gene_drive.grid_raster import NodeGrid
+
+spatial_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'input_files', 'spatial')
+grid_file = os.path.join(spatial_dir, 'vector_genetics_spatial_full_pop_grid.csv')
+id_2_cell_id_file = os.path.join(spatial_dir, 'vector_genetics_spatial_full_pop_grid_id_2_cell_id.json')
+demographics_file = os.path.join(spatial_dir, 'vector_genetics_spatial_demographics.json')
+
+
+def _cell_centers(node_grid, nodeids):
+    # lon, lat of the cell each node is drawn in
+    lng_min, lng_max, lat_min, lat_max = node_grid.extent
+    centers = []
+    for nodeid in nodeids:
+        row, col = np.argwhere(~np.isnan(node_grid.rasterize([nodeid], [1.0])))[0]
+        centers.append((lng_min + (col + 0.5) * (lng_max - lng_min) / node_grid.nx,
+                        lat_min + (row + 0.5) * (lat_max - lat_min) / node_grid.ny))
+
+    return np.array(centers)
+
+
+def test_nodes_drawn_at_their_coordinates():
+    nodes = load_demographics_index(demographics_file)
+    for node_grid in [NodeGrid.from_files(grid_file, id_2_cell_id_file, demographics_file),
+                      NodeGrid.from_files(grid_file, id_2_cell_id_file)]:
+        centers = _cell_centers(node_grid, nodes.nodeids)
+        lng_min, lng_max, lat_min, lat_max = node_grid.extent
+        assert np.all(np.abs(centers[:, 0] - nodes.lon) < (lng_max - lng_min) / node_grid.nx / 2)
+        assert np.all(np.abs(centers[:, 1] - nodes.lat) < (lat_max - lat_min) / node_grid.ny / 2)
+
+
+def test_every_node_has_its_own_cell():
+    nodes = load_demographics_index(demographics_file)
+    node_grid = NodeGrid.from_files(grid_file, id_2_cell_id_file, demographics_file)
+    image = node_grid.rasterize(nodes.nodeids, nodes.nodeids.astype(float))
+
+    assert sorted(image[~np.isnan(image)].astype(int)) == sorted(nodes.nodeids)
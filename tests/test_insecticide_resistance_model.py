@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+# helper_functions builds dtk-tools campaigns
+pytest.importorskip('dtk')
+
+from simulation_tools.gene_drive_model import compile_points  # noqa: E402
+from single_node_simulations.helper_functions import itn_discard_period, itn_killing_decay  # noqa: E402
+from single_node_simulations.insecticide_resistance_model import killing_modifiers, net_survival  # noqa: E402
+
+species = 'gambiae'
+
+
+def _model():
+    point = {'genes': {species: [{'Alleles': {'a0': 0.98, 'a1': 0.01, 'a2': 0.01}}]},
+             'drivers': {species: []}, 'traits': {species: []}}
+    return compile_points(species, [point])
+
+
+def _resistance(combination, killing, resistance_species=species):
+    return {'Allele_Combinations': [combination], 'Blocking_Modifier': 1.0, 'Killing_Modifier': killing,
+            'Species': resistance_species}
+
+
+# the layout written by add_insecticides: two pyrethroid entries and one carbamate entry
+insecticides = [{'Name': 'pyrethroid', 'Resistances': [_resistance(['a1', 'a1'], 0.1)]},
+                {'Name': 'pyrethroid', 'Resistances': [_resistance(['a1', 'a0'], 0.2)]},
+                {'Name': 'carbamate', 'Resistances': [_resistance(['a2', '*'], 0.3),
+                                                      _resistance(['a0', 'a0'], 0.0, 'funestus')]}]
+
+
+def test_killing_modifiers():
+    model = _model()
+    modifiers = killing_modifiers(insecticides, species, model)
+    genomes = model['genomes']
+
+    assert genomes == ['X-a0:X-a0', 'X-a0:X-a1', 'X-a0:X-a2', 'X-a1:X-a1', 'X-a1:X-a2', 'X-a2:X-a2']
+    # entries repeating a name are combined; the combination matches either allele order
+    np.testing.assert_allclose(modifiers['pyrethroid'], [1, 0.2, 1, 0.1, 1, 1])
+    # a wildcard matches any second allele, other species' resistances are ignored
+    np.testing.assert_allclose(modifiers['carbamate'], [1, 1, 0.3, 1, 0.3, 0.3])
+
+
+def test_net_survival():
+    modifiers = {'pyrethroid': np.array([1.0, 0.5])}
+    nets = [{'start': 10, 'coverage': 0.6, 'insecticide': 'pyrethroid', 'killing': 0.9},
+            {'start': 20, 'coverage': 0.5, 'insecticide': 'carbamate', 'killing': 0.8}]
+    survival = net_survival(nets, modifiers, days=40, feeding=0.3, n_genotypes=2)
+
+    decay = 1.0 / itn_discard_period + 1.0 / itn_killing_decay
+    first = 0.6 * 0.9 * np.exp(-np.maximum(np.arange(40) - 10, 0) * decay) * (np.arange(40) >= 10)
+    second = 0.5 * 0.8 * np.exp(-np.maximum(np.arange(40) - 20, 0) * decay) * (np.arange(40) >= 20)
+    assert survival.shape == (40, 2)
+    np.testing.assert_array_equal(survival[:10], 1)
+    # the pyrethroid net kills resistant females at half the rate, the carbamate net has no modifiers here
+    np.testing.assert_allclose(survival[:, 0], (1 - 0.3 * first) * (1 - 0.3 * second))
+    np.testing.assert_allclose(survival[:, 1], (1 - 0.3 * first * 0.5) * (1 - 0.3 * second))
@@ -0,0 +1,65 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from spatial_gene_drive.migration_file import load_migration, migration_dtype, read_migration_file
+from spatial_gene_drive.node_offsets import write_node_offsets
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _write_migration_file(path, nodeids, rates, n_destinations=3, order=None):
+    """
+    Migration file with the daily rates of a dense (origin, destination) matrix, zero padded to n_destinations
+    per node and with the records stored in the given order
+    """
+
+    dtype = migration_dtype(n_destinations)
+    order = np.arange(len(nodeids)) if order is None else np.asarray(order)
+    records = np.zeros(len(nodeids), dtype=dtype)
+    for slot, origin in enumerate(order):
+        destinations = np.flatnonzero(rates[origin])
+        records[slot]['destinations'][:len(destinations)] = np.asarray(nodeids)[destinations]
+        records[slot]['rates'][:len(destinations)] = rates[origin, destinations]
+    records.tofile(path)
+    offsets = np.empty(len(nodeids), dtype=np.int64)
+    offsets[order] = np.arange(len(nodeids)) * dtype.itemsize
+    with open(path + '.json', 'w') as f:
+        json.dump({'Metadata': {'NodeCount': len(nodeids), 'DatavalueCount': n_destinations},
+                   'NodeOffsets': write_node_offsets(nodeids, offsets)}, f)
+
+
+def test_round_trip(tmp_path):
+    nodeids = [4, 9, 2, 30]
+    rates = np.array([[0, 0.1, 0, 0.02],
+                      [0.05, 0, 0.05, 0],
+                      [0, 0, 0, 0.3],
+                      [0.01, 0.01, 0.01, 0]])
+    path = str(tmp_path / 'local_migration.bin')
+    _write_migration_file(path, nodeids, rates, order=[2, 0, 3, 1])
+
+    read_nodeids, matrix = read_migration_file(path)
+
+    np.testing.assert_array_equal(read_nodeids, nodeids)
+    np.testing.assert_allclose(matrix.toarray(), rates)
+
+
+def test_unknown_destination(tmp_path):
+    path = str(tmp_path / 'local_migration.bin')
+    _write_migration_file(path, [1, 2], np.array([[0, 0.1], [0.1, 0]]))
+    records = np.fromfile(path, dtype=migration_dtype(3))
+    records[0]['destinations'][0] = 5
+    records.tofile(path)
+
+    with pytest.raises(ValueError, match='not in its NodeOffsets'):
+        read_migration_file(path)
+
+
+def test_shipped_migration_file_moves_vectors_without_losing_them():
+    migration = load_migration(os.path.join(repo_dir, 'input_files', 'spatial',
+                                            'vector_genetics_spatial_local_migration.bin'), multiplier=100)
+
+    assert len(migration['nodeids']) == 150
+    np.testing.assert_allclose(np.asarray(migration['operator'].sum(axis=0)).ravel(), 1)
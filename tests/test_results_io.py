@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis_tools.results_io import filter_results, read_result_groups, read_results, write_results
+
+
+def _results():
+    return pd.DataFrame({'Mutation_Rate2': np.repeat([0.0, 0.001, 0.01], 20),
+                         'Label': np.tile(np.repeat(['rotation', 'No_nets'], 10), 3),
+                         'Time': np.tile(np.arange(10), 6),
+                         'Annual EIR': np.arange(60.0)})
+
+
+def _write(tmp_path, output_format):
+    df = _results()
+    path = str(tmp_path / ('inset.' + output_format))
+    write_results(df, path, partition_cols=['Mutation_Rate2'])
+
+    return df, os.path.splitext(path)[0] + '.csv'
+
+
+def _sorted(df):
+    return df.sort_values(['Mutation_Rate2', 'Label', 'Time']).reset_index(drop=True)
+
+
+def test_filter_results():
+    df = _results()
+    filtered = filter_results(df, [('Time', '<', 3), ('Label', 'in', ['rotation']), ('Mutation_Rate2', '!=', 0.01)])
+    assert len(filtered) == 6
+    assert (filtered['Time'] < 3).all() and (filtered['Label'] == 'rotation').all()
+    assert len(filter_results(df, [('Label', 'not in', ['rotation'])])) == 30
+
+
+@pytest.mark.parametrize('output_format', ['csv', 'parquet'])
+def test_read_results(tmp_path, output_format):
+    if output_format == 'parquet':
+        pytest.importorskip('pyarrow')
+    df, path = _write(tmp_path, output_format)
+    filters = [('Time', '>=', 5), ('Mutation_Rate2', '==', 0.001)]
+    read = read_results(path, columns=['Mutation_Rate2', 'Label', 'Time', 'Annual EIR', 'Time'], filters=filters)
+
+    assert list(read.columns) == ['Mutation_Rate2', 'Label', 'Time', 'Annual EIR']
+    pd.testing.assert_frame_equal(_sorted(read), _sorted(filter_results(df, filters)), check_dtype=False)
+
+
+@pytest.mark.parametrize('output_format', ['csv', 'parquet'])
+def test_read_result_groups(tmp_path, output_format):
+    if output_format == 'parquet':
+        pytest.importorskip('pyarrow')
+    df, path = _write(tmp_path, output_format)
+    groups = list(read_result_groups(path, 'Mutation_Rate2', columns=['Label', 'Time', 'Annual EIR'],
+                                     filters=[('Time', '<', 5)]))
+
+    assert [value for value, _ in groups] == [0.0, 0.001, 0.01]
+    for value, group in groups:
+        expected = filter_results(df, [('Time', '<', 5), ('Mutation_Rate2', '==', value)])
+        pd.testing.assert_frame_equal(_sorted(group), _sorted(expected), check_dtype=False)
@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis_tools.scenario_cube import ScenarioCube
+
+
+def _results():
+    rows = [{'Experiment': experiment, 'ITN_Coverage': coverage, 'Time': time,
+             'GM': i * 100 + time, 'GM_std': 0.1 * time}
+            for i, (experiment, coverage) in enumerate([('VC_and_GM', 0.0), ('VC_and_GM', 0.5), ('VC_only', 0.5)])
+            for time in range(4)]
+
+    return pd.DataFrame(rows)
+
+
+def test_from_frame_and_sel():
+    df = _results()
+    cube = ScenarioCube.from_frame(df.sample(frac=1, random_state=0), ['Experiment', 'ITN_Coverage', 'Time'],
+                                   ['GM', 'GM_std'])
+
+    assert cube.data.shape == (2, 2, 4, 2)
+    assert cube.labels('Experiment').tolist() == ['VC_and_GM', 'VC_only']
+    np.testing.assert_array_equal(cube.sel(channel='GM', Experiment='VC_and_GM', ITN_Coverage=0.5),
+                                  [100, 101, 102, 103])
+    assert cube.sel(channel=['GM'], Experiment='VC_only', Time=[3, 0]).shape == (2, 2, 1)
+    # VC_only was not simulated without nets
+    assert np.isnan(cube.sel(Experiment='VC_only', ITN_Coverage=0.0)).all()
+    assert not cube.has_data(Experiment='VC_only', ITN_Coverage=0.0)
+    with pytest.raises(KeyError):
+        cube.sel(Experiment='GM_only')
+
+
+def test_to_frame_round_trip():
+    df = _results()
+    cube = ScenarioCube.from_frame(df, ['Experiment', 'ITN_Coverage', 'Time'], ['GM', 'GM_std'])
+
+    pd.testing.assert_frame_equal(cube.to_frame(), df, check_dtype=False)
+    selected = cube.to_frame(Experiment='VC_and_GM', Time=[1, 2])
+    assert list(selected.columns) == ['ITN_Coverage', 'Time', 'GM', 'GM_std']
+    assert selected['GM'].tolist() == [1, 2, 101, 102]
+
+
+def test_repeated_dims_raise():
+    # ITN_Coverage is not a dim, so its two VC_and_GM scenarios would be averaged together
+    with pytest.raises(ValueError, match='repeat'):
+        ScenarioCube.from_frame(_results(), ['Experiment', 'Time'], ['GM', 'GM_std'])
+
+
+def test_from_results_cache_key(tmp_path):
+    path = str(tmp_path / 'spatial.csv')
+    _results().to_csv(path, index=False)
+    dims, channels = ['Experiment', 'ITN_Coverage', 'Time'], ['GM']
+
+    cube = ScenarioCube.from_results(path, dims, channels)
+    cube_path = str(tmp_path / 'spatial_cube.npz')
+    assert os.path.exists(cube_path)
+    cached, key = ScenarioCube.load(cube_path)
+    np.testing.assert_array_equal(cached.data, cube.data)
+
+    # other arguments or a rewritten output give another key, so the cube is built again
+    filtered = ScenarioCube.from_results(path, dims, channels, filters=[('Time', 'in', [0, 1])])
+    assert filtered.labels('Time').tolist() == [0, 1] and ScenarioCube.load(cube_path)[1] != key
+    _results().assign(GM=-1.0).to_csv(path, index=False)
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10 ** 9))
+    rebuilt = ScenarioCube.from_results(path, dims, channels, filters=[('Time', 'in', [0, 1])])
+    assert (rebuilt.to_frame()['GM'] == -1).all()
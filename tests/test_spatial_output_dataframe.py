@@ -0,0 +1,45 @@
+import numpy as np
+
+from analysis_tools.synthetic_reports import spatial_channel, spatial_report_bytes
+from spatial_gene_drive.analyzers.spatial_output_dataframe import construct_spatial_output_df, \
+    construct_spatial_output_multichannel_df, decode_spatial_report
+
+nodeids = [3, 1, 7, 12]
+
+
+def test_decode_round_trip():
+    data = spatial_channel('Adult_Vectors', 40, len(nodeids), rng=np.random.default_rng(0))
+    report = decode_spatial_report(spatial_report_bytes(data, nodeids, start=180.0, interval=2.0))
+
+    assert (report['n_nodes'], report['n_tstep'], report['start'], report['interval']) == (4, 40, 180.0, 2.0)
+    np.testing.assert_array_equal(report['nodeids'], nodeids)
+    np.testing.assert_array_equal(report['data'], data)
+
+
+def test_decode_unfiltered_report():
+    data = np.arange(12, dtype=np.float32).reshape(3, 4)
+    raw = np.array([4, 3], dtype=np.int32).tobytes() + np.asarray(nodeids, dtype=np.uint32).tobytes() + \
+        data.tobytes()
+    report = decode_spatial_report(raw, filtered=False)
+
+    assert (report['start'], report['interval']) == (0, 1)
+    np.testing.assert_array_equal(report['data'], data)
+
+
+def test_long_format_rows():
+    data = spatial_channel('Prevalence', 10, len(nodeids), rng=np.random.default_rng(1))
+    df = construct_spatial_output_df(spatial_report_bytes(data, nodeids, start=5.0), 'Prevalence',
+                                     timesteps=[7, 9, 100])
+
+    np.testing.assert_array_equal(df['time'], np.repeat([7, 9], 4))
+    np.testing.assert_array_equal(df['node'], np.tile(nodeids, 2))
+    np.testing.assert_array_equal(df['Prevalence'], data[[2, 4]].ravel())
+
+
+def test_multichannel_columns():
+    reports = {ch: spatial_report_bytes(spatial_channel(ch, 6, len(nodeids), rng=np.random.default_rng(i)), nodeids)
+               for i, ch in enumerate(['Adult_Vectors', 'Daily_EIR'])}
+    df = construct_spatial_output_multichannel_df(reports, ['Adult_Vectors', 'Daily_EIR'])
+
+    for ch in reports:
+        np.testing.assert_array_equal(df[ch], decode_spatial_report(reports[ch])['data'].ravel())
@@ -0,0 +1,84 @@
+import pytest
+
+# sweep.py builds dtk-tools ModFns
+pytest.importorskip('dtk')
+pytest.importorskip('simtools')
+
+from simulation_tools.sweep import ModSpec, Sweep, SweepVar, tag_simulation  # noqa: E402
+
+
+def add_nets(cb, coverage, start_day=0):
+    return {'ITN_Coverage': coverage, 'Start_Day': start_day}
+
+
+def add_release(cb, number):
+    return {'Release_Number': number}
+
+
+def _tags(mod_fns):
+    tags = {}
+    for fn in mod_fns:
+        if fn.func is not tag_simulation:
+            tags.update(fn.func(None, *fn.args, **fn.kwargs) or {})
+        else:
+            tags.update(fn.kwargs)
+
+    return tags
+
+
+def _sweep(**kwargs):
+    sweep = Sweep(seeds=range(2), arm_tag='Experiment', **kwargs)
+    sweep.add_arm('VC_and_GM', [ModSpec(add_nets, SweepVar('coverage')), ModSpec(add_release, SweepVar('number'))],
+                  factors={'coverage': [0.0, 0.5], 'number': [10, 100]})
+    sweep.add_arm('GM_only', [ModSpec(add_nets, 0.0), ModSpec(add_release, SweepVar('number'))],
+                  factors={'number': [100]})
+
+    return sweep
+
+
+def test_expansion_order():
+    tags = [_tags(mod_fns) for mod_fns in _sweep().mod_generator()]
+
+    # arm by arm, seed by seed, the first factor varying slowest
+    assert [(t['Experiment'], t['Run_Number'], t['ITN_Coverage'], t['Release_Number']) for t in tags] == \
+        [('VC_and_GM', 0, 0.0, 10), ('VC_and_GM', 0, 0.0, 100), ('VC_and_GM', 0, 0.5, 10), ('VC_and_GM', 0, 0.5, 100),
+         ('VC_and_GM', 1, 0.0, 10), ('VC_and_GM', 1, 0.0, 100), ('VC_and_GM', 1, 0.5, 10), ('VC_and_GM', 1, 0.5, 100),
+         ('GM_only', 0, 0.0, 100), ('GM_only', 1, 0.0, 100)]
+
+
+def test_size_and_describe():
+    sweep = _sweep()
+
+    assert sweep.size() == 10 and sweep.size(arms=['GM_only']) == 2
+    assert sweep.describe().splitlines() == [
+        'VC_and_GM: 4 points x 2 seeds = 8 simulations',
+        'GM_only: 1 points x 2 seeds = 2 simulations',
+        'GM_only: 2 simulations repeat configurations of VC_and_GM and are run in both arms',
+        'Total: 10 simulations before removing duplicate configurations']
+    with pytest.raises(KeyError):
+        sweep.size(arms=['VC_only'])
+
+
+def test_dedupe_within_arm():
+    sweep = Sweep(seeds=[0], arm_tag='Experiment')
+    sweep.add_arm('VC', [ModSpec(add_nets, SweepVar('coverage'))], design=[{'coverage': 0.5}, {'coverage': 0.5}])
+
+    assert len(list(sweep.mod_generator())) == 1
+    assert sweep.duplicates == {'VC': 1}
+
+
+def test_dedupe_arms():
+    sweep = _sweep(dedupe_arms=True)
+    tags = [_tags(mod_fns) for mod_fns in sweep.mod_generator()]
+
+    assert len(tags) == 8 and sweep.duplicates == {'GM_only': 2}
+    assert [t.get('Experiment_Duplicates') for t in tags if t['ITN_Coverage'] == 0.0 and t['Release_Number'] == 100] \
+        == ['GM_only', 'GM_only']
+
+
+def test_different_callables_are_different_configurations():
+    sweep = Sweep(seeds=[0])
+    transforms = [lambda x: x, lambda x: 2 * x]
+    sweep.add_arm('a', [ModSpec(add_nets, SweepVar('transform'))], factors={'transform': transforms})
+
+    assert len(list(sweep.mod_generator())) == 2